@@ -1,85 +1,429 @@
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash
+from flask import (Flask, Response, render_template, request, redirect, url_for, send_from_directory, flash, abort,
+                   jsonify, make_response)
 import os
-from werkzeug.utils import secure_filename
-import uuid
-from utils.pdf_parser import extract_text_from_pdf
-from utils.html_generator import generate_portfolio_html
+import time
+import hmac
+import functools
+from contextlib import nullcontext
+from utils.html_generator import DEFAULT_THEME
+from utils.pipeline import extract_resume, render_resume, warm_up
+from utils.storage import PortfolioStore, use_shared_journal_mode
+from utils.ingest import ingest_upload, IngestError
+from utils.janitor import Janitor, LOCK_FILENAME as JANITOR_LOCK_FILENAME
+from utils.search_index import SearchIndex, QueryError, INDEX_FILENAME
+from utils import dedup
+from utils.page_cache import PageCache, INDEX_FILENAME as PAGE_CACHE_FILENAME
+from utils.export import select_records, iter_zip, parse_time
+from utils.job_queue import JobQueue, INDEX_FILENAME as JOB_QUEUE_FILENAME
+from utils.worker import enqueue_upload, job_status as describe_job
+from utils.admission import AdaptiveLimiter, ClientRateLimiter, Overloaded
+from utils.profiling import RequestProfiler, MemoryProfiler, stage
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['PORTFOLIO_FOLDER'] = 'generated_portfolios'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['UPLOAD_SPOOL_MEMORY_BYTES'] = 2 * 1024 * 1024  # Larger uploads spool to a temp file
+app.config['JANITOR_ENABLED'] = True
+app.config['PORTFOLIO_TTL_SECONDS'] = 30 * 24 * 3600  # Expire portfolios unviewed for 30 days
+app.config['PORTFOLIO_QUOTA_BYTES'] = 5 * 1024 * 1024 * 1024  # 5GB across all portfolios
+app.config['UPLOAD_GRACE_SECONDS'] = 3600  # Uploads older than this are orphans
+app.config['JANITOR_INTERVAL_SECONDS'] = 300
+app.config['SEARCH_PAGE_SIZE'] = 20
+app.config['SEARCH_MAX_PAGE_SIZE'] = 100
+app.config['DEDUP_ENABLED'] = True
+app.config['DEDUP_THRESHOLD'] = 0.9  # Estimated Jaccard similarity above which a resume counts as a near duplicate
+app.config['PAGE_CACHE_ENABLED'] = True
+app.config['PAGE_CACHE_MAX_PAGES'] = 50000  # Extracted pages kept for re-uploads, least recently used evicted
+app.config['ADMISSION_ENABLED'] = True
+app.config['UPLOAD_INITIAL_CONCURRENCY'] = os.cpu_count() or 2
+app.config['UPLOAD_MAX_CONCURRENCY'] = 4 * (os.cpu_count() or 2)
+app.config['UPLOAD_TARGET_LATENCY_SECONDS'] = 5.0  # Shrink the concurrency limit when processing gets slower
+app.config['UPLOAD_QUEUE_SIZE'] = 32
+app.config['UPLOAD_QUEUE_TIMEOUT_SECONDS'] = 15.0
+app.config['UPLOAD_RATE_PER_MINUTE'] = 10  # Per client
+app.config['UPLOAD_BURST'] = 5
+app.config['PROFILING_ENABLED'] = False
+app.config['PROFILING_TOKEN'] = os.environ.get('PROFILING_TOKEN')  # Required to request or read profiles
+app.config['PROFILING_SAMPLE_EVERY'] = 0  # Also profile every Nth upload; 0 disables sampling
+app.config['PROFILE_FOLDER'] = 'profiles'
+app.config['MEMORY_PROFILING_ENABLED'] = False  # tracemalloc per pipeline stage, same token and folder
+app.config['MEMORY_PROFILING_SAMPLE_EVERY'] = 0  # Also trace every Nth upload; 0 disables sampling
+app.config['EXPORT_TOKEN'] = os.environ.get('EXPORT_TOKEN')  # Required for bulk export; unset disables it
+# Queue uploads for `python -m utils.worker` on any node sharing the folder; set
+# in the environment so it is known before any SQLite file is opened
+app.config['JOB_QUEUE_ENABLED'] = os.environ.get('JOB_QUEUE_ENABLED', '').lower() in ('1', 'true', 'yes')
+app.config['JOB_MAX_ATTEMPTS'] = 3  # Claims per upload before it is dead-lettered
+app.config['JOB_QUEUE_MAX_DUE'] = 1000  # Turn uploads away while this many jobs wait for a worker
 
 # Ensure upload and portfolio directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['PORTFOLIO_FOLDER'], exist_ok=True)
 
+# Queue workers may open the same SQLite files from other hosts, which WAL does not allow
+if app.config['JOB_QUEUE_ENABLED']:
+    use_shared_journal_mode()
+
+# Portfolios are sharded under PORTFOLIO_FOLDER and looked up through a SQLite index
+store = PortfolioStore(app.config['PORTFOLIO_FOLDER'])
+store.migrate_flat_directory()
+
+# Inverted index over parsed resumes, updated as portfolios are generated and removed
+search_index = SearchIndex(os.path.join(store.root, INDEX_FILENAME))
+
+# MinHash/LSH index of parsed resumes, for near-duplicate stats and reporting
+dedup_index = dedup.DedupIndex(os.path.join(store.root, dedup.INDEX_FILENAME),
+                               threshold=app.config['DEDUP_THRESHOLD'])
+
+# Extracted text per page, so a re-uploaded resume only has its edited pages extracted again
+page_cache = PageCache(os.path.join(store.root, PAGE_CACHE_FILENAME),
+                       max_pages=app.config['PAGE_CACHE_MAX_PAGES'])
+
+# Uploads waiting for (or processed by) standalone workers, see utils/worker.py
+job_queue = JobQueue(os.path.join(store.root, JOB_QUEUE_FILENAME), max_attempts=app.config['JOB_MAX_ATTEMPTS'])
+
+def active_page_cache():
+    return page_cache if app.config['PAGE_CACHE_ENABLED'] else None
+
+def find_identical_parse(source_hash):
+    """Stored parse and signature of an earlier upload of the same file, when dedup is on"""
+    if not app.config['DEDUP_ENABLED']:
+        return None
+    return dedup.identical_parse(store, dedup_index, source_hash)
+
+def forget_portfolio(portfolio_id):
+    search_index.remove(portfolio_id)
+    dedup_index.remove(portfolio_id)
+
+# Retention runs in the background so request handling never waits on it
+janitor = Janitor(store, app.config['UPLOAD_FOLDER'],
+                  ttl_seconds=app.config['PORTFOLIO_TTL_SECONDS'],
+                  quota_bytes=app.config['PORTFOLIO_QUOTA_BYTES'],
+                  upload_grace_seconds=app.config['UPLOAD_GRACE_SECONDS'],
+                  interval_seconds=app.config['JANITOR_INTERVAL_SECONDS'],
+                  on_delete=forget_portfolio,
+                  lock_path=os.path.join(store.root, JANITOR_LOCK_FILENAME))
+if app.config['JANITOR_ENABLED']:
+    janitor.start()
+
+# Admission control for /upload: per-client token buckets, then a latency-driven
+# concurrency limit with a bounded wait queue
+upload_limiter = AdaptiveLimiter(initial_limit=app.config['UPLOAD_INITIAL_CONCURRENCY'],
+                                 max_limit=app.config['UPLOAD_MAX_CONCURRENCY'],
+                                 target_latency=app.config['UPLOAD_TARGET_LATENCY_SECONDS'],
+                                 max_queue=app.config['UPLOAD_QUEUE_SIZE'],
+                                 max_wait=app.config['UPLOAD_QUEUE_TIMEOUT_SECONDS'])
+client_limiter = ClientRateLimiter(app.config['UPLOAD_RATE_PER_MINUTE'] / 60, app.config['UPLOAD_BURST'])
+
+request_profiler = RequestProfiler(app.config['PROFILE_FOLDER'],
+                                   sample_every=app.config['PROFILING_SAMPLE_EVERY'])
+memory_profiler = MemoryProfiler(app.config['PROFILE_FOLDER'],
+                                 sample_every=app.config['MEMORY_PROFILING_SAMPLE_EVERY'])
+
+# /readyz stays 503 until the upload pipeline has run once in this process
+# (or in the preloading master it was forked from, see wsgi.py)
+readiness = {'warm': False, 'warmup_seconds': None, 'warmed_at': None}
+
+def warm_up_pipeline():
+    readiness['warmup_seconds'] = warm_up()
+    readiness['warmed_at'] = time.time()
+    readiness['warm'] = True
+
 ALLOWED_EXTENSIONS = {'pdf'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def has_profiling_token():
+    token = app.config['PROFILING_TOKEN']
+    supplied = request.headers.get('X-Profile-Token') or request.args.get('profile_token')
+    return bool(token and supplied) and hmac.compare_digest(supplied, token)
+
+def has_export_token():
+    token = app.config['EXPORT_TOKEN']
+    supplied = request.headers.get('X-Export-Token') or request.args.get('export_token')
+    return bool(token and supplied) and hmac.compare_digest(supplied, token)
+
+def profile_reason(enabled, profiler):
+    if not enabled:
+        return None
+    if has_profiling_token():
+        return 'requested'
+    if profiler.should_sample():
+        return 'sampled'
+    return None
+
+def profiled(view):
+    """Profile the view when the caller presents the profiling token, or 1 in N requests when sampling
+
+    CPU (cProfile) and memory (tracemalloc per pipeline stage) profiling are
+    enabled separately. Requested memory traces also list the top allocation
+    sites of every stage, which makes them much slower than sampled ones.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        reason = profile_reason(app.config['PROFILING_ENABLED'], request_profiler)
+        memory_reason = profile_reason(app.config['MEMORY_PROFILING_ENABLED'], memory_profiler)
+        if reason is None and memory_reason is None:
+            return view(*args, **kwargs)
+
+        with (request_profiler.profile(request.path, reason) if reason else nullcontext({})) as profile, \
+                (memory_profiler.trace(request.path, memory_reason, sites=memory_reason == 'requested')
+                 if memory_reason else nullcontext({})) as memory:
+            response = make_response(view(*args, **kwargs))
+        if 'profile_id' in profile:
+            response.headers['X-Profile-Id'] = profile['profile_id']
+        if 'profile_id' in memory:
+            response.headers['X-Memory-Profile-Id'] = memory['profile_id']
+        return response
+    return wrapper
+
+def overloaded_response(error):
+    return make_response((str(error), error.status, {'Retry-After': str(error.retry_after)}))
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/upload', methods=['POST'])
+@profiled
 def upload_file():
-    if 'resume' not in request.files:
-        flash('No file selected')
-        return redirect(request.url)
-    
-    file = request.files['resume']
-    if file.filename == '':
-        flash('No file selected')
-        return redirect(request.url)
-    
-    if file and allowed_file(file.filename):
-        # Generate unique filename
-        unique_id = str(uuid.uuid4())[:8]
-        filename = secure_filename(file.filename)
-        filename = f"{unique_id}_{filename}"
-        
-        # Save uploaded file
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
+    # Rate limiting happens before the request body is read
+    if app.config['ADMISSION_ENABLED']:
         try:
-            # Extract text from PDF
-            resume_text = extract_text_from_pdf(file_path)
-            
-            # Generate portfolio HTML
-            portfolio_html = generate_portfolio_html(resume_text)
-            
-            # Save portfolio
-            portfolio_filename = f"portfolio_{unique_id}.html"
-            portfolio_path = os.path.join(app.config['PORTFOLIO_FOLDER'], portfolio_filename)
-            
-            with open(portfolio_path, 'w', encoding='utf-8') as f:
-                f.write(portfolio_html)
-            
-            # Clean up uploaded file
-            os.remove(file_path)
-            
-            return render_template('result.html', 
-                                 portfolio_filename=portfolio_filename,
-                                 unique_id=unique_id)
-            
-        except Exception as e:
-            flash(f'Error processing file: {str(e)}')
-            return redirect(url_for('index'))
-    
-    flash('Please upload a valid PDF file')
-    return redirect(url_for('index'))
+            client_limiter.check(request.remote_addr or 'unknown')
+        except Overloaded as e:
+            return overloaded_response(e)
+
+    # Read the body exactly once: the hash, the PDF header check, the size limit
+    # and spooling to memory or disk all happen while it streams in
+    try:
+        with stage('ingest'):
+            upload = ingest_upload(request.stream, request.content_type, 'resume',
+                                   max_bytes=app.config['MAX_CONTENT_LENGTH'],
+                                   spool_max_memory=app.config['UPLOAD_SPOOL_MEMORY_BYTES'],
+                                   spool_dir=app.config['UPLOAD_FOLDER'])
+    except IngestError as e:
+        flash('Please upload a valid PDF file' if e.status == 415 else str(e))
+        return redirect(url_for('index'))
+
+    if not allowed_file(upload.filename):
+        upload.close()
+        flash('Please upload a valid PDF file')
+        return redirect(url_for('index'))
+
+    # With the job queue, whichever worker claims the upload processes it and
+    # the client follows the job until its portfolio is ready
+    if app.config['JOB_QUEUE_ENABLED']:
+        try:
+            if job_queue.backlog() >= app.config['JOB_QUEUE_MAX_DUE']:
+                return overloaded_response(Overloaded('Upload queue is full', 503, 30))
+            with stage('enqueue'):
+                job_id = enqueue_upload(job_queue, store, upload.file, request.remote_addr, upload.sha256,
+                                        app.config['DEDUP_ENABLED'])
+        finally:
+            upload.close()
+        return redirect(url_for('get_job', job_id=job_id), code=303)
+
+    unique_id = store.new_id()
+    try:
+        # CPU-heavy stages run under the adaptive concurrency limit
+        with upload_limiter.slot() if app.config['ADMISSION_ENABLED'] else nullcontext():
+            # A byte-identical earlier upload has its stored parse reused;
+            # anything else is extracted and parsed page by page straight from
+            # the spooled upload
+            identical = find_identical_parse(upload.sha256)
+            if identical is not None:
+                resume_data, signature = identical
+                extract_seconds = 0.0
+            else:
+                resume_data, signature, extract_seconds = extract_resume(upload.file, app.config['DEDUP_ENABLED'],
+                                                                         page_cache=active_page_cache())
+                if signature is not None:
+                    # Near duplicates are only counted, never substituted
+                    dedup_index.find(signature)
+
+            # Generate portfolio HTML in every theme from a single parse
+            variants, render_seconds = render_resume(resume_data)
+            portfolio_html = variants.pop(DEFAULT_THEME)
+
+        # Save portfolio
+        with stage('write_files'):
+            record = store.save(unique_id, portfolio_html,
+                                owner=request.remote_addr,
+                                source_hash=upload.sha256,
+                                extract_seconds=extract_seconds,
+                                render_seconds=render_seconds,
+                                resume_data=resume_data,
+                                variants=variants)
+        with stage('index'):
+            search_index.add(unique_id, resume_data)
+            if signature is not None:
+                dedup_index.add(unique_id, signature)
+        portfolio_filename = record['filename']
+        theme_filenames = {theme: os.path.basename(store.variant_relpath(portfolio_filename, theme))
+                           for theme in variants}
+
+        return render_template('result.html',
+                               portfolio_filename=portfolio_filename,
+                               theme_filenames=theme_filenames,
+                               unique_id=unique_id)
+
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    except Exception as e:
+        flash(f'Error processing file: {str(e)}')
+        return redirect(url_for('index'))
+
+    finally:
+        # Release the spooled upload (memory or anonymous temp file)
+        upload.close()
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Status of a queued upload: JSON, or for browsers a page that refreshes until the portfolio is ready"""
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    status = describe_job(job)
+    if request.accept_mimetypes.best_match(['application/json', 'text/html']) != 'text/html':
+        return jsonify(status)
+    if job['state'] == 'done':
+        return render_template('result.html',
+                               portfolio_filename=job['result']['portfolio_filename'],
+                               theme_filenames=job['result']['theme_filenames'],
+                               unique_id=job_id)
+    if job['state'] == 'dead':
+        flash(f"Error processing file: {job['error']}")
+        return redirect(url_for('index'))
+    return render_template('job.html', job=status)
 
 @app.route('/portfolio/<filename>')
 def view_portfolio(filename):
-    return send_from_directory(app.config['PORTFOLIO_FOLDER'], filename)
+    record = store.lookup(filename)
+    if record is None:
+        abort(404)
+    store.touch(record['id'])
+    return send_from_directory(store.root, record['relpath'])
 
 @app.route('/download/<filename>')
 def download_portfolio(filename):
-    return send_from_directory(app.config['PORTFOLIO_FOLDER'], filename, as_attachment=True)
+    record = store.lookup(filename)
+    if record is None:
+        abort(404)
+    return send_from_directory(store.root, record['relpath'], as_attachment=True,
+                               download_name=record['filename'])
+
+@app.route('/export.zip')
+def export_portfolios():
+    """Stream a ZIP of the portfolios selected by id=..., owner, since and until; data=1 adds parsed JSON"""
+    if not app.config['EXPORT_TOKEN']:
+        abort(404)
+    if not has_export_token():
+        abort(403)
+    try:
+        since, until = parse_time(request.args.get('since')), parse_time(request.args.get('until'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    records = select_records(store, ids=request.args.getlist('id'), owner=request.args.get('owner'),
+                             since=since, until=until)
+    include_data = request.args.get('data', '').lower() in ('1', 'true', 'yes')
+    filename = f"portfolios-{time.strftime('%Y%m%d-%H%M%S')}.zip"
+    return Response(iter_zip(store, records, include_data), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/search')
+def search_portfolios():
+    query = request.args.get('q', '')
+    cursor = request.args.get('cursor', type=int)
+    per_page = min(max(request.args.get('per_page', app.config['SEARCH_PAGE_SIZE'], type=int), 1),
+                   app.config['SEARCH_MAX_PAGE_SIZE'])
+    try:
+        found = search_index.search(query, before=cursor, limit=per_page)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    results = []
+    for hit in found['results']:
+        filename = store.filename_for(hit['portfolio_id'])
+        results.append({
+            'name': hit['name'],
+            'portfolio_filename': filename,
+            'url': url_for('view_portfolio', filename=filename),
+        })
+    return jsonify({
+        'query': query,
+        'per_page': per_page,
+        'total': found['total'],
+        'total_capped': found['total_capped'],
+        'results': results,
+        'next_cursor': found['next_cursor'],
+    })
+
+@app.route('/profiles/<profile_id>')
+def get_profile(profile_id):
+    if not app.config['PROFILING_ENABLED']:
+        abort(404)
+    if not has_profiling_token():
+        abort(403)
+    path = request_profiler.path_for(profile_id, 'json')
+    if path is None:
+        abort(404)
+    return send_from_directory(request_profiler.directory, os.path.basename(path), mimetype='application/json')
+
+@app.route('/profiles/<profile_id>/raw')
+def download_profile(profile_id):
+    if not app.config['PROFILING_ENABLED']:
+        abort(404)
+    if not has_profiling_token():
+        abort(403)
+    path = request_profiler.path_for(profile_id, 'prof')
+    if path is None:
+        abort(404)
+    return send_from_directory(request_profiler.directory, os.path.basename(path), as_attachment=True)
+
+@app.route('/profiles/<profile_id>/memory')
+def get_memory_profile(profile_id):
+    if not app.config['MEMORY_PROFILING_ENABLED']:
+        abort(404)
+    if not has_profiling_token():
+        abort(403)
+    path = memory_profiler.path_for(profile_id, 'memory.json')
+    if path is None:
+        abort(404)
+    return send_from_directory(memory_profiler.directory, os.path.basename(path), mimetype='application/json')
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: warmed up and able to store portfolios; 503 tells the load balancer to wait"""
+    checks = {
+        'warm': readiness['warm'],
+        'storage': os.access(store.root, os.W_OK) and os.access(app.config['UPLOAD_FOLDER'], os.W_OK),
+    }
+    ready = all(checks.values())
+    return jsonify({'ready': ready, 'checks': checks,
+                    'warmup_seconds': readiness['warmup_seconds']}), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'admission': upload_limiter.metrics(),
+        'rate_limit': client_limiter.metrics(),
+        'dedup': dedup_index.stats(),
+        'page_cache': page_cache.stats(),
+        'jobs': job_queue.stats(),
+        'janitor': janitor.stats(),
+        'store': store.stats(),
+    })
 
 if __name__ == '__main__':
+    warm_up_pipeline()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""Asyncio variant of the upload and portfolio routes, served by Quart
+
+    hypercorn asgi:app --bind 127.0.0.1:8000 --workers 0
+
+Text extraction, parsing and rendering run in a process pool and blocking
+disk/SQLite calls in threads, so a single worker keeps many slow uploads in
+flight instead of one per thread. Storage, indexes, rate limits and
+configuration are shared with app.py.
+
+Progress of each upload is streamed as Server-Sent Events from
+/progress/<upload_id>; listeners are coroutines on the event loop, so
+thousands of open connections do not tie up threads.
+"""
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from quart import (Quart, render_template, request, redirect, url_for, send_from_directory, flash, abort, make_response,
+                   jsonify)
+
+from app import (app as sync_app, store, search_index, dedup_index, job_queue, client_limiter,
+                 allowed_file, find_identical_parse, active_page_cache)
+from utils.admission import AsyncAdaptiveLimiter, Overloaded
+from utils.html_generator import DEFAULT_THEME
+from utils.pipeline import extract_resume, render_resume
+from utils.progress import ProgressBroker, ProcessProgress, init_worker, start_pump, format_sse
+from utils.ingest import ingest_upload_async, IngestError
+from utils.worker import enqueue_upload, job_status as describe_job
+
+app = Quart(__name__)
+app.config.update({key: value for key, value in sync_app.config.items() if key not in app.config})
+app.config['SECRET_KEY'] = sync_app.config['SECRET_KEY']
+app.config['MAX_CONTENT_LENGTH'] = sync_app.config['MAX_CONTENT_LENGTH']
+app.config['PROCESS_POOL_WORKERS'] = os.cpu_count() or 2
+app.config['PROGRESS_KEEPALIVE_SECONDS'] = 15.0
+
+upload_limiter = AsyncAdaptiveLimiter(initial_limit=app.config['UPLOAD_INITIAL_CONCURRENCY'],
+                                      max_limit=app.config['UPLOAD_MAX_CONCURRENCY'],
+                                      target_latency=app.config['UPLOAD_TARGET_LATENCY_SECONDS'],
+                                      max_queue=app.config['UPLOAD_QUEUE_SIZE'],
+                                      max_wait=app.config['UPLOAD_QUEUE_TIMEOUT_SECONDS'])
+
+progress_broker = ProgressBroker(app.config['SECRET_KEY'].encode())
+
+# Pool workers are started by a fork server rather than forked from this
+# process, which by then runs threads (janitor, progress pump) and holds SQLite
+# connections; the server imports the pipeline once and forks workers from that
+pool_context = multiprocessing.get_context('forkserver')
+pool_context.set_forkserver_preload(['utils.pipeline'])
+
+process_pool = None
+progress_queue = None
+progress_pump = None
+
+@app.before_serving
+async def start_process_pool():
+    global process_pool, progress_queue, progress_pump
+    # Workers report progress on one shared queue, drained by a single thread
+    progress_queue = pool_context.Queue()
+    progress_broker.bind(asyncio.get_running_loop())
+    progress_pump = start_pump(progress_queue, progress_broker)
+    process_pool = ProcessPoolExecutor(max_workers=app.config['PROCESS_POOL_WORKERS'], mp_context=pool_context,
+                                       initializer=init_worker, initargs=(progress_queue,))
+
+@app.after_serving
+async def stop_process_pool():
+    await asyncio.to_thread(process_pool.shutdown)
+    progress_queue.put(None)
+    await asyncio.to_thread(progress_pump.join)
+
+async def run_in_process(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(process_pool, function, *args)
+
+async def overloaded_response(error):
+    return await make_response(str(error), error.status, {'Retry-After': str(error.retry_after)})
+
+@app.route('/')
+async def index():
+    # Each page view gets its own upload id, so the page must not be cached
+    html = await render_template('index.html', progress_events=True, upload_id=progress_broker.issue())
+    return html, 200, {'Cache-Control': 'no-store'}
+
+@app.route('/upload', methods=['POST'])
+async def upload_file():
+    if app.config['ADMISSION_ENABLED']:
+        try:
+            client_limiter.check(request.remote_addr or 'unknown')
+        except Overloaded as e:
+            return await overloaded_response(e)
+
+    # A declared length over the limit is refused unread, as werkzeug does for app.py
+    if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        abort(413)
+
+    # Read the body exactly once, as it arrives: the hash, the PDF header check
+    # and the size limit are those of app.py, and the file is spooled to a
+    # named file the process pool can open
+    unique_id = store.new_id()
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}.pdf")
+    spool = await asyncio.to_thread(open, file_path, 'w+b')
+    try:
+        try:
+            # The form sends upload_id ahead of the file, so a progress listener
+            # already waiting on a slow upload is kept from expiring meanwhile
+            upload = await ingest_upload_async(request.body, request.content_type, 'resume',
+                                               max_bytes=app.config['MAX_CONTENT_LENGTH'], spool=spool,
+                                               on_data=lambda fields: progress_broker.touch(fields.get('upload_id')))
+        finally:
+            await asyncio.to_thread(spool.close)
+    except IngestError as e:
+        await asyncio.to_thread(os.remove, file_path)
+        await flash('Please upload a valid PDF file' if e.status == 415 else str(e))
+        return redirect(url_for('index'))
+    except BaseException:
+        # Client gone or server stopping mid-upload
+        await asyncio.to_thread(os.remove, file_path)
+        raise
+
+    upload_id = upload.fields.get('upload_id')
+    if not progress_broker.valid(upload_id):
+        upload_id = None
+
+    def report(stage, **details):
+        if upload_id:
+            progress_broker.publish(upload_id, stage, **details)
+
+    if not allowed_file(upload.filename):
+        await asyncio.to_thread(os.remove, file_path)
+        report('error', message='Please upload a valid PDF file')
+        await flash('Please upload a valid PDF file')
+        return redirect(url_for('index'))
+
+    report('received', filename=upload.filename)
+    source_hash = upload.sha256
+    try:
+        # Processed by whichever standalone worker claims it, see utils/worker.py
+        if app.config['JOB_QUEUE_ENABLED']:
+            if await asyncio.to_thread(job_queue.backlog) >= app.config['JOB_QUEUE_MAX_DUE']:
+                raise Overloaded('Upload queue is full', 503, 30)
+
+            owner = request.remote_addr
+
+            def enqueue():
+                with open(file_path, 'rb') as source:
+                    return enqueue_upload(job_queue, store, source, owner, source_hash,
+                                          app.config['DEDUP_ENABLED'])
+
+            job_id = await asyncio.to_thread(enqueue)
+            report('queued')
+            return redirect(url_for('get_job', job_id=job_id), code=303)
+
+        progress = ProcessProgress(upload_id) if upload_id else None
+
+        async def process():
+            # Only a byte-identical earlier upload has its parse reused
+            identical = await asyncio.to_thread(find_identical_parse, source_hash)
+            if identical is not None:
+                resume_data, signature = identical
+                extract_seconds = 0.0
+            else:
+                resume_data, signature, extract_seconds = await run_in_process(
+                    extract_resume, file_path, app.config['DEDUP_ENABLED'], progress, active_page_cache())
+                if signature is not None:
+                    # Near duplicates are only counted, never substituted
+                    await asyncio.to_thread(dedup_index.find, signature)
+            variants, render_seconds = await run_in_process(render_resume, resume_data, progress)
+            return signature, extract_seconds, resume_data, variants, render_seconds
+
+        report('queued')
+        if app.config['ADMISSION_ENABLED']:
+            async with upload_limiter.async_slot():
+                signature, extract_seconds, resume_data, variants, render_seconds = await process()
+        else:
+            signature, extract_seconds, resume_data, variants, render_seconds = await process()
+        portfolio_html = variants.pop(DEFAULT_THEME)
+
+        owner = request.remote_addr
+
+        def persist():
+            record = store.save(unique_id, portfolio_html,
+                                owner=owner,
+                                source_hash=source_hash,
+                                extract_seconds=extract_seconds,
+                                render_seconds=render_seconds,
+                                resume_data=resume_data,
+                                variants=variants)
+            search_index.add(unique_id, resume_data)
+            if signature is not None:
+                dedup_index.add(unique_id, signature)
+            return record
+
+        report('saving')
+        record = await asyncio.to_thread(persist)
+        portfolio_filename = record['filename']
+        report('done', url=url_for('view_portfolio', filename=portfolio_filename))
+        theme_filenames = {theme: os.path.basename(store.variant_relpath(portfolio_filename, theme))
+                           for theme in variants}
+
+        return await render_template('result.html',
+                                     portfolio_filename=portfolio_filename,
+                                     theme_filenames=theme_filenames,
+                                     unique_id=unique_id)
+
+    except Overloaded as e:
+        report('error', message=str(e))
+        return await overloaded_response(e)
+
+    except Exception as e:
+        report('error', message=f'Error processing file: {str(e)}')
+        await flash(f'Error processing file: {str(e)}')
+        return redirect(url_for('index'))
+
+    finally:
+        if os.path.exists(file_path):
+            await asyncio.to_thread(os.remove, file_path)
+
+@app.route('/progress/<upload_id>')
+async def upload_progress(upload_id):
+    if not progress_broker.valid(upload_id):
+        abort(404)
+
+    async def events():
+        async for event in progress_broker.subscribe(upload_id, app.config['PROGRESS_KEEPALIVE_SECONDS']):
+            yield ': keepalive\n\n' if event is None else format_sse(event)
+
+    response = await make_response(events(), 200, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    # Streams last as long as the upload, not Quart's default response timeout
+    response.timeout = None
+    return response
+
+@app.route('/jobs/<job_id>')
+async def get_job(job_id):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        abort(404)
+    status = describe_job(job)
+    if request.accept_mimetypes.best_match(['application/json', 'text/html']) != 'text/html':
+        return jsonify(status)
+    if job['state'] == 'done':
+        return await render_template('result.html',
+                                     portfolio_filename=job['result']['portfolio_filename'],
+                                     theme_filenames=job['result']['theme_filenames'],
+                                     unique_id=job_id)
+    if job['state'] == 'dead':
+        await flash(f"Error processing file: {job['error']}")
+        return redirect(url_for('index'))
+    return await render_template('job.html', job=status)
+
+@app.route('/portfolio/<filename>')
+async def view_portfolio(filename):
+    record = await asyncio.to_thread(store.lookup, filename)
+    if record is None:
+        abort(404)
+    await asyncio.to_thread(store.touch, record['id'])
+    return await send_from_directory(store.root, record['relpath'])
+
+@app.route('/download/<filename>')
+async def download_portfolio(filename):
+    record = await asyncio.to_thread(store.lookup, filename)
+    if record is None:
+        abort(404)
+    return await send_from_directory(store.root, record['relpath'], as_attachment=True,
+                                     attachment_filename=record['filename'])
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,75 @@
+"""Sync (Flask, app.py) vs async (Quart, asgi.py) routes under the same open-loop load
+
+    python benchmarks/bench_async.py --rates 2,4,8 --concurrency 64 --duration 20
+
+Each variant is started fresh in its own scratch directory and driven with
+the same synthetic resumes and arrival schedule as benchmarks/load_test.py.
+Server CPU is only that of the main process; time spent in the async
+variant's process pool is not included.
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import (LoadGenerator, ProcessSampler, SERVER_LAUNCHER, describe_caches, free_port,
+                       parse_weights, start_server)
+from utils.sample_pdf import synthetic_resume_pdf
+
+ASYNC_LAUNCHER = """
+import sys
+import asyncio
+sys.path.insert(0, {root!r})
+{cache_settings}
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+import asgi as service
+if not {keep_rate_limit!r}:
+    service.client_limiter.rate = service.client_limiter.burst = 1e9
+config = Config()
+config.bind = ['127.0.0.1:{port}']
+asyncio.run(serve(service.app, config))
+"""
+
+VARIANTS = {'sync': SERVER_LAUNCHER, 'async': ASYNC_LAUNCHER}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rates', default='2,4,8')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--mix', default='upload=3,portfolio=1')
+    parser.add_argument('--pdf-size', default='medium')
+    parser.add_argument('--distinct-pdfs', type=int, default=30)
+    parser.add_argument('--dedup', action='store_true', help='leave upload dedup on')
+    parser.add_argument('--page-cache', action='store_true', help='leave the page cache on')
+    args = parser.parse_args()
+
+    pdfs = [synthetic_resume_pdf(seed, args.pdf_size) for seed in range(args.distinct_pdfs)]
+    rates = [float(r) for r in args.rates.split(',')]
+    caches = {'dedup': args.dedup, 'page_cache': args.page_cache}
+    print(f"Caches: {describe_caches(caches)}")
+
+    print(f"{'variant':>8} {'offered':>8} {'achieved':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7} {'cpu %':>6} {'rss MB':>7}")
+    for name, launcher in VARIANTS.items():
+        port = free_port()
+        server = start_server(port, tempfile.mkdtemp(prefix=f'bench-{name}-'), False, launcher, caches)
+        try:
+            generator = LoadGenerator(f'http://127.0.0.1:{port}', pdfs, parse_weights(args.mix))
+            generator.seed(3)
+            for rate in rates:
+                with ProcessSampler(server.pid) as sampler:
+                    result = generator.run(rate, args.concurrency, args.duration)
+                cpu = f"{sampler.cpu_percent:6.0f}" if sampler.cpu_percent is not None else f"{'-':>6}"
+                print(f"{name:>8} {rate:8.1f} {result['throughput_rps']:9.2f} {result['p50_ms']:9.0f} "
+                      f"{result['p90_ms']:9.0f} {result['p99_ms']:9.0f} {100 * result['error_rate']:6.1f}% "
+                      f"{cpu} {sampler.peak_rss / 2**20:7.0f}")
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Size reduction and CPU cost of minifying generated portfolios
+
+    python benchmarks/bench_minify.py --iterations 500 [resume.pdf ...]
+
+Renders the sample resume (or each given PDF's parse) into every theme with
+and without minification, and reports bytes before and after, also gzipped as
+they would go over the wire, next to the time to render and to minify one
+portfolio.
+"""
+import os
+import sys
+import gzip
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_render import SAMPLE_DATA
+from utils.html_generator import THEMES, create_portfolio_html
+from utils.minify import minify_html
+from utils.pipeline import extract_resume
+
+def per_call_ms(func, iterations: int) -> float:
+    func()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdfs', nargs='*', help='resumes to parse and render instead of the sample data')
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    resumes = [('sample', SAMPLE_DATA)]
+    if args.pdfs:
+        resumes = [(os.path.basename(path), extract_resume(path, with_signature=False)[0]) for path in args.pdfs]
+
+    totals = {'raw': 0, 'minified': 0, 'raw_gzip': 0, 'minified_gzip': 0, 'render_ms': 0.0, 'minify_ms': 0.0}
+    print(f"{'resume':<20}{'theme':<10}{'bytes':>9}{'min':>9}{'saved':>8}{'gzip':>8}{'min gz':>8}"
+          f"{'render ms':>11}{'minify ms':>11}")
+    for label, data in resumes:
+        for theme in THEMES:
+            html = create_portfolio_html(data, theme, minify=False)
+            minified = minify_html(html)
+            raw_gzip = len(gzip.compress(html.encode('utf-8')))
+            minified_gzip = len(gzip.compress(minified.encode('utf-8')))
+            render_ms = per_call_ms(lambda: create_portfolio_html(data, theme, minify=False), args.iterations)
+            minify_ms = per_call_ms(lambda: minify_html(html), args.iterations)
+            raw, small = len(html.encode('utf-8')), len(minified.encode('utf-8'))
+            print(f"{label[:19]:<20}{theme:<10}{raw:>9}{small:>9}{1 - small / raw:>8.1%}{raw_gzip:>8}"
+                  f"{minified_gzip:>8}{render_ms:>11.3f}{minify_ms:>11.3f}")
+            for key, value in (('raw', raw), ('minified', small), ('raw_gzip', raw_gzip),
+                               ('minified_gzip', minified_gzip), ('render_ms', render_ms), ('minify_ms', minify_ms)):
+                totals[key] += value
+
+    count = len(resumes) * len(THEMES)
+    print(f"\n{count} portfolios: {1 - totals['minified'] / totals['raw']:.1%} smaller "
+          f"({1 - totals['minified_gzip'] / totals['raw_gzip']:.1%} gzipped); minifying costs "
+          f"{totals['minify_ms'] / count:.3f} ms per portfolio, "
+          f"{totals['minify_ms'] / totals['render_ms']:.0%} of rendering it")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare Jinja2 portfolio rendering against the original f-string renderer
+
+The f-string implementation is loaded from the commit that preceded the move to
+templates, so the comparison keeps working after the old code is gone.
+
+    python benchmarks/bench_render.py --iterations 2000
+"""
+import os
+import sys
+import time
+import types
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import html_generator
+
+SAMPLE_DATA = {
+    'name': 'Jane Smith',
+    'email': 'jane.smith@gmail.com',
+    'phone': '(555) 123-4567',
+    'summary': 'Backend engineer with eight years of experience building data platforms.',
+    'skills': ['Python', 'Docker', 'AWS', 'SQL', 'Kubernetes', 'Go', 'Redis', 'Kafka'],
+    'experience': [
+        {'title': f'Engineer {i}', 'company': f'Company {i}', 'duration': '2019 - 2023',
+         'description': 'Designed and operated services handling millions of requests per day.'}
+        for i in range(4)
+    ],
+    'education': [{'degree': 'BSc Computer Science', 'institution': 'State University', 'year': '2015'}],
+    'projects': [
+        {'name': f'Project {i}', 'description': 'A tool that does useful things.', 'technologies': 'Python'}
+        for i in range(3)
+    ],
+}
+
+def load_fstring_renderer(rev: str = None):
+    """Load create_portfolio_html from the revision before templates/portfolio was added"""
+    if rev is None:
+        added = subprocess.check_output(
+            ['git', 'log', '--diff-filter=A', '--format=%H', '--', 'templates/portfolio/portfolio.html'],
+            cwd=ROOT, text=True
+        ).split()
+        if not added:
+            return None
+        rev = f"{added[-1]}^"
+    source = subprocess.check_output(['git', 'show', f'{rev}:utils/html_generator.py'], cwd=ROOT, text=True)
+    module = types.ModuleType('html_generator_fstring')
+    exec(compile(source, 'html_generator_fstring.py', 'exec'), module.__dict__)
+    return module.create_portfolio_html
+
+def bench(render, iterations: int) -> float:
+    render(SAMPLE_DATA)  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render(SAMPLE_DATA)
+    return iterations / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--baseline-rev', default=None, help='git revision holding the f-string renderer')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    html_generator.create_portfolio_html(SAMPLE_DATA, minify=False)
+    print(f"first render (template load/compile): {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    # Unminified, like the f-string output it is compared with
+    jinja_rate = bench(lambda data: html_generator.create_portfolio_html(data, minify=False), args.iterations)
+    print(f"jinja2:   {jinja_rate:10.1f} renders/s")
+
+    fstring_render = load_fstring_renderer(args.baseline_rev)
+    if fstring_render is None:
+        print("f-string baseline not found in git history")
+        return
+    fstring_rate = bench(fstring_render, args.iterations)
+    print(f"f-string: {fstring_rate:10.1f} renders/s")
+    print(f"ratio:    {jinja_rate / fstring_rate:10.2f}x")
+
+if __name__ == "__main__":
+    main()
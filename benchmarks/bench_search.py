@@ -0,0 +1,101 @@
+"""Search latency against the under-10 ms target on a large index
+
+    python benchmarks/bench_search.py --docs 1000000 --index /tmp/search-1m.sqlite3
+
+Fills a search index with synthetic resumes (names, skills, titles and
+companies from the sample data, plus a long tail of rare skills so that some
+terms match only a handful of documents), then times the first page and a
+keyset-paginated later page of a set of queries. Exits non-zero if any
+query's p95 is over the budget. An existing --index file of the right size is
+reused, since building a million-document index takes a few minutes.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.sample_pdf import COMPANIES, FIRST_NAMES, LAST_NAMES, SCHOOLS, SKILLS, TITLES
+from utils.search_index import SearchIndex, index_terms
+
+QUERIES = ['kofi', 'python', 'pyth*', 'company:acme OR company:hooli', 'python -java', 'skill:python aws',
+           'skill:rare42', 'skill:rare42 python', '(java OR go) -python kim', 'kofi okafor -linux']
+
+TAIL_SKILLS = 10000
+
+def synthetic_resume(rng: random.Random) -> dict:
+    return {
+        'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        'skills': rng.sample(SKILLS, 8) + [f'rare{rng.randrange(TAIL_SKILLS)}'],
+        'experience': [{'title': rng.choice(TITLES), 'company': rng.choice(COMPANIES)} for _ in range(2)],
+        'education': [{'degree': 'Bachelor of Science', 'institution': rng.choice(SCHOOLS)}],
+    }
+
+def build(index: SearchIndex, docs: int, batch: int = 10000) -> None:
+    conn = index._connect()
+    present = conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+    if present == docs:
+        return
+    conn.executescript('DELETE FROM postings; DELETE FROM docs;')
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for first in range(1, docs + 1, batch):
+        resumes = [(doc, synthetic_resume(rng)) for doc in range(first, min(first + batch, docs + 1))]
+        with conn:
+            conn.executemany('INSERT INTO docs (doc, portfolio_id, name, created) VALUES (?, ?, ?, ?)',
+                             [(doc, f'p{doc}', data['name'], time.time()) for doc, data in resumes])
+            conn.executemany('INSERT INTO postings (term, doc) VALUES (?, ?)',
+                             [(term, doc) for doc, data in resumes for term in index_terms(data)])
+    conn.execute('ANALYZE')
+    print(f"built {docs} documents in {time.perf_counter() - started:.1f}s")
+
+def timed_ms(func) -> float:
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=200000)
+    parser.add_argument('--index', default=None, help='index file to build or reuse (default: a temp file)')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=10.0)
+    parser.add_argument('queries', nargs='*', default=QUERIES)
+    args = parser.parse_args()
+
+    if args.index is None:
+        import tempfile
+        args.index = os.path.join(tempfile.mkdtemp(), 'search.sqlite3')
+    index = SearchIndex(args.index)
+    build(index, args.docs)
+
+    over = []
+    print(f"{'query':<32}{'total':>8}{'p50 ms':>9}{'p95 ms':>9}{'page 5 p95':>12}")
+    for query in args.queries:
+        first = index.search(query)
+        cursor = first['next_cursor']
+        for _ in range(4):
+            if cursor is None:
+                break
+            cursor = index.search(query, before=cursor)['next_cursor']
+        first_ms = sorted(timed_ms(lambda: index.search(query)) for _ in range(args.runs))
+        later_ms = sorted(timed_ms(lambda: index.search(query, before=cursor)) for _ in range(args.runs)) \
+            if cursor is not None else [0.0]
+        p95 = lambda samples: samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        total = f"{first['total']}{'+' if first['total_capped'] else ''}"
+        print(f"{query[:31]:<32}{total:>8}{statistics.median(first_ms):>9.2f}{p95(first_ms):>9.2f}"
+              f"{p95(later_ms):>12.2f}")
+        if max(p95(first_ms), p95(later_ms)) > args.budget_ms:
+            over.append(query)
+
+    if over:
+        print(f"\nover the {args.budget_ms:g} ms budget at {args.docs} documents: {', '.join(over)}")
+        sys.exit(1)
+    print(f"\nall queries within {args.budget_ms:g} ms at {args.docs} documents")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Check that every resume extractor stays linear on crafted pathological input
+
+    python benchmarks/fuzz_extractors.py --size 20000 --scale 4
+
+Each extractor in utils/pdf_parser.py (ResumeParser) and utils/html_generator.py
+is run on inputs built to provoke regex backtracking: long runs of email,
+phone and whitespace characters, header keywords followed by whitespace, and
+random mixes of all of them. Every input is timed at --size and at --scale
+times that; linear code takes about --scale times longer, quadratic code about
+--scale squared. The script exits non-zero if any extractor grows faster than
+--max-ratio or takes longer than --budget seconds on the larger input.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import html_generator
+from utils.pdf_parser import ResumeParser
+
+EMAIL_CHARS = 'a.%+-_0'
+PHONE_CHARS = '0123456789+-.() '
+WHITESPACE = ' \t\n\r\f'
+
+def _random(alphabet, seed=0):
+    def build(n):
+        generator = random.Random(seed)
+        return ''.join(generator.choice(alphabet) for _ in range(n))
+    return build
+
+def _repeat(unit, prefix='', suffix=''):
+    return lambda n: prefix + unit * (n // len(unit)) + suffix
+
+# name -> function building an input of about n characters
+INPUTS = {
+    'word run': _repeat('a'),
+    'dotted run': _repeat('a.'),
+    'email local part': _repeat('a.', suffix='@'),
+    'at signs': _repeat('a@'),
+    'email domain': _repeat('a.', prefix='x@'),
+    'email chars': _random(EMAIL_CHARS + '@'),
+    'digit run': _repeat('1'),
+    'digit groups': _repeat('123 '),
+    'country codes': _repeat('+1 '),
+    'phone chars': _random(PHONE_CHARS),
+    'space run': _repeat(' ', suffix='x'),
+    'newline run': _repeat('\n', suffix='x'),
+    'whitespace mix': _random(WHITESPACE + 'x'),
+    'header then spaces': _repeat(' ', prefix='Summary', suffix='x'),
+    'header then whitespace': _repeat(' \n', prefix='Skills', suffix='x'),
+    'header lines': _repeat('Experience\n'),
+    'technologies then newlines': _repeat('\n', prefix='Technologies:'),
+    'title case': _repeat('Aa '),
+    'bullets': _repeat('•-*'),
+    'years': _repeat('2019'),
+    'everything': _random(EMAIL_CHARS + PHONE_CHARS + WHITESPACE + '@:•-*Aa'),
+}
+
+def extractors():
+    """name -> callable taking a whole text"""
+    parser = ResumeParser()
+    html = {
+        name: getattr(html_generator, name)
+        for name in ('parse_resume_data', 'extract_name', 'extract_email', 'extract_phone',
+                     'split_into_sections', 'extract_skills', 'extract_experience', 'extract_education',
+                     'extract_projects', 'extract_year', 'extract_technologies', 'clean_text')
+    }
+    resume_parser = {
+        name: getattr(parser, name)
+        for name in ('clean_text', 'parse_resume_data', 'extract_name', 'extract_email', 'extract_phone',
+                     'extract_summary', 'extract_experience', 'extract_education', 'extract_skills',
+                     'extract_projects', 'extract_certifications', 'clean_description')
+    }
+    # Single-line helpers are handed the whole text as one line
+    resume_parser.update({
+        name: getattr(parser, name)
+        for name in ('clean_line', 'is_name_line', 'is_job_title_line', 'is_date_line',
+                     'parse_job_title_company', 'parse_education_line', 'match_section_header',
+                     'find_common_skills', 'is_project_title_line')
+    })
+    resume_parser['parse_resume_lines'] = lambda text: parser.parse_resume_lines(
+        parser.iter_clean_lines([text]))
+
+    named = {f'html_generator.{name}': function for name, function in html.items()}
+    named.update({f'ResumeParser.{name}': function for name, function in resume_parser.items()})
+    return named
+
+def timed(function, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=20000, help='characters in the smaller input')
+    parser.add_argument('--scale', type=int, default=4, help='the larger input is this many times bigger')
+    parser.add_argument('--max-ratio', type=float, default=None,
+                        help='largest allowed time ratio (default: 2 x scale)')
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds allowed on the larger input')
+    parser.add_argument('--floor', type=float, default=0.02,
+                        help='ratios are not judged when the larger input takes less than this')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', default='', help='substring filter on extractor names')
+    parser.add_argument('--verbose', action='store_true', help='print every combination, not just failures')
+    args = parser.parse_args()
+    max_ratio = args.max_ratio or 2.0 * args.scale
+
+    failures = []
+    worst = {}
+    for name, function in extractors().items():
+        if args.only not in name:
+            continue
+        for input_name, build in INPUTS.items():
+            small_text, large_text = build(args.size), build(args.size * args.scale)
+            small = timed(function, small_text, args.repeat)
+            large = timed(function, large_text, 1 if small > args.budget else args.repeat)
+            ratio = large / small if small > 0 else float('inf')
+            failed = large > args.budget or (large >= args.floor and ratio > max_ratio)
+            if failed:
+                failures.append((name, input_name, small, large, ratio))
+            if args.verbose or failed:
+                print(f"{'FAIL' if failed else 'ok':>4} {name:<42} {input_name:<28} "
+                      f"{1000 * small:9.2f} ms {1000 * large:9.2f} ms  x{ratio:5.1f}")
+            if large > worst.get(name, (0.0, ''))[0]:
+                worst[name] = (large, input_name)
+
+    print(f"\nSlowest input per extractor at {args.size * args.scale} characters:")
+    for name, (seconds, input_name) in sorted(worst.items(), key=lambda item: -item[1][0]):
+        print(f"  {name:<42} {1000 * seconds:9.2f} ms  ({input_name})")
+    if failures:
+        print(f"\n{len(failures)} extractor/input combinations grew faster than x{max_ratio:g} "
+              f"or exceeded {args.budget:g}s")
+        sys.exit(1)
+    print('\nAll extractors stayed within bounds')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""Open-loop load test of /upload, /portfolio and /download against a local server
+
+    python benchmarks/load_test.py --rates 1,2,4,8 --concurrency 8,32 --duration 20
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --server-pid 1234 --rates 5,10
+
+Requests arrive as a Poisson process at each target rate regardless of how
+fast the server answers, and latency is measured from the scheduled arrival
+time. Slow responses therefore show up as latency instead of silently
+lowering the offered load. Concurrency caps the number of requests in
+flight; arrivals beyond it wait client-side, and that wait also counts as
+latency.
+
+A started server has upload dedup and the page cache turned off, since the
+synthetic resumes repeat (--dedup and --page-cache turn them back on); the
+report says which caches were active.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.sample_pdf import synthetic_resume_pdf, SIZES
+
+PORTFOLIO_LINK_RE = re.compile(rb'/portfolio/(portfolio_[0-9a-f]+\.html)')
+
+# Every request comes from 127.0.0.1, so the launcher lifts the per-client
+# rate limit; the adaptive concurrency limit stays in place. The same few
+# synthetic PDFs are uploaded over and over, so dedup and the page cache
+# would answer most uploads without parsing; they are off unless asked for.
+CACHE_SETTINGS = """
+import app
+app.app.config['DEDUP_ENABLED'] = {dedup!r}
+app.app.config['PAGE_CACHE_ENABLED'] = {page_cache!r}
+"""
+
+SERVER_LAUNCHER = """
+import sys
+sys.path.insert(0, {root!r})
+{cache_settings}
+import app as service
+if not {keep_rate_limit!r}:
+    service.client_limiter.rate = service.client_limiter.burst = 1e9
+service.app.run(host='127.0.0.1', port={port}, threaded=True, debug=False, use_reloader=False)
+"""
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def multipart_body(field: str, filename: str, payload: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process from /proc while a run is in progress"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.peak_rss = 0
+        self._cpu_start = self._wall_start = None
+        self.cpu_percent = None
+
+    def _cpu_seconds(self) -> float:
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime and stime are fields 14 and 15 of the full line
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def _rss_bytes(self) -> int:
+        with open(f'/proc/{self.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.peak_rss = max(self.peak_rss, self._rss_bytes())
+            except OSError:
+                return
+
+    def __enter__(self):
+        if self.pid and os.path.exists(f'/proc/{self.pid}'):
+            self._cpu_start, self._wall_start = self._cpu_seconds(), time.monotonic()
+            self.peak_rss = self._rss_bytes()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self.cpu_percent = 100 * (self._cpu_seconds() - self._cpu_start) / (time.monotonic() - self._wall_start)
+
+class LoadGenerator:
+    def __init__(self, base_url: str, pdfs: List[bytes], mix: Dict[str, float], timeout: float = 60.0):
+        self.base_url = base_url.rstrip('/')
+        self.pdfs = pdfs
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.timeout = timeout
+        self.portfolios: List[str] = []
+        self._lock = threading.Lock()
+
+    def _request(self, operation: str, rng: random.Random) -> Tuple[int, Optional[bytes]]:
+        if operation != 'upload' and self.portfolios:
+            with self._lock:
+                filename = rng.choice(self.portfolios)
+            request = urllib.request.Request(f'{self.base_url}/{operation}/{filename}')
+        else:
+            operation = 'upload'
+            body, content_type = multipart_body('resume', 'resume.pdf', rng.choice(self.pdfs))
+            request = urllib.request.Request(f'{self.base_url}/upload', data=body,
+                                             headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            return e.code, None
+        except (urllib.error.URLError, socket.timeout, ConnectionError):
+            return 0, None
+        if operation == 'upload':
+            match = PORTFOLIO_LINK_RE.search(data)
+            if match is None:
+                # The app redirects back to the form with a flash message on failure
+                return 500, None
+            with self._lock:
+                self.portfolios.append(match.group(1).decode())
+        return status, data
+
+    def seed(self, uploads: int) -> None:
+        rng = random.Random(0)
+        for _ in range(uploads):
+            self._request('upload', rng)
+
+    def run(self, rate: float, concurrency: int, duration: float, seed: int = 0) -> Dict[str, Any]:
+        rng = random.Random(seed)
+        results: List[tuple] = []
+        results_lock = threading.Lock()
+
+        def issue(operation: str, scheduled: float, worker_seed: int) -> None:
+            status, _ = self._request(operation, random.Random(worker_seed))
+            latency = time.monotonic() - scheduled
+            with results_lock:
+                results.append((operation, status, latency))
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            scheduled = started
+            while True:
+                scheduled += rng.expovariate(rate)
+                if scheduled - started > duration:
+                    break
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                operation = rng.choices(self.operations, self.weights)[0]
+                executor.submit(issue, operation, scheduled, rng.getrandbits(32))
+        elapsed = time.monotonic() - started
+
+        summary = self.summarize(results, elapsed)
+        summary['per_operation'] = {
+            operation: self.summarize([r for r in results if r[0] == operation], elapsed)
+            for operation in sorted({r[0] for r in results})
+        }
+        return summary
+
+    @staticmethod
+    def summarize(results: List[tuple], elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(latency for _, status, latency in results if 200 <= status < 400)
+        statuses: Dict[str, int] = {}
+        for _, status, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = len(results) - len(latencies)
+        return {
+            'requests': len(results),
+            'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+            'error_rate': errors / len(results) if results else 0.0,
+            'statuses': statuses,
+            'p50_ms': 1000 * percentile(latencies, 50),
+            'p90_ms': 1000 * percentile(latencies, 90),
+            'p99_ms': 1000 * percentile(latencies, 99),
+            'max_ms': 1000 * latencies[-1] if latencies else float('nan'),
+        }
+
+def start_server(port: int, workdir: str, keep_rate_limit: bool, launcher: str = SERVER_LAUNCHER,
+                 caches: Optional[Dict[str, bool]] = None) -> subprocess.Popen:
+    caches = caches or {'dedup': False, 'page_cache': False}
+    code = launcher.format(root=ROOT, port=port, keep_rate_limit=keep_rate_limit,
+                           cache_settings=CACHE_SETTINGS.format(**caches))
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=workdir,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError('Server exited during startup')
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('Server did not start listening within 30s')
+
+def describe_caches(caches: Optional[Dict[str, bool]]) -> str:
+    if caches is None:
+        return 'as configured on the target server'
+    return ', '.join(f"{name.replace('_', ' ')} {'on' if enabled else 'off'}" for name, enabled in caches.items())
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='target an already running server instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='pid to sample CPU/RSS from when using --url')
+    parser.add_argument('--rates', default='1,2,4,8', help='offered requests per second, one run each')
+    parser.add_argument('--concurrency', default='16', help='max in-flight requests, one curve each')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds per run')
+    parser.add_argument('--mix', default='upload=1,portfolio=4,download=1')
+    parser.add_argument('--pdf-mix', default='small=3,medium=2,large=1')
+    parser.add_argument('--distinct-pdfs', type=int, default=50, help='distinct synthetic resumes to draw from')
+    parser.add_argument('--seed-uploads', type=int, default=5, help='uploads made before measuring')
+    parser.add_argument('--keep-rate-limit', action='store_true', help="keep the app's per-client rate limit")
+    parser.add_argument('--dedup', action='store_true', help='leave upload dedup on in the started server')
+    parser.add_argument('--page-cache', action='store_true', help='leave the page cache on in the started server')
+    parser.add_argument('--json', help='write all results to this file')
+    args = parser.parse_args()
+
+    pdf_mix = parse_weights(args.pdf_mix)
+    unknown = set(pdf_mix) - set(SIZES)
+    if unknown:
+        parser.error(f"unknown PDF sizes: {', '.join(sorted(unknown))}")
+    rng = random.Random(42)
+    sizes = rng.choices(list(pdf_mix), list(pdf_mix.values()), k=args.distinct_pdfs)
+    pdfs = [synthetic_resume_pdf(seed, size) for seed, size in enumerate(sizes)]
+
+    server = None
+    workdir = None
+    caches = None
+    if args.url:
+        base_url, pid = args.url, args.server_pid
+    else:
+        workdir = tempfile.mkdtemp(prefix='loadtest-')
+        port = free_port()
+        caches = {'dedup': args.dedup, 'page_cache': args.page_cache}
+        server = start_server(port, workdir, args.keep_rate_limit, caches=caches)
+        base_url, pid = f'http://127.0.0.1:{port}', server.pid
+        print(f"Started server on {base_url} (pid {pid}, data in {workdir})")
+    print(f"Caches: {describe_caches(caches)}")
+
+    curves = []
+    try:
+        generator = LoadGenerator(base_url, pdfs, parse_weights(args.mix))
+        generator.seed(args.seed_uploads)
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            print(f"\nconcurrency={concurrency}")
+            print(f"{'offered':>8} {'achieved':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+                  f"{'errors':>7} {'cpu %':>6} {'rss MB':>7}")
+            points = []
+            for rate in (float(r) for r in args.rates.split(',')):
+                with ProcessSampler(pid) as sampler:
+                    result = generator.run(rate, concurrency, args.duration)
+                result.update({'offered_rps': rate, 'concurrency': concurrency,
+                               'server_cpu_percent': sampler.cpu_percent,
+                               'server_peak_rss_bytes': sampler.peak_rss or None})
+                points.append(result)
+                cpu = f"{sampler.cpu_percent:6.0f}" if sampler.cpu_percent is not None else f"{'-':>6}"
+                rss = f"{sampler.peak_rss / 2**20:7.0f}" if sampler.peak_rss else f"{'-':>7}"
+                print(f"{rate:8.1f} {result['throughput_rps']:9.2f} {result['p50_ms']:9.0f} "
+                      f"{result['p90_ms']:9.0f} {result['p99_ms']:9.0f} {100 * result['error_rate']:6.1f}% "
+                      f"{cpu} {rss}")
+            curves.append({'concurrency': concurrency, 'points': points})
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'url': base_url, 'mix': args.mix, 'pdf_mix': args.pdf_mix, 'caches': caches,
+                       'duration': args.duration, 'curves': curves}, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+if __name__ == "__main__":
+    main()
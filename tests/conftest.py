@@ -0,0 +1,32 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope='session')
+def service(tmp_path_factory):
+    """app.py with its upload and portfolio folders in a temporary directory"""
+    workdir = tmp_path_factory.mktemp('service')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        module = importlib.import_module('app')
+        module.app.config['TESTING'] = True
+        module.app.config['ADMISSION_ENABLED'] = False
+        yield module
+    finally:
+        module.janitor.stop()
+        os.chdir(cwd)
+
+@pytest.fixture
+def client(service):
+    return service.app.test_client()
+
+@pytest.fixture(scope='session')
+def async_service(service):
+    """asgi.py on top of the same app.py instance"""
+    return importlib.import_module('asgi')
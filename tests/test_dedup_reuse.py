@@ -0,0 +1,48 @@
+import io
+import re
+
+from utils.sample_pdf import build_pdf, synthetic_resume_lines
+
+def resume_pdf(name, email, phone):
+    lines = synthetic_resume_lines(7, 'large')
+    lines[:3] = [name, email, phone]
+    return build_pdf(lines)
+
+def upload(client, pdf):
+    response = client.post('/upload', data={'resume': (io.BytesIO(pdf), 'resume.pdf')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.data
+    return re.search(r'/portfolio/([^"\s]+\.html)', response.get_data(as_text=True)).group(1)
+
+def stored(service, filename):
+    record = service.store.lookup(filename)
+    with open(service.store.abspath(record['relpath']), encoding='utf-8') as f:
+        return f.read(), service.store.load_resume_data(record)
+
+def test_near_duplicate_keeps_its_own_contact_details(service, client):
+    duplicates = service.dedup_index.stats()['duplicates']
+    first = upload(client, resume_pdf('Jane Smith', 'jane.smith@northwind.io', '(555) 201-3344'))
+    second = upload(client, resume_pdf('Kofi Okafor', 'kofi.okafor@contoso.dev', '(555) 877-9012'))
+    # The second resume is a near duplicate of the first...
+    assert service.dedup_index.stats()['duplicates'] == duplicates + 1
+
+    # ...but each portfolio, stored parse and search entry is built from its own upload
+    for filename, own, other in ((first, 'jane.smith@northwind.io', 'kofi.okafor@contoso.dev'),
+                                 (second, 'kofi.okafor@contoso.dev', 'jane.smith@northwind.io')):
+        html, data = stored(service, filename)
+        assert own in html and other not in html
+        assert data['email'] == own
+    hits = service.search_index.search('jane')['results']
+    assert [hit['portfolio_id'] for hit in hits] == [service.store.lookup(first)['id']]
+
+def test_identical_upload_reuses_parse_without_extracting(service, client, monkeypatch):
+    pdf = resume_pdf('Maria Silva', 'maria.silva@fabrikam.co', '(555) 450-1122')
+    first = upload(client, pdf)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('identical upload was extracted again')
+    monkeypatch.setattr(service, 'extract_resume', fail)
+    second = upload(client, pdf)
+
+    assert first != second
+    assert stored(service, first)[1] == stored(service, second)[1]
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fuzz_extractors import INPUTS, extractors, timed
+
+# Smaller than the benchmark's defaults to keep the suite quick; a quadratic
+# extractor still takes about SCALE ** 2 times longer on the larger input
+SIZE = 5000
+SCALE = 4
+MAX_RATIO = 2.0 * SCALE
+# Seconds any extractor may take on any SIZE * SCALE character input
+BUDGET = 0.5
+# Ratios of faster runs are mostly timer noise
+FLOOR = 0.01
+
+EXTRACTORS = extractors()
+
+@pytest.mark.parametrize('name', list(EXTRACTORS))
+def test_extractor_stays_linear_and_within_budget(name):
+    function = EXTRACTORS[name]
+    slow = []
+    for input_name, build in INPUTS.items():
+        small = timed(function, build(SIZE), 3)
+        large = timed(function, build(SIZE * SCALE), 1 if small > BUDGET else 3)
+        if large > BUDGET or (large >= FLOOR and large / max(small, 1e-9) > MAX_RATIO):
+            slow.append(f'{input_name}: {1000 * small:.1f} ms -> {1000 * large:.1f} ms')
+    assert not slow, f'{name} is slow or superlinear on: ' + '; '.join(slow)
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import io
+import threading
+
+import pytest
+from quart.datastructures import FileStorage
+
+from utils.ingest import ingest_upload_async
+from utils.sample_pdf import synthetic_resume_pdf
+
+PDF = synthetic_resume_pdf(1)
+
+# Each rejected upload gets the same status, redirect and message from both apps
+BAD_UPLOADS = {
+    'not a pdf': ({'resume': (b'MZ' + b'\0' * 5000, 'resume.pdf')}, 'Please upload a valid PDF file'),
+    'pdf header too late': ({'resume': (b' ' * 1024 + PDF, 'resume.pdf')}, 'Please upload a valid PDF file'),
+    'wrong extension': ({'resume': (PDF, 'resume.txt')}, 'Please upload a valid PDF file'),
+    'no file': ({'other': (PDF, 'resume.pdf')}, 'No file selected'),
+    'empty filename': ({'resume': (PDF, '')}, 'No file selected'),
+}
+
+def sync_post(service, files):
+    client = service.app.test_client()
+    response = client.post('/upload', data={name: (io.BytesIO(body), filename)
+                                            for name, (body, filename) in files.items()},
+                           content_type='multipart/form-data')
+    with client.session_transaction() as session:
+        return response.status_code, response.headers.get('Location'), session.get('_flashes', [])
+
+def async_post(async_service, files):
+    async def post():
+        client = async_service.app.test_client()
+        response = await client.post('/upload', files={
+            name: FileStorage(io.BytesIO(body), filename=filename, name=name)
+            for name, (body, filename) in files.items()})
+        async with client.session_transaction() as session:
+            return response.status_code, response.headers.get('Location'), session.get('_flashes', [])
+    return asyncio.run(post())
+
+@pytest.mark.parametrize('case', list(BAD_UPLOADS))
+def test_both_apps_reject_the_same_uploads(service, async_service, case):
+    files, message = BAD_UPLOADS[case]
+    expected = (302, '/', [('message', message)])
+    assert sync_post(service, files) == expected
+    assert async_post(async_service, files) == expected
+
+def multipart(payload):
+    body = (b'--b0undary\r\nContent-Disposition: form-data; name="resume"; filename="resume.pdf"\r\n'
+            b'Content-Type: application/pdf\r\n\r\n' + payload + b'\r\n--b0undary--\r\n')
+    return body, 'multipart/form-data; boundary=b0undary'
+
+@pytest.fixture
+def one_megabyte_limit(service, async_service, monkeypatch):
+    for module in (service, async_service):
+        monkeypatch.setitem(module.app.config, 'MAX_CONTENT_LENGTH', 1024 * 1024)
+
+def test_declared_oversized_upload_is_refused_unread(service, async_service, one_megabyte_limit):
+    body, content_type = multipart(PDF + b'%' * 2 * 1024 * 1024)
+    assert service.app.test_client().post('/upload', data=body, content_type=content_type).status_code == 413
+
+    async def post():
+        response = await async_service.app.test_client().post(
+            '/upload', data=body, headers={'Content-Type': content_type, 'Content-Length': str(len(body))})
+        return response.status_code
+    assert asyncio.run(post()) == 413
+
+def test_streamed_oversized_upload_is_stopped_at_the_limit(async_service, one_megabyte_limit):
+    # No Content-Length, so the limit is only found while reading
+    assert async_post(async_service, {'resume': (PDF + b'%' * 2 * 1024 * 1024, 'resume.pdf')}) == (
+        302, '/', [('message', 'File exceeds the 1MB limit')])
+
+def test_async_ingest_writes_the_spool_off_the_event_loop():
+    body, content_type = multipart(PDF)
+    writers = set()
+
+    class Spool(io.BytesIO):
+        def write(self, data):
+            writers.add(threading.get_ident())
+            return super().write(data)
+
+    async def chunks():
+        for start in range(0, len(body), 1000):
+            yield body[start:start + 1000]
+
+    async def ingest():
+        upload = await ingest_upload_async(chunks(), content_type, 'resume', max_bytes=len(body), spool=spool)
+        return upload, threading.get_ident()
+
+    spool = Spool()
+    upload, loop_thread = asyncio.run(ingest())
+    assert upload.sha256 == hashlib.sha256(PDF).hexdigest() and spool.getvalue() == PDF
+    assert writers and loop_thread not in writers
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from utils import dedup
+from utils.job_queue import JobQueue
+from utils.pdf_parser import ImageOnlyPDFError
+from utils.sample_pdf import build_pdf
+from utils.search_index import SearchIndex
+from utils.storage import PortfolioStore
+from utils.worker import UPLOAD_JOB, Worker
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease_seconds=0.2, max_attempts=3,
+                     retry_delay=0.05, max_retry_delay=0.15)
+    yield queue
+    queue.close()
+
+def expire_lease(queue):
+    time.sleep(queue.lease_seconds + 0.05)
+
+def wait_until_due(queue, job_id):
+    time.sleep(max(queue.get(job_id)['available_at'] - time.time(), 0) + 0.01)
+
+def test_expired_lease_is_reclaimed_and_the_old_lease_is_void(queue):
+    job_id = queue.enqueue('upload', {})
+    first = queue.claim('a')
+    assert queue.claim('b') is None  # leased, not due to anyone else
+
+    expire_lease(queue)
+    assert queue.claim('b') is None  # back in the queue, but only after the backoff
+    job = queue.get(job_id)
+    assert job['state'] == 'queued' and job['error'] == 'Lease expired after 1 attempt(s)'
+
+    wait_until_due(queue, job_id)
+    second = queue.claim('b')
+    assert second['id'] == job_id and second['attempts'] == 2 and second['lease'] != first['lease']
+    assert not queue.heartbeat(job_id, first['lease'])
+    assert not queue.complete(job_id, first['lease'], {'from': 'a'})
+    assert queue.fail(job_id, first['lease'], 'late') is None
+    assert queue.complete(job_id, second['lease'], {'from': 'b'})
+    assert queue.get(job_id)['result'] == {'from': 'b'}
+
+def test_heartbeats_keep_the_lease(queue):
+    job_id = queue.enqueue('upload', {})
+    job = queue.claim('a')
+    for _ in range(4):
+        time.sleep(queue.lease_seconds / 2)
+        assert queue.heartbeat(job_id, job['lease'])
+    assert queue.claim('b') is None
+    assert queue.get(job_id)['state'] == 'running'
+
+def test_heartbeat_after_the_lease_ran_out_is_refused(queue):
+    job_id = queue.enqueue('upload', {})
+    job = queue.claim('a')
+    expire_lease(queue)
+    queue.claim('b')  # any claim reclaims expired leases
+    assert not queue.heartbeat(job_id, job['lease'])
+
+def test_failures_back_off_exponentially_up_to_the_cap(queue):
+    job_id = queue.enqueue('upload', {})
+    delays = []
+    for attempt in range(3):
+        wait_until_due(queue, job_id)
+        job = queue.claim('a')
+        assert job['attempts'] == attempt + 1
+        queue.fail(job_id, job['lease'], 'boom')
+        job = queue.get(job_id)
+        delays.append(round(job['available_at'] - job['updated'], 3))
+    assert delays == [0.05, 0.1, 0.15]
+
+def test_out_of_attempts_is_dead_lettered_until_requeued(queue):
+    job_id = queue.enqueue('upload', {}, max_attempts=2)
+    assert queue.fail(job_id, queue.claim('a')['lease'], 'boom') == 'queued'
+    wait_until_due(queue, job_id)
+    job = queue.claim('a')
+    expire_lease(queue)
+    assert queue.claim('b') is None
+    assert [dead['id'] for dead in queue.jobs('dead')] == [job_id]
+    assert queue.stats()['states']['dead'] == 1
+
+    assert queue.requeue(job_id)
+    job = queue.claim('a')
+    assert job['id'] == job_id and job['attempts'] == 1
+
+def test_permanent_errors_are_not_retried(queue):
+    worker = Worker(queue, None, None, None)
+
+    def scanned(job):
+        raise ImageOnlyPDFError('no text layer')
+    worker.handlers[UPLOAD_JOB] = scanned
+    job_id = queue.enqueue(UPLOAD_JOB, {})
+    worker.run_job(queue.claim('a'))
+    job = queue.get(job_id)
+    assert job['state'] == 'dead' and job['attempts'] == 1
+    assert job['error'] == 'ImageOnlyPDFError: no text layer'
+
+    def flaky(job):
+        raise OSError('disk busy')
+    worker.handlers[UPLOAD_JOB] = flaky
+    job_id = queue.enqueue(UPLOAD_JOB, {})
+    worker.run_job(queue.claim('a'))
+    assert queue.get(job_id)['state'] == 'queued'
+
+@pytest.mark.parametrize('pdf, error', [
+    (None, 'FileNotFoundError'),
+    (b'%PDF-1.4\nnot really a pdf', 'UnreadablePDFError'),
+    (build_pdf([])[:200], 'UnreadablePDFError'),
+])
+def test_unprocessable_uploads_are_dead_lettered_at_once(tmp_path, queue, pdf, error):
+    store = PortfolioStore(str(tmp_path / 'portfolios'))
+    worker = Worker(queue, store, SearchIndex(str(tmp_path / 'search.sqlite3')),
+                    dedup.DedupIndex(str(tmp_path / 'dedup.sqlite3')))
+    if pdf is not None:
+        (tmp_path / 'upload.pdf').write_bytes(pdf)
+    job_id = queue.enqueue(UPLOAD_JOB, {'owner': None, 'source_hash': 'x', 'dedup': False},
+                           input_path='upload.pdf')
+    worker.run_job(queue.claim('a'))
+    job = queue.get(job_id)
+    assert job['state'] == 'dead' and job['attempts'] == 1
+    assert job['error'].startswith(error)
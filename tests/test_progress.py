@@ -0,0 +1,54 @@
+import asyncio
+
+from utils.progress import ProgressBroker
+
+async def collect_events(broker, upload_id, keepalive=0.01):
+    return [event async for event in broker.subscribe(upload_id, keepalive)]
+
+def collect(broker, upload_id, keepalive=0.01):
+    return asyncio.run(collect_events(broker, upload_id, keepalive))
+
+def test_only_issued_ids_are_valid():
+    broker = ProgressBroker(b'secret')
+    upload_id = broker.issue()
+    assert broker.valid(upload_id)
+    assert not ProgressBroker(b'other secret').valid(upload_id)
+    assert not broker.valid(upload_id[:-1] + ('0' if upload_id[-1] != '0' else '1'))
+    assert not broker.valid('0123456789abcdef0123456789abcdef')
+
+def test_unissued_ids_open_no_channels():
+    broker = ProgressBroker(b'secret')
+    assert collect(broker, '0123456789abcdef-1-0123456789abcdef') == []
+    assert broker.metrics()['channels'] == 0
+
+def test_history_then_final_stage():
+    broker = ProgressBroker(b'secret')
+    upload_id = broker.issue()
+    broker.publish(upload_id, 'received', filename='cv.pdf')
+    broker.publish(upload_id, 'done', url='/portfolio/x.html')
+    assert [event['stage'] for event in collect(broker, upload_id)] == ['received', 'done']
+
+def test_unpublished_channels_expire():
+    broker = ProgressBroker(b'secret', pending_ttl=0.05, max_channels=1)
+    stray = broker.issue()
+    events = collect(broker, stray)
+    assert events and all(event is None for event in events)  # keepalives until it gives up
+
+    # The stray channel no longer holds the only slot
+    upload_id = broker.issue()
+    broker.publish(upload_id, 'done')
+    assert [event['stage'] for event in collect(broker, upload_id)] == ['done']
+
+def test_channels_of_uploads_still_arriving_do_not_expire():
+    broker = ProgressBroker(b'secret', pending_ttl=0.05)
+    upload_id = broker.issue()
+
+    async def run():
+        listener = asyncio.ensure_future(collect_events(broker, upload_id))
+        # A slow body: four times pending_ttl before anything is published
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            broker.touch(upload_id)
+        broker.publish(upload_id, 'done')
+        return await listener
+    assert asyncio.run(run())[-1]['stage'] == 'done'
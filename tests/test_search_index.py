@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from utils import search_index
+from utils.search_index import FIELDS, QueryError, SearchIndex, compile_filter, compile_query, index_terms, parse_query
+
+def resume(rng):
+    return {
+        'name': f"{rng.choice(['kofi', 'jane'])} {rng.choice(['smith', 'okafor'])}",
+        'skills': rng.sample(['python', 'pytest', 'java', 'go', 'aws'], rng.randint(0, 3)),
+        'experience': [{'title': 'engineer', 'company': rng.choice(['acme', 'hooli', 'go'])}],
+    }
+
+def matches(node, terms):
+    kind = node[0]
+    if kind == 'term':
+        _, field, word, prefix = node
+        wanted = [f"{f}:{word}" for f in ([field] if field else FIELDS)]
+        return any(term.startswith(w) if prefix else term == w for term in terms for w in wanted)
+    if kind == 'not':
+        return not matches(node[1], terms)
+    if kind == 'and':
+        return matches(node[1], terms) and matches(node[2], terms)
+    return matches(node[1], terms) or matches(node[2], terms)
+
+@pytest.fixture
+def corpus(tmp_path):
+    rng = random.Random(7)
+    index = SearchIndex(str(tmp_path / 'search.sqlite3'))
+    docs = {}
+    for i in range(300):
+        data = resume(rng)
+        index.add(f'p{i}', data)
+        docs[f'p{i}'] = set(index_terms(data))
+    yield index, docs
+    index.close()
+
+def test_parse_precedence_and_negation():
+    assert parse_query('python aws OR go') == (
+        'or', ('and', ('term', None, 'python', False), ('term', None, 'aws', False)), ('term', None, 'go', False))
+    assert parse_query('skill:pyth* NOT (java OR company:acme)') == (
+        'and', ('term', 'skill', 'pyth', True),
+        ('not', ('or', ('term', None, 'java', False), ('term', 'company', 'acme', False))))
+    assert parse_query('NOT java AND c++') == ('and', ('not', ('term', None, 'java', False)), ('term', None, 'c++', False))
+
+@pytest.mark.parametrize('query, message', [
+    ('', 'Empty query'),
+    ('python OR', 'Query ends unexpectedly'),
+    ('(python aws', 'Missing closing parenthesis'),
+    ('foo:python', "Unknown field 'foo'"),
+    ('python )', "Unexpected ')'"),
+])
+def test_parse_errors(query, message):
+    with pytest.raises(QueryError, match=message.replace('(', r'\(').replace(')', r'\)')):
+        parse_query(query)
+
+def test_filter_probes_postings_by_doc():
+    sql, params = compile_filter(parse_query('company:acme -pyth*'))
+    assert sql == ('(EXISTS (SELECT 1 FROM postings WHERE doc = p.doc AND (term IN (?))) AND '
+                   'NOT EXISTS (SELECT 1 FROM postings WHERE doc = p.doc AND (' +
+                   ' OR '.join('term >= ? AND term < ?' for _ in FIELDS) + ')))')
+    assert params[:3] == ['company:acme', 'name:pyth', 'name:pyti']
+
+    sql, params = compile_filter(parse_query('java'), present={'skill:java'})
+    assert params == ['skill:java']
+    assert compile_filter(parse_query('-cobol'), present=set()) == ('NOT 0', [])
+
+def test_query_streams_each_anchor_term_below_the_cursor():
+    sql, params = compile_query(parse_query('-java'), ['skill:python', 'title:python'], before=50)
+    arm = ('SELECT doc FROM postings p WHERE term = ? AND doc < ? AND '
+           'NOT EXISTS (SELECT 1 FROM postings WHERE doc = p.doc AND (term IN (' +
+           ', '.join('?' for _ in FIELDS) + ')))')
+    assert sql == f'{arm} UNION {arm} ORDER BY doc DESC'
+    assert params[:2] == ['skill:python', 50] and params[8:10] == ['title:python', 50]
+
+def test_plan_never_scans_the_corpus(corpus):
+    index, _ = corpus
+    conn = index._connect()
+    sql, params = compile_query(parse_query('aws -java (go OR acme)'), ['skill:aws', 'name:aws'], before=100)
+    plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql} LIMIT 20', params)]
+    assert not [step for step in plan if step.startswith('SCAN') and 'postings' in step or step == 'SCAN docs']
+    assert any('USING PRIMARY KEY (term=? AND doc<?)' in step for step in plan)
+
+@pytest.mark.parametrize('query', [
+    'python', 'pyth*', 'skill:py*', 'python aws', 'python -java', 'kofi OR jane', 'go', 'company:go',
+    '(java OR go) -python smith', 'kofi okafor -aws -company:hooli', 'NOT java python', 'java OR (aws -go)',
+    'cobol', 'python -cobol', 'pyt* -pytest',
+])
+def test_results_and_pages_match_a_full_scan(corpus, query):
+    index, docs = corpus
+    node = parse_query(query)
+    expected = [pid for pid, terms in reversed(list(docs.items())) if matches(node, terms)]
+
+    found = index.search(query, limit=7)
+    assert found['total'] == len(expected) and not found['total_capped']
+    seen = [hit['portfolio_id'] for hit in found['results']]
+    while found['next_cursor'] is not None:
+        found = index.search(query, before=found['next_cursor'], limit=7)
+        assert found['total'] is None
+        seen += [hit['portfolio_id'] for hit in found['results']]
+    assert seen == expected
+
+def test_total_is_capped(corpus, monkeypatch):
+    index, docs = corpus
+    monkeypatch.setattr(search_index, 'TOTAL_CAP', 50)
+    found = index.search('engineer')
+    assert found == {**found, 'total': 50, 'total_capped': True}
+    assert len(found['results']) == 20 and found['next_cursor'] is not None
+
+@pytest.mark.parametrize('query', ['NOT java', '-java -go', 'python OR -java', 'NOT (java python)'])
+def test_negation_only_queries_are_refused(corpus, query):
+    index, _ = corpus
+    with pytest.raises(QueryError, match='needs a term to match'):
+        index.search(query)
+
+def test_prefixes_covering_too_many_terms_are_refused(corpus, monkeypatch):
+    index, _ = corpus
+    monkeypatch.setattr(search_index, 'MAX_PREFIX_TERMS', 1)
+    with pytest.raises(QueryError):
+        index.search('skill:py*')
+    assert index.search('skill:py* java')['results'] is not None  # anchored on java instead
@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+from utils.pdf_parser import ImageOnlyPDFError, probe_text_layer
+from utils.pipeline import extract_resume
+
+def build_pdf(objects):
+    """PDF bytes from object bodies, numbered from 1 in order"""
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    return bytes(out)
+
+def stream(content, extra=''):
+    return '<< %s/Length %d >>\nstream\n%s\nendstream' % (extra, len(content), content)
+
+def form_xobject_pdf(form_content):
+    """One page whose only drawing is a form XObject holding form_content"""
+    return build_pdf([
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        '/Resources << /XObject << /Fm1 5 0 R >> >> /Contents 4 0 R >>',
+        stream('q /Fm1 Do Q'),
+        stream(form_content, '/Type /XObject /Subtype /Form /BBox [0 0 612 792] '
+                             '/Resources << /Font << /F1 6 0 R >> >> '),
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ])
+
+TEXT = ("BT /F1 11 Tf 50 750 Td 14 TL (Jane Smith) ' (jane.smith@northwind.io) ' "
+        "(SKILLS) ' (Python, SQL, Docker) ' ET")
+
+def test_text_inside_form_xobject_is_a_text_layer():
+    pdf = form_xobject_pdf(TEXT)
+    assert probe_text_layer(io.BytesIO(pdf))['kind'] == 'text'
+    resume_data = extract_resume(io.BytesIO(pdf), with_signature=False)[0]
+    assert resume_data['name'] == 'Jane Smith'
+    assert resume_data['email'] == 'jane.smith@northwind.io'
+
+def test_form_xobject_without_text_is_image_only():
+    pdf = form_xobject_pdf('0 0 612 792 re f')
+    assert probe_text_layer(io.BytesIO(pdf))['kind'] == 'image_only'
+    with pytest.raises(ImageOnlyPDFError):
+        extract_resume(io.BytesIO(pdf), with_signature=False)
@@ -0,0 +1,220 @@
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Iterator
+
+class Overloaded(Exception):
+    """Raised when a request is turned away; carries the HTTP status and Retry-After hint"""
+
+    def __init__(self, message: str, status: int, retry_after: float):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to observed latency (AIMD) with a bounded wait queue
+
+    The limit grows by about one slot per limit's worth of completions that finish
+    within target_latency, and is cut by `backoff` whenever one runs slower.
+    Callers beyond the limit wait in a queue of at most max_queue entries for up
+    to max_wait seconds; anything past that is rejected right away.
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 64,
+                 target_latency: float = 5.0, backoff: float = 0.75,
+                 max_queue: int = 32, max_wait: float = 10.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiting = 0
+        self._latency = None  # exponentially weighted moving average
+        self._cond = threading.Condition()
+        self._counters = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'limit_increases': 0,
+            'limit_decreases': 0,
+        }
+
+    def _retry_after(self) -> float:
+        # Roughly how long until the queue ahead of a new caller drains
+        latency = self._latency or self.target_latency
+        return latency * (self._waiting + 1) / max(int(self._limit), 1)
+
+    def _try_admit(self) -> bool:
+        """Take a slot if one is free; call with self._cond held"""
+        if self._in_flight < int(self._limit):
+            self._in_flight += 1
+            self._counters['admitted'] += 1
+            return True
+        return False
+
+    def _enqueue(self) -> None:
+        """Join the wait queue or reject; call with self._cond held"""
+        if self._waiting >= self.max_queue:
+            self._counters['rejected_queue_full'] += 1
+            raise Overloaded('Upload queue is full', 503, self._retry_after())
+        self._waiting += 1
+        self._counters['queued'] += 1
+
+    def _timed_out(self) -> Overloaded:
+        self._counters['rejected_timeout'] += 1
+        return Overloaded('Timed out waiting for a processing slot', 503, self._retry_after())
+
+    def _record_release(self, latency: float) -> None:
+        """Free a slot and adjust the limit; call with self._cond held"""
+        saturated = self._in_flight >= int(self._limit)
+        self._in_flight -= 1
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+
+        if latency > self.target_latency:
+            limit = max(self.min_limit, self._limit * self.backoff)
+            if limit < self._limit:
+                self._counters['limit_decreases'] += 1
+            self._limit = limit
+        elif saturated and self._limit < self.max_limit:
+            # Only grow when the limit was actually the bottleneck
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._counters['limit_increases'] += 1
+
+    def acquire(self) -> None:
+        with self._cond:
+            if self._try_admit():
+                return
+            self._enqueue()
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while not self._try_admit():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def release(self, latency: float) -> None:
+        with self._cond:
+            self._record_release(latency)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a processing slot for the duration of the block"""
+        self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            metrics = dict(self._counters)
+            metrics.update({
+                'limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'latency_ewma_seconds': self._latency,
+            })
+            return metrics
+
+class AsyncAdaptiveLimiter(AdaptiveLimiter):
+    """The same AIMD policy for callers on an asyncio event loop
+
+    Waiters park on an asyncio.Condition instead of blocking a thread; the
+    threading lock is still taken briefly around every state change.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_cond = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the loop that serves requests
+        if self._async_cond is None:
+            self._async_cond = asyncio.Condition()
+        return self._async_cond
+
+    async def acquire_async(self) -> None:
+        condition = self._condition()
+        async with condition:
+            with self._cond:
+                if self._try_admit():
+                    return
+                self._enqueue()
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while True:
+                    with self._cond:
+                        if self._try_admit():
+                            return
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._timed_out()
+                    try:
+                        await asyncio.wait_for(condition.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                with self._cond:
+                    self._waiting -= 1
+
+    async def release_async(self, latency: float) -> None:
+        with self._cond:
+            self._record_release(latency)
+        condition = self._condition()
+        async with condition:
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        await self.acquire_async()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            await self.release_async(time.perf_counter() - started)
+
+class ClientRateLimiter:
+    """Per-client token buckets; idle clients are dropped once max_clients is reached"""
+
+    def __init__(self, rate_per_second: float, burst: int, max_clients: int = 10000):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._limited = 0
+
+    def check(self, client: str) -> None:
+        """Take one token for the client or raise Overloaded (429)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(client, None)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                if len(self._buckets) >= self.max_clients:
+                    self._buckets.popitem(last=False)
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            self._buckets[client] = bucket
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self._limited += 1
+                raise Overloaded('Too many uploads from this client', 429, (1 - tokens) / self.rate)
+            bucket[0] = tokens - 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'tracked_clients': len(self._buckets), 'rate_limited': self._limited}
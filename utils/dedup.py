@@ -0,0 +1,259 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import argparse
+import time
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.storage import PortfolioStore, configure_sqlite
+
+# Defaults: 128 permutations split into 16 bands of 8 rows. Two documents
+# become LSH candidates with probability 1 - (1 - J^8)^16, which is ~0.95 at
+# Jaccard 0.8 and ~1.0 at 0.9, and drops below 0.05 under 0.5.
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.9
+
+# Default index location, alongside the portfolio store's own index
+INDEX_FILENAME = 'dedup.sqlite3'
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r'\w+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    doc TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_bands_doc ON bands (doc);
+"""
+
+def _permutations(num_perm: int, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    generator = np.random.RandomState(seed)
+    a = generator.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = generator.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    return a.reshape(-1, 1), b.reshape(-1, 1)
+
+_PERMUTATIONS = {NUM_PERM: _permutations(NUM_PERM)}
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct word n-grams of a cleaned resume text"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        shingles = {' '.join(words)} if words else set()
+    else:
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+def _min_hashes(hashes: np.ndarray, num_perm: int) -> np.ndarray:
+    """Per permutation, the minimum of (a*x + b) mod p over the given shingle hashes"""
+    if num_perm not in _PERMUTATIONS:
+        _PERMUTATIONS[num_perm] = _permutations(num_perm)
+    a, b = _PERMUTATIONS[num_perm]
+    if len(hashes) == 0:
+        return np.full(num_perm, _MAX_HASH, dtype=np.uint32)
+    # One (num_perm x shingles) matrix instead of a Python loop per permutation;
+    # uint64 wraparound in a*x is part of the standard approximation
+    with np.errstate(over='ignore'):
+        permuted = (a * hashes + b) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+def minhash_signature(text: str, num_perm: int = NUM_PERM) -> np.ndarray:
+    """MinHash signature: per permutation, the minimum of (a*x + b) mod p over all shingles"""
+    return _min_hashes(shingle_hashes(text), num_perm)
+
+class MinHasher:
+    """minhash_signature computed over text fed in pieces, e.g. line by line
+
+    Only the last SHINGLE_SIZE - 1 words and a batch of pending shingle hashes
+    are held, and the result equals minhash_signature of the pieces joined
+    with newlines.
+    """
+
+    BATCH = 4096
+
+    def __init__(self, num_perm: int = NUM_PERM, size: int = SHINGLE_SIZE):
+        self.num_perm = num_perm
+        self.size = size
+        self._tail: List[str] = []
+        self._pending: List[int] = []
+        self._mins = _min_hashes(np.empty(0, dtype=np.uint64), num_perm)
+        self._shingled = False
+
+    def update(self, text: str) -> None:
+        words = self._tail + _WORD_RE.findall(text.lower())
+        if len(words) >= self.size:
+            self._shingled = True
+            self._pending.extend(zlib.crc32(' '.join(words[i:i + self.size]).encode('utf-8'))
+                                 for i in range(len(words) - self.size + 1))
+            if len(self._pending) >= self.BATCH:
+                self._flush()
+        self._tail = words[-(self.size - 1):] if self.size > 1 else []
+
+    def _flush(self) -> None:
+        if self._pending:
+            hashes = np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending))
+            self._mins = np.minimum(self._mins, _min_hashes(hashes, self.num_perm))
+            self._pending = []
+
+    def signature(self) -> np.ndarray:
+        if not self._shingled and self._tail:
+            # Texts shorter than one shingle are hashed whole, as in shingle_hashes
+            self._pending.append(zlib.crc32(' '.join(self._tail).encode('utf-8')))
+            self._shingled = True
+        self._flush()
+        return self._mins.copy()
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the documents behind two signatures"""
+    return float(np.count_nonzero(first == second)) / len(first)
+
+def band_buckets(signature: np.ndarray, bands: int = BANDS) -> List[int]:
+    """One bucket key per band; documents sharing any bucket are candidates"""
+    rows = len(signature) // bands
+    return [int.from_bytes(hashlib.blake2b(signature[i * rows:(i + 1) * rows].tobytes(), digest_size=8).digest(),
+                           'little', signed=True)
+            for i in range(bands)]
+
+class DedupIndex:
+    """Persistent LSH index of MinHash signatures for near-duplicate lookups"""
+
+    def __init__(self, path: str, threshold: float = DEFAULT_THRESHOLD, bands: int = BANDS):
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'duplicates': 0}
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            configure_sqlite(conn)
+            self._local.conn = conn
+        return conn
+
+    def candidates(self, signature: np.ndarray) -> List[Tuple[str, np.ndarray]]:
+        """Documents sharing at least one band bucket with the signature"""
+        # One primary-key probe per band
+        buckets = ' UNION '.join('SELECT doc FROM bands WHERE band = ? AND bucket = ?' for _ in range(self.bands))
+        params = [value for band, bucket in enumerate(band_buckets(signature, self.bands))
+                  for value in (band, bucket)]
+        rows = self._connect().execute(
+            f'SELECT doc, signature FROM signatures WHERE doc IN ({buckets})', params
+        ).fetchall()
+        return [(doc, np.frombuffer(blob, dtype=np.uint32)) for doc, blob in rows]
+
+    def find(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Most similar indexed document at or above the threshold, if any"""
+        best = None
+        for doc, other in self.candidates(signature):
+            score = similarity(signature, other)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (doc, score)
+        with self._lock:
+            self._stats['lookups'] += 1
+            if best is not None:
+                self._stats['duplicates'] += 1
+        return best
+
+    def add(self, doc: str, signature: np.ndarray) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM bands WHERE doc = ?', (doc,))
+            conn.execute('INSERT OR REPLACE INTO signatures (doc, signature, created) VALUES (?, ?, ?)',
+                         (doc, signature.astype(np.uint32).tobytes(), time.time()))
+            conn.executemany('INSERT OR IGNORE INTO bands (band, bucket, doc) VALUES (?, ?, ?)',
+                             [(band, bucket, doc) for band, bucket in enumerate(band_buckets(signature, self.bands))])
+
+    def signature(self, doc: str) -> Optional[np.ndarray]:
+        row = self._connect().execute('SELECT signature FROM signatures WHERE doc = ?', (doc,)).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint32) if row else None
+
+    def remove(self, doc: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM bands WHERE doc = ?', (doc,))
+            conn.execute('DELETE FROM signatures WHERE doc = ?', (doc,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup and hit counts since this process started"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['duplicate_rate'] = stats['duplicates'] / stats['lookups'] if stats['lookups'] else 0.0
+        return stats
+
+    def corpus_report(self) -> Dict[str, Any]:
+        """Share of indexed documents that are a near duplicate of an earlier one"""
+        conn = self._connect()
+        documents = duplicates = 0
+        for doc, blob, created in conn.execute('SELECT doc, signature, created FROM signatures ORDER BY created'):
+            documents += 1
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            for other_doc, other in self.candidates(signature):
+                if other_doc == doc:
+                    continue
+                other_created = conn.execute('SELECT created FROM signatures WHERE doc = ?',
+                                             (other_doc,)).fetchone()[0]
+                if other_created < created and similarity(signature, other) >= self.threshold:
+                    duplicates += 1
+                    break
+        return {
+            'documents': documents,
+            'near_duplicates': duplicates,
+            'duplicate_rate': duplicates / documents if documents else 0.0,
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def identical_parse(store: PortfolioStore, index: DedupIndex,
+                    source_hash: str) -> Optional[Tuple[Dict[str, Any], Optional[np.ndarray]]]:
+    """Stored parse and signature of an earlier upload of the very same file, if any
+
+    Only a byte-identical source is reused. A near-duplicate can differ in
+    exactly the fields that matter, such as another person's name and contact
+    details, so MinHash matches are counted in the stats and nothing more.
+    """
+    previous = store.find_by_source_hash(source_hash)
+    if previous is None:
+        return None
+    resume_data = store.load_resume_data(previous)
+    if resume_data is None:
+        return None
+    return resume_data, index.signature(previous['id'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Near-duplicate resume report over the dedup index')
+    parser.add_argument('--portfolio-folder', default='generated_portfolios')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    index = DedupIndex(os.path.join(args.portfolio_folder, INDEX_FILENAME), threshold=args.threshold)
+    report = index.corpus_report()
+    print(f"Documents: {report['documents']}")
+    print(f"Near duplicates (Jaccard >= {args.threshold}): {report['near_duplicates']} "
+          f"({100 * report['duplicate_rate']:.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import zipfile
+import argparse
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+import logging
+
+from utils.storage import PortfolioStore
+
+logger = logging.getLogger(__name__)
+
+# Portfolio files are read this much at a time, and compressed output is
+# handed on once this much has accumulated, so memory stays bounded however
+# many portfolios are exported
+READ_CHUNK = 64 * 1024
+FLUSH_BYTES = 64 * 1024
+
+class _StreamSink:
+    """Write-only file object zipfile writes into and the export drains
+
+    It has no seek or tell, so zipfile streams: each entry's sizes go in a
+    data descriptor after its data instead of being patched into its header.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """A Unix timestamp or an ISO 8601 date/time, as a timestamp"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Not a timestamp or ISO 8601 date: {value!r}")
+
+def select_records(store: PortfolioStore, ids: Optional[List[str]] = None, owner: Optional[str] = None,
+                   since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Portfolios with the given ids (all if none), of the owner and created in [since, until)"""
+    if not ids:
+        yield from store.iter_records(owner=owner, since=since, until=until)
+        return
+    for portfolio_id in dict.fromkeys(ids):
+        record = store.get(portfolio_id)
+        if (record is None or (owner is not None and record['owner'] != owner)
+                or (since is not None and record['created'] < since)
+                or (until is not None and record['created'] >= until)):
+            continue
+        yield record
+
+def iter_zip(store: PortfolioStore, records: Iterable[Dict[str, Any]],
+             include_data: bool = False) -> Iterator[bytes]:
+    """A ZIP archive of the records' portfolios (and parsed JSON), compressed as it is yielded
+
+    Nothing is staged on disk and records are read lazily, so the first bytes
+    go out as soon as the first portfolios are compressed; the only state that
+    grows with the export is zipfile's central directory entry per file
+    (a few hundred bytes). Portfolios removed since they were selected are
+    left out.
+    """
+    sink = _StreamSink()
+    files = 0
+    written = 0
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for record in records:
+            entries = [(record['filename'], record['relpath'])]
+            if include_data:
+                data_relpath = store.data_relpath(record['relpath'])
+                entries.append((os.path.basename(data_relpath), data_relpath))
+            for arcname, relpath in entries:
+                try:
+                    source = open(store.abspath(relpath), 'rb')
+                except FileNotFoundError:
+                    logger.warning(f"Skipping {arcname}: no longer on disk")
+                    continue
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime(record['created'])[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                with source, archive.open(info, 'w') as entry:
+                    for chunk in iter(lambda: source.read(READ_CHUNK), b''):
+                        entry.write(chunk)
+                        if sink.pending >= FLUSH_BYTES:
+                            written += sink.pending
+                            yield sink.drain()
+                files += 1
+            if sink.pending >= FLUSH_BYTES:
+                written += sink.pending
+                yield sink.drain()
+    # Closing the archive wrote the central directory
+    written += sink.pending
+    yield sink.drain()
+    logger.info(f"Exported {files} files in a {written} byte archive")
+
+def main():
+    parser = argparse.ArgumentParser(description='Export stored portfolios as a ZIP archive, streamed as it is built')
+    parser.add_argument('--portfolio-folder', default='generated_portfolios')
+    parser.add_argument('--owner', help='only portfolios uploaded by this owner')
+    parser.add_argument('--since', help='only portfolios created at or after this timestamp or ISO date')
+    parser.add_argument('--until', help='only portfolios created before this timestamp or ISO date')
+    parser.add_argument('--id', dest='ids', action='append', help='portfolio id to export (repeatable)')
+    parser.add_argument('--data', action='store_true', help='include the parsed resume JSON of each portfolio')
+    parser.add_argument('-o', '--output', default='-', help="archive path, or '-' for stdout")
+    args = parser.parse_args()
+
+    try:
+        since, until = parse_time(args.since), parse_time(args.until)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output == '-' and sys.stdout.isatty():
+        parser.error('refusing to write a ZIP archive to a terminal; redirect stdout or use -o')
+
+    store = PortfolioStore(args.portfolio_folder)
+    records = select_records(store, ids=args.ids, owner=args.owner, since=since, until=until)
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in iter_zip(store, records, include_data=args.data):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        else:
+            out.flush()
+
+if __name__ == "__main__":
+    main()
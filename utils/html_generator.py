@@ -1,7 +1,38 @@
 import re
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List
 import json
+from concurrent.futures import ThreadPoolExecutor
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from markupsafe import Markup
+
+from utils.profiling import stage
+from utils.minify import minify_html
+
+PORTFOLIO_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      'templates', 'portfolio')
+
+# Each theme is templates/portfolio/themes/<name>.html extending portfolio.html
+THEMES = tuple(sorted(os.path.splitext(name)[0]
+                      for name in os.listdir(os.path.join(PORTFOLIO_TEMPLATE_DIR, 'themes'))
+                      if name.endswith('.html')))
+DEFAULT_THEME = 'default'
+
+# Portfolios written to the store (uploads and utils/rerender.py) are minified
+# once as they are rendered: about 35% fewer bytes on every view, for a
+# minification pass that costs several times the render itself. Rendering
+# anywhere else leaves the readable template output
+MINIFY_STORED_HTML = True
+
+# Length-bounded (RFC 5321) so matching stays linear on long runs of address characters
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]{1,253}\.[A-Za-z]{2,63}\b')
+
+# Header keyword, optional colon, end of line. The runs exclude newlines so
+# they cannot trade characters with each other or the \n (\s*:?\s*\n was
+# quadratic on long whitespace)
+SECTION_END = r'[^\S\n]*(?::[^\S\n]*)?\n'
+
+_template_env = None
 
 def parse_resume_data(resume_text: str) -> Dict[str, Any]:
     """Enhanced resume parsing with better section detection"""
@@ -64,8 +95,7 @@ def extract_name(text: str) -> str:
 
 def extract_email(text: str) -> str:
     """Extract email from resume text"""
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    matches = re.findall(email_pattern, text)
+    matches = EMAIL_RE.findall(text)
     return matches[0] if matches else ""
 
 def extract_phone(text: str) -> str:
@@ -89,11 +119,11 @@ def split_into_sections(text: str) -> Dict[str, str]:
     
     # Common section headers
     section_patterns = {
-        'summary': r'(?i)(summary|objective|profile|about)\s*:?\s*\n',
-        'skills': r'(?i)(skills|technical skills|core competencies|technologies)\s*:?\s*\n',
-        'experience': r'(?i)(experience|work experience|professional experience|employment)\s*:?\s*\n',
-        'education': r'(?i)(education|academic background|qualifications)\s*:?\s*\n',
-        'projects': r'(?i)(projects|key projects|notable projects)\s*:?\s*\n'
+        'summary': r'(?i)(summary|objective|profile|about)' + SECTION_END,
+        'skills': r'(?i)(skills|technical skills|core competencies|technologies)' + SECTION_END,
+        'experience': r'(?i)(experience|work experience|professional experience|employment)' + SECTION_END,
+        'education': r'(?i)(education|academic background|qualifications)' + SECTION_END,
+        'projects': r'(?i)(projects|key projects|notable projects)' + SECTION_END
     }
     
     # Find section boundaries
@@ -263,405 +293,117 @@ def clean_text(text: str) -> str:
     
     return text.strip()
 
-def generate_portfolio_html(resume_text: str) -> str:
+def generate_portfolio_html(resume_text: str, theme: str = DEFAULT_THEME) -> str:
     """Generate a complete portfolio HTML from resume text"""
     
     # Parse resume data
     resume_data = parse_resume_data(resume_text)
     
     # Generate HTML
-    html_content = create_portfolio_html(resume_data)
+    html_content = create_portfolio_html(resume_data, theme)
     return html_content
 
-def create_portfolio_html(data: Dict[str, Any]) -> str:
-    """Create the complete portfolio HTML with proper formatting"""
-    
-    name = data.get('name', 'Your Name')
-    email = data.get('email', '')
-    phone = data.get('phone', '')
-    summary = data.get('summary', 'Professional summary will be generated from your resume.')
-    tagline = 'Professional Developer & Problem Solver'
-    skills = data.get('skills', [])
-    experience = data.get('experience', [])
-    education = data.get('education', [])
-    projects = data.get('projects', [])
-    
-    html = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{name} - Portfolio</title>
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.1.3/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }}
-        .hero-section {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 120px 0;
-            text-align: center;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-        }}
-        .section-title {{
-            color: #333;
-            margin-bottom: 40px;
-            font-weight: 600;
-            text-align: center;
-        }}
-        .skill-badge {{
-            background: linear-gradient(45deg, #667eea, #764ba2);
-            color: white;
-            padding: 10px 20px;
-            border-radius: 25px;
-            margin: 8px 5px;
-            display: inline-block;
-            font-size: 0.9em;
-            font-weight: 500;
-            transition: transform 0.3s ease;
-        }}
-        .skill-badge:hover {{
-            transform: translateY(-2px);
-        }}
-        .experience-card, .project-card, .education-card {{
-            border: none;
-            border-left: 4px solid #667eea;
-            padding: 30px;
-            margin-bottom: 30px;
-            background: white;
-            border-radius: 10px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-            transition: transform 0.3s ease;
-        }}
-        .experience-card:hover, .project-card:hover, .education-card:hover {{
-            transform: translateY(-5px);
-        }}
-        .contact-info {{
-            background: linear-gradient(135deg, #333 0%, #555 100%);
-            color: white;
-            padding: 80px 0;
-        }}
-        .navbar {{
-            background: rgba(255,255,255,0.95) !important;
-            backdrop-filter: blur(10px);
-            padding: 1rem 0;
-        }}
-        .navbar.scrolled {{
-            box-shadow: 0 2px 20px rgba(0,0,0,0.1);
-        }}
-        .btn-primary {{
-            background: linear-gradient(45deg, #667eea, #764ba2);
-            border: none;
-            padding: 12px 30px;
-            border-radius: 25px;
-            font-weight: 600;
-            transition: all 0.3s ease;
-        }}
-        .btn-primary:hover {{
-            background: linear-gradient(45deg, #5a6fd8, #6a42a0);
-            transform: translateY(-2px);
-        }}
-        .btn-outline-light {{
-            border: 2px solid white;
-            padding: 12px 30px;
-            border-radius: 25px;
-            font-weight: 600;
-            transition: all 0.3s ease;
-        }}
-        .btn-outline-light:hover {{
-            transform: translateY(-2px);
-        }}
-        .section {{
-            padding: 80px 0;
-        }}
-        .bg-light {{
-            background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%) !important;
-        }}
-    </style>
-</head>
-<body>
-    <!-- Navigation -->
-    <nav class="navbar navbar-expand-lg navbar-light fixed-top">
-        <div class="container">
-            <a class="navbar-brand fw-bold" href="#home">{name}</a>
-            <button class="navbar-toggler" type="button" data-bs-toggle="collapse" data-bs-target="#navbarNav">
-                <span class="navbar-toggler-icon"></span>
-            </button>
-            <div class="collapse navbar-collapse" id="navbarNav">
-                <ul class="navbar-nav ms-auto">
-                    <li class="nav-item"><a class="nav-link" href="#home">Home</a></li>
-                    <li class="nav-item"><a class="nav-link" href="#about">About</a></li>
-                    <li class="nav-item"><a class="nav-link" href="#skills">Skills</a></li>
-                    <li class="nav-item"><a class="nav-link" href="#experience">Experience</a></li>
-                    <li class="nav-item"><a class="nav-link" href="#education">Education</a></li>
-                    <li class="nav-item"><a class="nav-link" href="#projects">Projects</a></li>
-                    <li class="nav-item"><a class="nav-link" href="#contact">Contact</a></li>
-                </ul>
-            </div>
-        </div>
-    </nav>
-
-    <!-- Hero Section -->
-    <section id="home" class="hero-section">
-        <div class="container">
-            <div class="row">
-                <div class="col-lg-8 mx-auto">
-                    <h1 class="display-3 fw-bold mb-4">{name}</h1>
-                    <p class="lead mb-5">{tagline}</p>
-                    <div class="d-flex justify-content-center gap-3 flex-wrap">
-                        <a href="#contact" class="btn btn-primary btn-lg">Get In Touch</a>
-                        <a href="#projects" class="btn btn-outline-light btn-lg">View Work</a>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- About Section -->
-    <section id="about" class="section">
-        <div class="container">
-            <div class="row">
-                <div class="col-lg-8 mx-auto">
-                    <h2 class="section-title">About Me</h2>
-                    <p class="lead text-center mb-5">{summary}</p>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Skills Section -->
-    <section id="skills" class="section bg-light">
-        <div class="container">
-            <h2 class="section-title">Skills & Technologies</h2>
-            <div class="row">
-                {generate_skills_html(skills)}
-            </div>
-        </div>
-    </section>
-
-    <!-- Experience Section -->
-    <section id="experience" class="section">
-        <div class="container">
-            <h2 class="section-title">Professional Experience</h2>
-            <div class="row">
-                <div class="col-lg-10 mx-auto">
-                    {generate_experience_html(experience)}
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Education Section -->
-    <section id="education" class="section bg-light">
-        <div class="container">
-            <h2 class="section-title">Education</h2>
-            <div class="row">
-                <div class="col-lg-10 mx-auto">
-                    {generate_education_html(education)}
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Projects Section -->
-    <section id="projects" class="section">
-        <div class="container">
-            <h2 class="section-title">Featured Projects</h2>
-            <div class="row">
-                {generate_projects_html(projects)}
-            </div>
-        </div>
-    </section>
-
-    <!-- Contact Section -->
-    <section id="contact" class="contact-info">
-        <div class="container">
-            <div class="row">
-                <div class="col-lg-8 mx-auto text-center">
-                    <h2 class="mb-4">Let's Get In Touch</h2>
-                    <p class="lead mb-5">Ready to start your next project? Let's connect and discuss how we can work together.</p>
-                    <div class="d-flex justify-content-center gap-4 flex-wrap">
-                        {f'<a href="mailto:{email}" class="btn btn-outline-light btn-lg"><i class="fas fa-envelope me-2"></i>{email}</a>' if email else ''}
-                        {f'<a href="tel:{phone}" class="btn btn-outline-light btn-lg"><i class="fas fa-phone me-2"></i>{phone}</a>' if phone else ''}
-                    </div>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <!-- Footer -->
-    <footer class="py-4 bg-dark text-white text-center">
-        <div class="container">
-            <p class="mb-0">&copy; 2024 {name}. All rights reserved.</p>
-        </div>
-    </footer>
-
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.1.3/js/bootstrap.bundle.min.js"></script>
-    <script>
-        // Smooth scrolling for navigation links
-        document.querySelectorAll('a[href^="#"]').forEach(anchor => {{
-            anchor.addEventListener('click', function (e) {{
-                e.preventDefault();
-                const target = document.querySelector(this.getAttribute('href'));
-                if (target) {{
-                    target.scrollIntoView({{
-                        behavior: 'smooth',
-                        block: 'start'
-                    }});
-                }}
-            }});
-        }});
-
-        // Navbar scroll effect
-        window.addEventListener('scroll', function() {{
-            const navbar = document.querySelector('.navbar');
-            if (window.scrollY > 50) {{
-                navbar.classList.add('scrolled');
-            }} else {{
-                navbar.classList.remove('scrolled');
-            }}
-        }});
-
-        // Add fade-in animation on scroll
-        const observerOptions = {{
-            threshold: 0.1,
-            rootMargin: '0px 0px -50px 0px'
-        }};
-
-        const observer = new IntersectionObserver(function(entries) {{
-            entries.forEach(entry => {{
-                if (entry.isIntersecting) {{
-                    entry.target.style.opacity = '1';
-                    entry.target.style.transform = 'translateY(0)';
-                }}
-            }});
-        }}, observerOptions);
-
-        // Observe all cards
-        document.querySelectorAll('.experience-card, .project-card, .education-card').forEach(card => {{
-            card.style.opacity = '0';
-            card.style.transform = 'translateY(20px)';
-            card.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
-            observer.observe(card);
-        }});
-    </script>
-</body>
-</html>
-"""
-    
-    return html
+def generate_portfolio_themes(resume_text: str, themes: Iterable[str] = THEMES) -> Dict[str, str]:
+    """Parse resume text once and render it into every requested theme"""
+    return render_portfolio_themes(parse_resume_data(resume_text), themes)
+
+def get_template_environment() -> Environment:
+    """Shared Jinja2 environment for portfolio templates, compiled once per process"""
+    global _template_env
+    if _template_env is None:
+        _template_env = Environment(
+            loader=FileSystemLoader(PORTFOLIO_TEMPLATE_DIR),
+            bytecode_cache=FileSystemBytecodeCache(os.environ.get('PORTFOLIO_TEMPLATE_CACHE')),
+            autoescape=True,
+            auto_reload=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+    return _template_env
+
+def _sections():
+    return get_template_environment().get_template('sections.html').module
+
+def render_fragments(data: Dict[str, Any]) -> Dict[str, Markup]:
+    """Render the theme-independent section fragments once for reuse across themes"""
+    sections = _sections()
+    return {
+        'skills': sections.skills(data.get('skills', [])),
+        'experience': sections.experience(data.get('experience', [])),
+        'education': sections.education(data.get('education', [])),
+        'projects': sections.projects(data.get('projects', [])),
+    }
+
+def _template_context(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'name': data.get('name', 'Your Name'),
+        'email': data.get('email', ''),
+        'phone': data.get('phone', ''),
+        'summary': data.get('summary', 'Professional summary will be generated from your resume.'),
+        'tagline': 'Professional Developer & Problem Solver',
+        'fragments': render_fragments(data),
+    }
+
+def _theme_template(theme: str):
+    if theme not in THEMES:
+        raise ValueError(f"Unknown portfolio theme: {theme}")
+    return get_template_environment().get_template(f'themes/{theme}.html')
+
+def _minified(html: str, minify: bool) -> str:
+    if not minify:
+        return html
+    with stage('minify'):
+        return minify_html(html)
+
+def create_portfolio_html(data: Dict[str, Any], theme: str = DEFAULT_THEME, minify: bool = False) -> str:
+    """Create the complete portfolio HTML, optionally minified"""
+    with stage('create_portfolio_html'):
+        html = _theme_template(theme).render(_template_context(data))
+    return _minified(html, minify)
+
+def render_portfolio_themes(data: Dict[str, Any], themes: Iterable[str] = THEMES,
+                            minify: bool = False) -> Dict[str, str]:
+    """Render one parsed resume into several themes, sharing the section fragments"""
+    with stage('render_context'):
+        context = _template_context(data)
+    rendered = {}
+    for theme in themes:
+        with stage('render_theme'):
+            html = _theme_template(theme).render(context)
+        rendered[theme] = _minified(html, minify)
+    return rendered
+
+def write_portfolio_themes(data: Dict[str, Any], output_dir: str, basename: str = 'portfolio',
+                           themes: Iterable[str] = THEMES) -> Dict[str, str]:
+    """Render all themes from one parse and write them concurrently as <basename>.<theme>.html"""
+    rendered = render_portfolio_themes(data, themes)
+    os.makedirs(output_dir, exist_ok=True)
+
+    def write(item):
+        theme, html = item
+        path = os.path.join(output_dir, f"{basename}.{theme}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        return theme, path
+
+    with ThreadPoolExecutor(max_workers=min(len(rendered), 8) or 1) as executor:
+        return dict(executor.map(write, rendered.items()))
 
 def generate_skills_html(skills):
     """Generate HTML for skills section with proper spacing"""
-    html = '<div class="col-12 text-center">'
-    for skill in skills:
-        html += f'<span class="skill-badge">{skill}</span>'
-    html += '</div>'
-    return html
+    return str(_sections().skills(skills))
 
 def generate_experience_html(experience):
     """Generate HTML for experience section with proper formatting"""
-    if not experience:
-        return '''
-        <div class="experience-card text-center">
-            <h4>Experience Section</h4>
-            <p class="text-muted">Your work experience will be automatically extracted from your resume and displayed here with proper formatting.</p>
-        </div>
-        '''
-    
-    html = ""
-    for exp in experience:
-        title = exp.get('title', 'Position Title')
-        company = exp.get('company', 'Company Name')
-        duration = exp.get('duration', 'Duration')
-        description = exp.get('description', 'Job description and responsibilities will be displayed here.')
-        
-        html += f"""
-        <div class="experience-card">
-            <div class="d-flex justify-content-between align-items-start mb-3">
-                <div>
-                    <h4 class="mb-1">{title}</h4>
-                    <h6 class="text-muted mb-0">{company}</h6>
-                </div>
-                <span class="badge bg-primary">{duration}</span>
-            </div>
-            <p class="mb-0">{description}</p>
-        </div>
-        """
-    return html
+    return str(_sections().experience(experience))
 
 def generate_education_html(education):
     """Generate HTML for education section"""
-    if not education:
-        return '''
-        <div class="education-card text-center">
-            <h4>Education Section</h4>
-            <p class="text-muted">Your educational background will be automatically extracted from your resume and displayed here.</p>
-        </div>
-        '''
-    
-    html = ""
-    for edu in education:
-        degree = edu.get('degree', 'Degree')
-        institution = edu.get('institution', 'Institution')
-        year = edu.get('year', 'Year')
-        
-        html += f"""
-        <div class="education-card">
-            <div class="d-flex justify-content-between align-items-start">
-                <div>
-                    <h4 class="mb-1">{degree}</h4>
-                    <h6 class="text-muted mb-0">{institution}</h6>
-                </div>
-                <span class="badge bg-secondary">{year}</span>
-            </div>
-        </div>
-        """
-    return html
+    return str(_sections().education(education))
 
 def generate_projects_html(projects):
     """Generate HTML for projects section with proper spacing"""
-    if not projects:
-        return '''
-        <div class="col-12">
-            <div class="project-card text-center">
-                <h4>Sample Project</h4>
-                <p class="mb-3">Your projects will be automatically extracted from your resume and displayed here with descriptions and technologies used.</p>
-                <div class="mt-3">
-                    <small class="text-muted">Technologies: React, Node.js, MongoDB</small>
-                </div>
-            </div>
-        </div>
-        '''
-    
-    html = ""
-    for project in projects:
-        name = project.get('name', 'Project Name')
-        description = project.get('description', 'Project description will be displayed here.')
-        technologies = project.get('technologies', 'Various technologies')
-        
-        html += f"""
-        <div class="col-lg-6 mb-4">
-            <div class="project-card h-100">
-                <h4 class="mb-3">{name}</h4>
-                <p class="mb-4">{description}</p>
-                <div class="mt-auto">
-                    <small class="text-muted">
-                        <i class="fas fa-tools me-2"></i>
-                        <strong>Technologies:</strong> {technologies}
-                    </small>
-                </div>
-            </div>
-        </div>
-        """
-    return html
+    return str(_sections().projects(projects))
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import tempfile
+from typing import AsyncIterable, BinaryIO, Callable, Dict, List, Optional
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Data, Epilogue, Field, File, NeedData
+
+# PDF readers accept the header anywhere in the first 1024 bytes
+PDF_MAGIC = b'%PDF-'
+MAGIC_WINDOW = 1024
+
+CHUNK_SIZE = 64 * 1024
+
+class IngestError(ValueError):
+    """Raised for uploads rejected while streaming; status is the matching HTTP code"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+class IngestedUpload:
+    """A streamed upload: spooled file contents plus what was learned while reading them"""
+
+    def __init__(self, file: BinaryIO, filename: str, size: int, sha256: str, fields: Dict[str, str]):
+        self.file = file
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.fields = fields
+
+    def close(self) -> None:
+        self.file.close()
+
+def _upload_error(e: Exception, max_bytes: int) -> IngestError:
+    """Malformed bodies and the server's own size limits surface as client errors"""
+    if getattr(e, 'code', None) == 413:
+        return _too_large(max_bytes)
+    return IngestError(f'Malformed upload: {str(e)}', getattr(e, 'code', 400))
+
+def _too_large(max_bytes: int) -> IngestError:
+    return IngestError(f'File exceeds the {max_bytes // (1024 * 1024)}MB limit', 413)
+
+class UploadIngester:
+    """Incremental core of ingest_upload: fed the body chunk by chunk, as a sync or async server receives it
+
+    The file part is hashed, checked and written to spool as it arrives;
+    IngestError is raised from feed as soon as the upload is known to be bad.
+    """
+
+    def __init__(self, content_type: Optional[str], field: str, max_bytes: int, spool: BinaryIO,
+                 max_field_bytes: int = 64 * 1024):
+        mimetype, options = parse_options_header(content_type or '')
+        if mimetype != 'multipart/form-data' or 'boundary' not in options:
+            raise IngestError('Expected a multipart/form-data upload')
+        self.decoder = MultipartDecoder(options['boundary'].encode('latin-1'), max_form_memory_size=max_field_bytes)
+        self.field = field
+        self.max_bytes = max_bytes
+        self.spool = spool
+        self.digest = hashlib.sha256()
+        self.fields: Dict[str, str] = {}
+        self.filename = None
+        self.size = 0
+        self._head = b''
+        self._in_file = False
+        self._part = None
+        self._field_chunks: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> bool:
+        """Consume the next chunk of the body (b'' once it has ended); True when the body is complete"""
+        try:
+            self.decoder.receive_data(chunk or None)
+            event = self.decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                self._handle(event)
+                event = self.decoder.next_event()
+        except IngestError:
+            raise
+        except Exception as e:
+            raise _upload_error(e, self.max_bytes) from e
+        return isinstance(event, Epilogue) or not chunk
+
+    def _handle(self, event) -> None:
+        if isinstance(event, File) and event.name == self.field and event.filename and self.filename is None:
+            self._in_file, self._part = True, None
+            self.filename = event.filename
+        elif isinstance(event, (Field, File)):
+            # Other files are skipped; plain fields are kept for the caller
+            self._in_file, self._part = False, (event.name if isinstance(event, Field) else None)
+            self._field_chunks = []
+        elif isinstance(event, Data):
+            if self._in_file:
+                self.size += len(event.data)
+                if self.size > self.max_bytes:
+                    raise _too_large(self.max_bytes)
+                if len(self._head) < MAGIC_WINDOW:
+                    self._head += event.data[:MAGIC_WINDOW - len(self._head)]
+                    if PDF_MAGIC not in self._head and (len(self._head) >= MAGIC_WINDOW or not event.more_data):
+                        raise IngestError('File is not a PDF', 415)
+                self.digest.update(event.data)
+                self.spool.write(event.data)
+            elif self._part is not None:
+                self._field_chunks.append(event.data)
+                if not event.more_data:
+                    self.fields[self._part] = b''.join(self._field_chunks).decode('utf-8', 'replace')
+
+    def result(self) -> IngestedUpload:
+        """The upload, with its spool rewound, once the body is complete"""
+        if self.filename is None:
+            raise IngestError('No file selected')
+        self.spool.seek(0)
+        return IngestedUpload(self.spool, self.filename, self.size, self.digest.hexdigest(), self.fields)
+
+def ingest_upload(stream: BinaryIO, content_type: Optional[str], field: str,
+                  max_bytes: int, spool_max_memory: int = 1024 * 1024,
+                  spool_dir: Optional[str] = None, max_field_bytes: int = 64 * 1024) -> IngestedUpload:
+    """Read a multipart body once, hashing, checking and spooling the file part as it arrives
+
+    Small uploads stay in memory and larger ones roll over to an anonymous file
+    in spool_dir. Reading stops as soon as the file part is known to be bad:
+    no PDF header within the first 1024 bytes (415) or more than max_bytes (413).
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_max_memory, dir=spool_dir)
+    try:
+        ingester = UploadIngester(content_type, field, max_bytes, spool, max_field_bytes)
+        while True:
+            try:
+                chunk = stream.read(CHUNK_SIZE)
+            except Exception as e:
+                raise _upload_error(e, max_bytes) from e
+            if ingester.feed(chunk):
+                return ingester.result()
+    except Exception:
+        spool.close()
+        raise
+
+async def _feed(ingester: UploadIngester, data: bytes) -> bool:
+    """ingester.feed in a thread, so spool writes stay off the event loop
+
+    If the caller is cancelled (client gone, server stopping), the write in
+    flight is waited for before re-raising, so the caller can close the spool.
+    """
+    feeding = asyncio.ensure_future(asyncio.to_thread(ingester.feed, data))
+    try:
+        return await asyncio.shield(feeding)
+    except asyncio.CancelledError:
+        await asyncio.wait([feeding])
+        raise
+
+async def ingest_upload_async(body: AsyncIterable[bytes], content_type: Optional[str], field: str,
+                              max_bytes: int, spool: BinaryIO, max_field_bytes: int = 64 * 1024,
+                              on_data: Optional[Callable[[Dict[str, str]], None]] = None) -> IngestedUpload:
+    """ingest_upload for an asyncio server, reading the body as it is received into spool
+
+    Applies the same checks, raising the same IngestError. Received data is
+    decoded, hashed and written in a thread, CHUNK_SIZE at a time, and
+    on_data, if given, is called on the loop after each with the form fields
+    read so far. The caller owns spool (a named file, say, for a process pool
+    to read) and closes it.
+    """
+    ingester = UploadIngester(content_type, field, max_bytes, spool, max_field_bytes)
+    buffered: List[bytes] = []
+    size = 0
+    try:
+        async for chunk in body:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size >= CHUNK_SIZE:
+                data, buffered, size = b''.join(buffered), [], 0
+                if await _feed(ingester, data):
+                    return await asyncio.to_thread(ingester.result)
+                if on_data is not None:
+                    on_data(ingester.fields)
+    except IngestError:
+        raise
+    except Exception as e:
+        raise _upload_error(e, max_bytes) from e
+    if not (size and await _feed(ingester, b''.join(buffered))):
+        await _feed(ingester, b'')
+    return await asyncio.to_thread(ingester.result)
@@ -0,0 +1,251 @@
+import os
+import time
+import fcntl
+import threading
+import argparse
+from typing import Callable, Dict, Any, Optional, Tuple
+import logging
+
+from utils.storage import PortfolioStore
+from utils.search_index import SearchIndex, INDEX_FILENAME
+from utils import dedup
+
+# Default lock file, in the portfolio folder, that elects the one sweeping janitor
+LOCK_FILENAME = 'janitor.lock'
+
+logger = logging.getLogger(__name__)
+
+class Janitor:
+    """Incremental retention sweeper for stored portfolios and stale uploads"""
+
+    def __init__(self, store: PortfolioStore, upload_folder: str,
+                 ttl_seconds: Optional[float] = 30 * 24 * 3600,
+                 quota_bytes: Optional[int] = None,
+                 upload_grace_seconds: float = 3600,
+                 interval_seconds: float = 300,
+                 batch_size: int = 100,
+                 batch_pause_seconds: float = 0.05,
+                 on_delete: Optional[Callable[[str], None]] = None,
+                 lock_path: Optional[str] = None):
+        self.store = store
+        self.upload_folder = upload_folder
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+        self.upload_grace_seconds = upload_grace_seconds
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.on_delete = on_delete
+        self.lock_path = lock_path
+        self._lock_file = None
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'last_run': None,
+            'last_scan_seconds': 0.0,
+            'expired_removed': 0,
+            'evicted_removed': 0,
+            'orphans_removed': 0,
+            'reclaimed_bytes': 0,
+            'holds_lock': False,
+        }
+
+    def start(self) -> None:
+        """Run sweeps periodically on a daemon thread
+
+        With a lock_path, only the janitor holding the lock sweeps, so any
+        number of processes (gunicorn workers, nodes sharing the folder) can
+        start one. The others retry at each interval and take over when the
+        holder exits.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='portfolio-janitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._release()
+
+    def _acquire(self) -> bool:
+        """Whether this janitor may sweep: it holds the lock, or there is none"""
+        if self.lock_path is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        with self._lock:
+            self._stats['holds_lock'] = True
+        logger.info(f"Janitor lock acquired by process {os.getpid()}")
+        return True
+
+    def _release(self) -> None:
+        # Closing the file drops the lock; it must not be inherited across a fork
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            with self._lock:
+                self._stats['holds_lock'] = False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._acquire():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Janitor sweep failed: {str(e)}")
+            self._stop.wait(self.interval_seconds)
+
+    def _pause(self) -> bool:
+        """Yield between batches; returns True if the janitor was asked to stop"""
+        return self._stop.wait(self.batch_pause_seconds)
+
+    def _delete(self, portfolio_id: str) -> int:
+        freed = self.store.delete(portfolio_id)
+        if self.on_delete is not None:
+            self.on_delete(portfolio_id)
+        return freed
+
+    def run_once(self) -> Dict[str, Any]:
+        """Perform one full sweep and return what it reclaimed"""
+        started = time.perf_counter()
+        expired, expired_bytes = self.expire()
+        evicted, evicted_bytes = self.enforce_quota()
+        orphans, orphan_bytes = self.sweep_uploads()
+
+        result = {
+            'expired_removed': expired,
+            'evicted_removed': evicted,
+            'orphans_removed': orphans,
+            'reclaimed_bytes': expired_bytes + evicted_bytes + orphan_bytes,
+            'scan_seconds': time.perf_counter() - started,
+        }
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['last_run'] = time.time()
+            self._stats['last_scan_seconds'] = result['scan_seconds']
+            for key in ('expired_removed', 'evicted_removed', 'orphans_removed', 'reclaimed_bytes'):
+                self._stats[key] += result[key]
+
+        logger.info(
+            f"Janitor sweep: {result['expired_removed']} expired, {result['evicted_removed']} evicted, "
+            f"{result['orphans_removed']} orphaned uploads, {result['reclaimed_bytes']} bytes reclaimed "
+            f"in {result['scan_seconds']:.3f}s"
+        )
+        return result
+
+    def expire(self) -> Tuple[int, int]:
+        """Delete portfolios not viewed within the TTL, one batch at a time"""
+        if not self.ttl_seconds:
+            return 0, 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = reclaimed = 0
+        while True:
+            batch = self.store.expired(cutoff, self.batch_size)
+            for record in batch:
+                reclaimed += self._delete(record['id'])
+                removed += 1
+            if len(batch) < self.batch_size or self._pause():
+                return removed, reclaimed
+
+    def enforce_quota(self) -> Tuple[int, int]:
+        """Evict least-recently-viewed portfolios until the store fits the quota"""
+        if not self.quota_bytes:
+            return 0, 0
+        removed = reclaimed = 0
+        excess = self.store.stats()['total_bytes'] - self.quota_bytes
+        while excess > 0:
+            batch = self.store.least_recently_viewed(self.batch_size)
+            if not batch:
+                break
+            for record in batch:
+                if excess <= 0:
+                    break
+                freed = self._delete(record['id'])
+                # Indexed size still counts against the quota when the file was already gone
+                excess -= freed or record['size']
+                reclaimed += freed
+                removed += 1
+            if self._pause():
+                break
+        return removed, reclaimed
+
+    def sweep_uploads(self) -> Tuple[int, int]:
+        """Remove uploads older than the grace period that no request cleaned up"""
+        cutoff = time.time() - self.upload_grace_seconds
+        removed = reclaimed = 0
+        try:
+            entries = os.scandir(self.upload_folder)
+        except FileNotFoundError:
+            return 0, 0
+        with entries:
+            for count, entry in enumerate(entries, 1):
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    if stat.st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                        reclaimed += stat.st_size
+                except FileNotFoundError:
+                    continue
+                if count % self.batch_size == 0 and self._pause():
+                    break
+        return removed, reclaimed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+def main():
+    parser = argparse.ArgumentParser(description='Expire old portfolios and sweep orphaned uploads')
+    parser.add_argument('--portfolio-folder', default='generated_portfolios')
+    parser.add_argument('--upload-folder', default='uploads')
+    parser.add_argument('--ttl-days', type=float, default=30)
+    parser.add_argument('--quota-mb', type=float, default=None)
+    parser.add_argument('--upload-grace-minutes', type=float, default=60)
+    parser.add_argument('--interval', type=float, default=300, help='seconds between sweeps')
+    parser.add_argument('--once', action='store_true', help='run a single sweep and exit')
+    args = parser.parse_args()
+
+    search_index = SearchIndex(os.path.join(args.portfolio_folder, INDEX_FILENAME))
+    dedup_index = dedup.DedupIndex(os.path.join(args.portfolio_folder, dedup.INDEX_FILENAME))
+
+    def forget(portfolio_id):
+        search_index.remove(portfolio_id)
+        dedup_index.remove(portfolio_id)
+
+    janitor = Janitor(
+        PortfolioStore(args.portfolio_folder),
+        args.upload_folder,
+        ttl_seconds=args.ttl_days * 24 * 3600 if args.ttl_days else None,
+        quota_bytes=int(args.quota_mb * 1024 * 1024) if args.quota_mb else None,
+        upload_grace_seconds=args.upload_grace_minutes * 60,
+        interval_seconds=args.interval,
+        on_delete=forget,
+        lock_path=os.path.join(args.portfolio_folder, LOCK_FILENAME),
+    )
+    if args.once:
+        print(janitor.run_once())
+        return
+
+    janitor.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        janitor.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import argparse
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from utils.storage import configure_sqlite, use_shared_journal_mode
+
+# Default queue location, alongside the portfolio store's own index
+INDEX_FILENAME = 'jobs.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    input_path TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    result TEXT,
+    error TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (state, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (state, lease_expires);
+"""
+
+# queued -> running -> done, or back to queued after a failure or a lost lease
+# until max_attempts is used up, then dead
+STATES = ('queued', 'running', 'done', 'dead')
+
+class JobQueue:
+    """Durable work queue in a SQLite file on the shared portfolio volume
+
+    Any process that can open the file, on any node, can enqueue jobs or
+    claim them; there is no broker. A claimed job is leased to one worker
+    for ``lease_seconds`` and the worker keeps the lease alive with
+    heartbeats. A job whose worker died (its lease ran out) or that failed
+    goes back to the queue after an exponential backoff, until
+    ``max_attempts`` claims are used up; then it is dead-lettered and stays
+    for inspection and requeueing. Every state change checks the lease
+    token handed out by the claim, so a worker that lost its lease cannot
+    overwrite the outcome of the one that took over.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0, max_attempts: int = 3,
+                 retry_delay: float = 5.0, max_retry_delay: float = 300.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    # Sent to process-pool workers by path; each reopens the file itself
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        del state['_local']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited through fork belongs to the parent; leave it be
+        if conn is None or self._local.pid != os.getpid():
+            # Transactions are explicit so a claim can take the write lock up front
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            configure_sqlite(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # BEGIN IMMEDIATE takes the write lock before the first read, so two
+    # workers can never both see the same job as claimable
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+                input_path: Optional[str] = None, max_attempts: Optional[int] = None,
+                delay: float = 0.0) -> str:
+        """Add a job; input_path names a file the job owns, removed when the job is purged
+
+        input_path is relative to the queue file's folder, since the shared
+        volume may be mounted at a different path on every node.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, payload, input_path, state, max_attempts, available_at, created, updated) '
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), input_path, max_attempts or self.max_attempts,
+                 now + delay, now, now))
+        return job_id
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.retry_delay * 2 ** max(attempts - 1, 0), self.max_retry_delay)
+
+    def _reclaim_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        """Requeue or dead-letter running jobs whose worker stopped heartbeating"""
+        expired = conn.execute("SELECT id, attempts, max_attempts FROM jobs WHERE state = 'running' "
+                               'AND lease_expires < ?', (now,)).fetchall()
+        for row in expired:
+            dead = row['attempts'] >= row['max_attempts']
+            conn.execute(
+                'UPDATE jobs SET state = ?, available_at = ?, lease = NULL, lease_owner = NULL, '
+                'lease_expires = NULL, updated = ?, error = ? WHERE id = ?',
+                ('dead' if dead else 'queued', now + self._backoff(row['attempts']), now,
+                 f"Lease expired after {row['attempts']} attempt(s)", row['id']))
+
+    def claim(self, worker: str, kinds: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job to the worker, or None when there is nothing to do"""
+        now = time.time()
+        kinds = list(kinds or ())
+        kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})" if kinds else ''
+        with self._transaction() as conn:
+            self._reclaim_expired(conn, now)
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE state = 'queued' AND available_at <= ?{kind_filter} "
+                'ORDER BY available_at LIMIT 1', [now] + kinds).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease = ?, lease_owner = ?, "
+                'lease_expires = ?, heartbeat = ?, updated = ? WHERE id = ?',
+                (uuid.uuid4().hex, worker, now + self.lease_seconds, now, now, row['id']))
+            return self._row_to_job(conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone())
+
+    def heartbeat(self, job_id: str, lease: str) -> bool:
+        """Extend the lease; False means it was lost and the job now belongs to someone else"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, heartbeat = ?, updated = ? "
+                "WHERE id = ? AND lease = ? AND state = 'running'",
+                (now + self.lease_seconds, now, now, job_id, lease))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, lease: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease = NULL, lease_expires = NULL, "
+                "updated = ? WHERE id = ? AND lease = ? AND state = 'running'",
+                (json.dumps(result) if result is not None else None, now, job_id, lease))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, lease: str, error: str, retry: bool = True) -> Optional[str]:
+        """Record a failed attempt: back to the queue after a backoff, or dead once out of attempts
+
+        Returns the job's new state, or None if the lease had already been lost.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease = ? "
+                               "AND state = 'running'", (job_id, lease)).fetchone()
+            if row is None:
+                return None
+            state = 'queued' if retry and row['attempts'] < row['max_attempts'] else 'dead'
+            conn.execute(
+                'UPDATE jobs SET state = ?, available_at = ?, error = ?, lease = NULL, lease_owner = NULL, '
+                'lease_expires = NULL, updated = ? WHERE id = ?',
+                (state, now + self._backoff(row['attempts']), error, now, job_id))
+        return state
+
+    def requeue(self, job_id: str) -> bool:
+        """Give a dead job a fresh set of attempts"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0, available_at = ?, updated = ? "
+                "WHERE id = ? AND state = 'dead'", (now, now, job_id))
+        return cursor.rowcount == 1
+
+    def input_abspath(self, input_path: str) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(self.path)), input_path)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def jobs(self, state: str, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self._connect().execute('SELECT * FROM jobs WHERE state = ? ORDER BY updated DESC LIMIT ?',
+                                       (state, limit)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def purge(self, older_than: float, states: Iterable[str] = ('done',)) -> int:
+        """Delete finished jobs last updated before older_than, and their input files"""
+        states = list(states)
+        placeholders = ', '.join('?' * len(states))
+        with self._transaction() as conn:
+            rows = conn.execute(f'SELECT id, input_path FROM jobs WHERE state IN ({placeholders}) AND updated < ?',
+                                states + [older_than]).fetchall()
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(row['id'],) for row in rows])
+        for row in rows:
+            if row['input_path']:
+                try:
+                    os.remove(self.input_abspath(row['input_path']))
+                except FileNotFoundError:
+                    pass
+        return len(rows)
+
+    def backlog(self) -> int:
+        """Queued jobs that are due now and waiting for a worker"""
+        return self._connect().execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND available_at <= ?",
+                                       (time.time(),)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Jobs per state, how many are due now and the age of the oldest waiting one"""
+        conn = self._connect()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+        now = time.time()
+        due, oldest = conn.execute("SELECT COUNT(*), MIN(available_at) FROM jobs "
+                                   "WHERE state = 'queued' AND available_at <= ?", (now,)).fetchone()
+        workers = conn.execute("SELECT COUNT(DISTINCT lease_owner) FROM jobs WHERE state = 'running'").fetchone()[0]
+        return {
+            'states': counts,
+            'due': due,
+            'oldest_due_seconds': now - oldest if oldest is not None else 0.0,
+            'busy_workers': workers,
+        }
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and manage the shared job queue')
+    parser.add_argument('--portfolio-folder', default='generated_portfolios')
+    parser.add_argument('--dead', action='store_true', help='list dead-lettered jobs and their last error')
+    parser.add_argument('--requeue', action='append', metavar='JOB_ID', help='retry a dead job (repeatable)')
+    parser.add_argument('--purge-days', type=float, help='delete done and dead jobs older than this')
+    args = parser.parse_args()
+
+    use_shared_journal_mode()
+    queue = JobQueue(os.path.join(args.portfolio_folder, INDEX_FILENAME))
+    for job_id in args.requeue or ():
+        print(f"{job_id}: {'requeued' if queue.requeue(job_id) else 'not dead-lettered'}")
+    if args.purge_days is not None:
+        purged = queue.purge(time.time() - args.purge_days * 86400, states=('done', 'dead'))
+        print(f"Purged {purged} jobs")
+    if args.dead:
+        for job in queue.jobs('dead'):
+            print(f"{job['id']}  {job['kind']}  attempts={job['attempts']}  {job['error']}")
+    print(json.dumps(queue.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import re
+from functools import lru_cache
+from typing import List
+
+# HTML whitespace only: \s would also match U+00A0 (&nbsp; in user text),
+# which is visible and must survive
+_HTML_SPACE = re.compile(r'[ \t\n\r\f]+')
+
+# Elements whose surrounding whitespace is never rendered: it sits between
+# block boxes or next to elements that generate no box at all
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'body', 'br', 'dd', 'details', 'dialog', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header',
+    'hr', 'html', 'li', 'link', 'main', 'meta', 'nav', 'noscript', 'ol', 'p', 'pre', 'script', 'section', 'style',
+    'summary', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title', 'tr', 'ul', '!doctype',
+))
+
+# One alternative per token, each decided by its first characters, so the scan
+# is a single linear pass. Raw-text elements are matched whole so nothing
+# inside them is mistaken for markup; a quoted attribute value may hold '>'
+_ATTRS = r'''[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*'''
+_TOKEN = re.compile(
+    r'(?P<text>[^<]+)'
+    r'|<!--(?P<comment>.*?)-->'
+    rf'|(?P<open><(?P<raw>pre|textarea|script|style)\b{_ATTRS}>)'
+    r'(?P<body>[^<]*(?:<(?!/(?P=raw)\s*>)[^<]*)*)(?P<close></(?P=raw)\s*>)'
+    rf'|(?P<tag></?(?P<name>[A-Za-z][^\s/>]*|!doctype)\b{_ATTRS}>)'
+    r'|(?P<other><)',
+    re.S | re.I,
+)
+
+_SCRIPT_TYPE = re.compile(r'''\btype\s*=\s*["']?([^"'\s>]*)''', re.I)
+_JS_TYPES = ('', 'text/javascript', 'application/javascript', 'module')
+
+_CSS_TOKEN = re.compile(
+    r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|/\*.*?\*/|\s+|[{};,>:]|[^"\'/\s{};,>:]+|.',
+    re.S,
+)
+# No space is needed after these, nor before any but ':' (a space before ':'
+# is a descendant combinator in a selector, as in "nav :hover")
+_CSS_PUNCTUATION = frozenset('{};,>:')
+
+def minify_css(css: str) -> str:
+    """Drop comments and the whitespace CSS does not need, leaving strings as they are"""
+    out: List[str] = []
+    space = False
+    for token in _CSS_TOKEN.findall(css):
+        if token.isspace() or (token.startswith('/*') and token.endswith('*/') and len(token) >= 4):
+            space = True
+            continue
+        if space and out and out[-1] not in _CSS_PUNCTUATION and (token == ':' or token not in _CSS_PUNCTUATION):
+            out.append(' ')
+        space = False
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(token)
+    return ''.join(out)
+
+# A line break after these, or before a closing bracket, cannot change how
+# automatic semicolon insertion reads the script, so those lines are joined
+_JS_OPENERS = ('{', '(', '[', ',', ';')
+_JS_CLOSERS = ('}', ')', ']')
+
+def minify_js(js: str) -> str:
+    """Strip indentation, blank lines and whole-line comments from a script
+
+    Deliberately conservative: statements are never rewritten and a line break
+    is only removed after a character that cannot end a statement or before a
+    closing bracket. Scripts with
+    template literals or line continuations, where leading whitespace may be
+    part of a string, are only trimmed.
+    """
+    if '`' in js or '\\\n' in js:
+        return js.strip()
+    lines: List[str] = []
+    for line in js.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        # A '//' anywhere may start a trailing comment that would swallow the next line
+        if lines and '//' not in lines[-1] and (lines[-1].endswith(_JS_OPENERS) or line.startswith(_JS_CLOSERS)):
+            lines[-1] += line
+        else:
+            lines.append(line)
+    return '\n'.join(lines)
+
+# Inline styles and scripts come from the templates, so each distinct block is
+# minified once per process and looked up after that
+@lru_cache(maxsize=256)
+def _minify_raw(name: str, open_tag: str, body: str) -> str:
+    if name == 'style':
+        return minify_css(body)
+    if name == 'script':
+        match = _SCRIPT_TYPE.search(open_tag)
+        if (match.group(1).lower() if match else '') in _JS_TYPES:
+            return minify_js(body)
+    # <pre>, <textarea> and data scripts are kept byte for byte
+    return body
+
+def minify_html(html: str) -> str:
+    """Collapse insignificant whitespace and minify the inline CSS and JS of a page
+
+    Runs of whitespace in text become one space, and are dropped entirely next
+    to block-level tags; comments are removed except conditional ones. Tags,
+    attribute values and <pre>/<textarea> contents are left untouched, so the
+    page renders the same.
+    """
+    out: List[str] = []
+    text: List[str] = []
+    after_block = True
+
+    def flush(before_block: bool) -> None:
+        collapsed = _HTML_SPACE.sub(' ', ''.join(text))
+        if after_block:
+            collapsed = collapsed.lstrip(' ')
+        if before_block:
+            collapsed = collapsed.rstrip(' ')
+        out.append(collapsed)
+        text.clear()
+
+    for match in _TOKEN.finditer(html):
+        kind = match.lastgroup
+        if kind == 'text' or kind == 'other':
+            text.append(match.group())
+            continue
+        if kind == 'comment':
+            if match.group('comment').startswith(('[if', '<![endif')):
+                if text:
+                    flush(False)
+                out.append(match.group())
+                after_block = False
+            continue
+        if kind == 'close':
+            name = match.group('raw').lower()
+            block = name in BLOCK_TAGS
+            if text:
+                flush(block)
+            open_tag = match.group('open')
+            out.append(open_tag)
+            out.append(_minify_raw(name, open_tag, match.group('body')))
+            out.append(match.group('close'))
+        else:
+            block = match.group('name').lower() in BLOCK_TAGS
+            if text:
+                flush(block)
+            out.append(match.group())
+        after_block = block
+    if text:
+        flush(True)
+    return ''.join(out)
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, List
+
+from utils.storage import configure_sqlite
+
+# Default cache location, alongside the portfolio store's own index
+INDEX_FILENAME = 'pages.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_pages_used ON pages (used);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pages INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+# Evict least recently used pages after this many writes from one process
+PRUNE_EVERY = 100
+
+# Keys per query, under SQLite's limit on bound parameters
+_CHUNK = 500
+
+class PageCache:
+    """Extracted text of PDF pages keyed by a fingerprint of the page's content
+
+    A resume re-uploaded with one page edited only has that page extracted
+    again; the others are answered from here. The cache is a SQLite file, so
+    every server worker and process-pool worker shares it, and it is bounded
+    to ``max_pages`` entries, evicting the least recently used. The page hit
+    ratio of the last ``history`` documents is kept for metrics.
+    """
+
+    def __init__(self, path: str, max_pages: int = 50000, history: int = 1000):
+        self.path = path
+        self.max_pages = max_pages
+        self.history = history
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    # Sent to process-pool workers by path; each reopens the file itself
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'path': self.path, 'max_pages': self.max_pages, 'history': self.history}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited through fork belongs to the parent; leave it be
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            configure_sqlite(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Cached text for whichever of the keys are present"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        conn = self._connect()
+        for start in range(0, len(keys), _CHUNK):
+            chunk = keys[start:start + _CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            found.update(conn.execute(f'SELECT key, text FROM pages WHERE key IN ({placeholders})', chunk))
+        if found:
+            with conn:
+                conn.executemany('UPDATE pages SET used = ? WHERE key = ?',
+                                 [(time.time(), key) for key in found])
+        return found
+
+    def put(self, key: str, text: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO pages (key, text, used) VALUES (?, ?, ?)',
+                         (key, text, time.time()))
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Evict least recently used pages beyond max_pages; returns how many"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                'DELETE FROM pages WHERE key IN (SELECT key FROM pages ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                (self.max_pages,))
+        return cursor.rowcount
+
+    def record_document(self, pages: int, hits: int) -> None:
+        """Note how many of a document's pages were answered from the cache"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute('INSERT INTO documents (pages, hits, created) VALUES (?, ?, ?)',
+                                  (pages, hits, time.time()))
+            conn.execute('DELETE FROM documents WHERE id <= ?', (cursor.lastrowid - self.history,))
+
+    def recent_documents(self, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            'SELECT pages, hits, created FROM documents ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        return [{'pages': pages, 'hits': hits, 'hit_ratio': hits / pages if pages else 0.0, 'created': created}
+                for pages, hits, created in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and page hit ratios over the recorded documents"""
+        conn = self._connect()
+        entries = conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        documents, pages, hits, full, partial, mean_ratio = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(hits), 0), '
+            'COALESCE(SUM(hits = pages AND pages > 0), 0), COALESCE(SUM(hits > 0 AND hits < pages), 0), '
+            'COALESCE(AVG(CASE WHEN pages > 0 THEN CAST(hits AS REAL) / pages END), 0.0) FROM documents'
+        ).fetchone()
+        return {
+            'entries': entries,
+            'documents': documents,
+            'pages': pages,
+            'page_hits': hits,
+            'page_hit_ratio': hits / pages if pages else 0.0,
+            'mean_document_hit_ratio': mean_ratio,
+            'documents_fully_cached': full,
+            'documents_partially_cached': partial,
+            'documents_uncached': documents - full - partial,
+            'recent': self.recent_documents(),
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
@@ -1,13 +1,166 @@
+import os
+import hashlib
 import PyPDF2
 import pdfplumber
 import re
-from typing import Dict, List, Any, Optional, Tuple
+from PyPDF2.generic import IndirectObject, StreamObject
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
 import logging
 
+from utils.profiling import stage
+
+if TYPE_CHECKING:
+    from utils.page_cache import PageCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Content-stream operator that opens a text object
+TEXT_OBJECT_RE = re.compile(rb'(?:^|\s)BT(?:\s|$)')
+
+# Bounded by the RFC 5321 lengths (64 for the local part, 253 for the domain)
+# so each attempt does constant work and a scan stays linear on long runs of
+# address characters; unbounded + on both sides was quadratic
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]{1,253}\.[A-Za-z]{2,7}\b')
+
+class ImageOnlyPDFError(Exception):
+    """Raised when a PDF has no text layer, e.g. a scanned resume"""
+
+class UnreadablePDFError(Exception):
+    """Raised when no extractor gets any text out of a PDF, e.g. a malformed or encrypted one"""
+
+def _has_fonts(resources, depth: int = 0) -> bool:
+    """Check a resource dictionary (and nested form XObjects) for fonts"""
+    if not resources:
+        return False
+    resources = resources.get_object()
+    if resources.get('/Font'):
+        return True
+    if depth >= 2:
+        return False
+    xobjects = resources.get('/XObject')
+    if xobjects:
+        for xobject in xobjects.get_object().values():
+            xobject = xobject.get_object()
+            if xobject.get('/Subtype') == '/Form' and _has_fonts(xobject.get('/Resources'), depth + 1):
+                return True
+    return False
+
+def _has_text_objects(data: bytes, resources, depth: int = 0) -> bool:
+    """Check a content stream (and the form XObjects it can draw) for text objects"""
+    if TEXT_OBJECT_RE.search(data):
+        return True
+    if not resources or depth >= 2:
+        return False
+    xobjects = resources.get_object().get('/XObject')
+    if xobjects:
+        for xobject in xobjects.get_object().values():
+            xobject = xobject.get_object()
+            if (xobject.get('/Subtype') == '/Form'
+                    and _has_text_objects(xobject.get_data(), xobject.get('/Resources'), depth + 1)):
+                return True
+    return False
+
+def _object_digest(obj, memo: Dict[Tuple[int, int], bytes]) -> bytes:
+    """Digest of a PDF object with references followed, streams included
+
+    ``memo`` holds the digests of indirect objects already visited, so a font
+    shared by every page is hashed once per document and cycles terminate.
+    """
+    if isinstance(obj, IndirectObject):
+        key = (obj.idnum, obj.generation)
+        if key not in memo:
+            memo[key] = b'R%d' % obj.idnum
+            memo[key] = _object_digest(obj.get_object(), memo)
+        return memo[key]
+    digest = hashlib.sha256(type(obj).__name__.encode())
+    if isinstance(obj, StreamObject):
+        digest.update(obj._data)
+    if isinstance(obj, dict):
+        for name in sorted(obj):
+            if name != '/Parent':
+                digest.update(name.encode())
+                digest.update(_object_digest(obj[name], memo))
+    elif isinstance(obj, list):
+        for item in obj:
+            digest.update(_object_digest(item, memo))
+    else:
+        digest.update(repr(obj).encode())
+    return digest.digest()
+
+def page_fingerprint(page, memo: Optional[Dict[Tuple[int, int], bytes]] = None) -> str:
+    """Key for a page's extracted text: its content streams, resources and geometry
+
+    Two pages with the same fingerprint produce the same pdfplumber text,
+    whichever documents they came from. The pdfplumber version is part of the
+    key so an upgrade does not serve text extracted by the old one.
+    """
+    memo = {} if memo is None else memo
+    digest = hashlib.sha256(pdfplumber.__version__.encode())
+    for name in ('/Contents', '/Resources', '/MediaBox', '/CropBox', '/Rotate'):
+        digest.update(name.encode())
+        digest.update(_object_digest(page.get(name), memo))
+    return digest.hexdigest()
+
+# A path, or an already open binary file such as a spooled upload
+PDFSource = Union[str, os.PathLike, BinaryIO]
+
+# Called with (pages done, pages to extract) as extraction proceeds
+PageProgress = Callable[[int, int], None]
+
+@contextmanager
+def open_pdf_source(source: PDFSource) -> Iterator[BinaryIO]:
+    """Open a path, or rewind a file object the caller keeps ownership of"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield file
+    else:
+        source.seek(0)
+        yield source
+
+def probe_text_layer(file_path: PDFSource, inspect_pages: int = 3, fingerprints: bool = False) -> Dict[str, Any]:
+    """Cheaply classify a PDF as 'text', 'image_only' or 'mixed' without extracting text
+
+    Every page is checked for font resources; the first ``inspect_pages`` pages
+    also have their content streams, and those of the form XObjects they can
+    draw, scanned for text objects. With
+    ``fingerprints`` the result also lists every page's page_fingerprint, or
+    None if they could not be computed.
+    """
+    page_fingerprints = None
+    with open_pdf_source(file_path) as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        text_pages = []
+        for page_num, page in enumerate(pdf_reader.pages):
+            resources = page.get('/Resources')
+            has_text = _has_fonts(resources)
+            if has_text and page_num < inspect_pages:
+                contents = page.get_contents()
+                has_text = _has_text_objects(contents.get_data() if contents is not None else b'', resources)
+            if has_text:
+                text_pages.append(page_num)
+        page_count = len(pdf_reader.pages)
+        if fingerprints:
+            try:
+                memo: Dict[Tuple[int, int], bytes] = {}
+                page_fingerprints = [page_fingerprint(page, memo) for page in pdf_reader.pages]
+            except Exception as e:
+                logger.warning(f"Could not fingerprint pages: {str(e)}")
+
+    if not text_pages:
+        kind = 'image_only'
+    elif len(text_pages) == page_count:
+        kind = 'text'
+    else:
+        kind = 'mixed'
+    probe = {'kind': kind, 'page_count': page_count, 'text_pages': text_pages}
+    if fingerprints:
+        probe['fingerprints'] = page_fingerprints
+    return probe
+
 class ResumeParser:
     def __init__(self):
         self.common_skills = {
@@ -30,50 +183,137 @@ class ResumeParser:
             'achievements': ['achievements', 'accomplishments', 'awards', 'honors']
         }
 
-    def extract_text_from_pdf(self, file_path: str) -> str:
+        # Any header keyword at all; most lines have none, so this saves the
+        # per-section keyword loop for the few that might be headers
+        self.header_keyword_re = re.compile('|'.join(
+            re.escape(keyword) for keywords in self.section_keywords.values() for keyword in keywords))
+
+        # Line-based parsers for the sections that become resume fields
+        self.section_parsers = {
+            'summary': self.summary_from_lines,
+            'experience': self.experience_from_lines,
+            'education': self.education_from_lines,
+            'projects': self.projects_from_lines,
+            'certifications': self.certifications_from_lines
+        }
+
+    def extract_text_from_pdf(self, file_path: PDFSource, progress: Optional[PageProgress] = None,
+                              page_cache: Optional['PageCache'] = None) -> str:
         """Extract text from PDF with improved error handling"""
+        text = "".join(page_text + "\n" for page_text in self.iter_page_texts(file_path, progress, page_cache))
+        with stage('clean_text'):
+            return self.clean_text(text)
+
+    def text_pages_to_extract(self, file_path: PDFSource,
+                              fingerprints: bool = False) -> Tuple[Optional[List[int]], Optional[List[str]]]:
+        """Zero-based pages worth extracting (None for all of them) and, if asked, every page's fingerprint"""
+        # Pre-flight: reject scanned resumes before any expensive extraction and
+        # only visit the pages that actually carry text
+        try:
+            probe = probe_text_layer(file_path, fingerprints=fingerprints)
+        except Exception as e:
+            logger.warning(f"Text layer probe failed, extracting all pages: {str(e)}")
+            return None, None
+        if probe['kind'] == 'image_only':
+            raise ImageOnlyPDFError(
+                "This PDF appears to be a scanned image with no selectable text. "
+                "Please upload a PDF exported from a word processor or run OCR on it first."
+            )
+        if probe['kind'] == 'mixed':
+            logger.info(f"Extracting {len(probe['text_pages'])} of {probe['page_count']} pages with text")
+            return probe['text_pages'], probe.get('fingerprints')
+        return None, probe.get('fingerprints')
+
+    def iter_page_texts(self, file_path: PDFSource, progress: Optional[PageProgress] = None,
+                        page_cache: Optional['PageCache'] = None) -> Iterator[str]:
+        """Yield the raw text of each page as soon as it is extracted
+
+        pdfplumber is tried first; if it fails part way through, PyPDF2 carries
+        on from the first page pdfplumber did not finish, and if it produced no
+        text at all PyPDF2 starts over. ``progress`` is called with (pages done,
+        pages to extract) after each page.
+
+        With a ``page_cache``, pages whose fingerprint was seen before (say,
+        every page but the one a user corrected before re-uploading) are taken
+        from the cache instead of going through pdfplumber, and the document's
+        page hit count is recorded once pdfplumber has finished it.
+        """
+        with stage('pdf_probe'):
+            text_pages, fingerprints = self.text_pages_to_extract(file_path, fingerprints=page_cache is not None)
+        cached: Dict[str, str] = {}
+        if fingerprints is not None:
+            page_nums = text_pages if text_pages is not None else range(len(fingerprints))
+            cached = page_cache.get_many(fingerprints[page_num] for page_num in page_nums)
+        hits = 0
+        done = 0
+        found_text = False
+
         try:
             # Try pdfplumber first (better for formatted documents)
-            with pdfplumber.open(file_path) as pdf:
-                text = ""
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
+            pages = [page_num + 1 for page_num in text_pages] if text_pages is not None else None
+            with open_pdf_source(file_path) as file:
+                with stage('pdf_open'):
+                    pdf = pdfplumber.open(file, pages=pages)
+                with pdf:
+                    for page in pdf.pages:
+                        key = fingerprints[page.page_number - 1] if fingerprints is not None else None
+                        if key in cached:
+                            page_text = cached[key]
+                            hits += 1
                         else:
-                            logger.warning(f"No text extracted from page {page_num + 1}")
-                    except Exception as e:
-                        logger.error(f"Error extracting text from page {page_num + 1}: {str(e)}")
-                        continue
-                
-                if text.strip():
-                    return self.clean_text(text)
-                    
+                            try:
+                                with stage('extract_page'):
+                                    page_text = page.extract_text()
+                            except Exception as e:
+                                logger.error(f"Error extracting text from page {page.page_number}: {str(e)}")
+                                page_text = None
+                            if key is not None and page_text is not None:
+                                page_cache.put(key, page_text)
+                        done += 1
+                        if progress:
+                            progress(done, len(pdf.pages))
+                        if page_text and page_text.strip():
+                            found_text = True
+                            yield page_text
+                        elif page_text is not None:
+                            logger.warning(f"No text extracted from page {page.page_number}")
+
+                    if fingerprints is not None:
+                        logger.info(f"Page cache: {hits} of {done} pages reused")
+                        page_cache.record_document(done, hits)
+                    if found_text:
+                        return
+
         except Exception as e:
             logger.error(f"pdfplumber failed: {str(e)}")
-        
+
         # Fallback to PyPDF2
+        if not found_text:
+            done = 0
         try:
-            with open(file_path, 'rb') as file:
+            with open_pdf_source(file_path) as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page_num, page in enumerate(pdf_reader.pages):
+                page_nums = text_pages if text_pages is not None else range(len(pdf_reader.pages))
+                for position, page_num in enumerate(page_nums[done:], done + 1):
+                    page = pdf_reader.pages[page_num]
                     try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
+                        with stage('extract_page'):
+                            page_text = page.extract_text()
                     except Exception as e:
                         logger.error(f"Error extracting text from page {page_num + 1} with PyPDF2: {str(e)}")
                         continue
-                
-                if text.strip():
-                    return self.clean_text(text)
-                    
+                    finally:
+                        if progress:
+                            progress(position, len(page_nums))
+                    if page_text and page_text.strip():
+                        found_text = True
+                        yield page_text
+
         except Exception as e:
             logger.error(f"PyPDF2 also failed: {str(e)}")
-            
-        raise Exception("Could not extract text from PDF using any method")
+
+        if not found_text:
+            raise UnreadablePDFError("Could not extract text from PDF using any method")
 
     def clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
@@ -100,58 +340,143 @@ class ResumeParser:
         
         return '\n'.join(cleaned_lines)
 
+    def clean_line(self, line: str) -> str:
+        """clean_text for a single line; empty for lines that should be dropped"""
+        line = re.sub(r'\s+', ' ', line).strip()
+        line = line.replace('–', '-').replace('"', '"').replace('"', '"')
+        if re.match(r'^\d+$', line) or len(line) <= 2:
+            return ""
+        return line
+
+    def iter_clean_lines(self, page_texts: Iterable[str]) -> Iterator[str]:
+        """Split pages into cleaned, non-empty lines, one page at a time"""
+        for page_text in page_texts:
+            with stage('clean_text'):
+                lines = [line for line in map(self.clean_line, page_text.split('\n')) if line]
+            yield from lines
+
     def parse_resume_data(self, text: str) -> Dict[str, Any]:
         """Parse resume text and extract structured data with improved logic"""
+        # Every field, post-processed, sharing one line table and section index
+        return self.parse_resume_lazy(text).to_dict()
+
+    def parse_resume_lazy(self, text: str) -> 'LazyResumeData':
+        """Parse result whose fields are only extracted when read"""
+        return LazyResumeData(self, text)
+
+    def parse_resume_stream(self, lines: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+        """Parse cleaned lines as they arrive, yielding (field, value) once a field is settled
+
+        Email and phone are reported on the first line that has them and the name
+        within the first 10 lines. A section is parsed when the next header (or
+        the end of the text) closes it, so only the open section's lines are
+        held; if a header repeats, the later section is reported again and wins.
+        Skills come last since the whole text is searched for known skills.
+        """
+        contact = {'name', 'email', 'phone'}
+        known_skills = set()
+        section_skills = set()
+        section, section_lines = None, []
+
+        for line_num, line in enumerate(lines):
+            if 'name' in contact and (line_num >= 10 or self.is_name_line(line)):
+                contact.discard('name')
+                yield 'name', line if line_num < 10 else "Your Name"
+            if 'email' in contact:
+                email = self.extract_email(line)
+                if email:
+                    contact.discard('email')
+                    yield 'email', email
+            if 'phone' in contact:
+                phone = self.extract_phone(line)
+                if phone:
+                    contact.discard('phone')
+                    yield 'phone', phone
+            known_skills |= self.find_common_skills(line)
+
+            header = self.match_section_header(line)
+            if header:
+                if section:
+                    yield from self._close_section(section, section_lines, section_skills)
+                section, section_lines = header, []
+            elif section:
+                section_lines.append(line)
+
+        if section:
+            yield from self._close_section(section, section_lines, section_skills)
+        if 'name' in contact:
+            yield 'name', "Your Name"
+        yield 'skills', list(known_skills | section_skills)[:15]
+
+    def _close_section(self, section: str, lines: List[str], section_skills: set) -> Iterator[Tuple[str, Any]]:
+        if section == 'skills':
+            # Reported with the known skills at the end of the text
+            with stage('extract_skills'):
+                section_skills.clear()
+                section_skills |= self.skills_from_lines(lines)
+        elif section in self.section_parsers:
+            with stage(f'extract_{section}'):
+                value = self.post_process_field(section, self.section_parsers[section](lines))
+            yield section, value
+
+    def parse_resume_lines(self, lines: Iterable[str],
+                           on_field: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Collect parse_resume_stream into the same structure as parse_resume_data"""
         resume_data = {
-            'name': self.extract_name(text),
-            'email': self.extract_email(text),
-            'phone': self.extract_phone(text),
-            'summary': self.extract_summary(text),
-            'experience': self.extract_experience(text),
-            'education': self.extract_education(text),
-            'skills': self.extract_skills(text),
-            'projects': self.extract_projects(text),
-            'certifications': self.extract_certifications(text)
+            'name': "Your Name",
+            'email': "",
+            'phone': "",
+            'summary': "",
+            'experience': [],
+            'education': [],
+            'skills': [],
+            'projects': [],
+            'certifications': []
         }
-        
-        # Post-process to ensure data quality
-        resume_data = self.post_process_data(resume_data)
+        for field, value in self.parse_resume_stream(lines):
+            resume_data[field] = value
+            if on_field:
+                on_field(field)
         return resume_data
 
     def extract_name(self, text: str) -> str:
         """Extract name with improved logic"""
-        lines = text.split('\n')
-        
+        return self.name_from_lines(text.split('\n'))
+
+    def name_from_lines(self, lines: List[str]) -> str:
+        """First name-like line among the first 10"""
         # Look for name patterns in first 10 lines
         for line in lines[:10]:
             line = line.strip()
-            if not line:
-                continue
-                
-            # Skip lines with contact info
-            if any(keyword in line.lower() for keyword in ['email', 'phone', 'address', '@', 'linkedin', 'github']):
-                continue
-                
-            # Skip lines with common resume headers
-            if any(keyword in line.lower() for keyword in ['resume', 'cv', 'curriculum vitae']):
-                continue
-                
-            words = line.split()
-            
-            # Check if line looks like a name (2-4 words, mostly alphabetic)
-            if 2 <= len(words) <= 4:
-                # Check if words are mostly alphabetic (allow some punctuation)
-                if all(re.match(r'^[A-Za-z\.\s\-\']+$', word) for word in words):
-                    # Check if it's likely a name (proper case or all caps)
-                    if any(word[0].isupper() for word in words if word):
-                        return line
+            if line and self.is_name_line(line):
+                return line
         
         return "Your Name"
 
+    def is_name_line(self, line: str) -> bool:
+        """Check if a stripped line looks like a person's name"""
+        # Skip lines with contact info
+        if any(keyword in line.lower() for keyword in ['email', 'phone', 'address', '@', 'linkedin', 'github']):
+            return False
+            
+        # Skip lines with common resume headers
+        if any(keyword in line.lower() for keyword in ['resume', 'cv', 'curriculum vitae']):
+            return False
+            
+        words = line.split()
+        
+        # Check if line looks like a name (2-4 words, mostly alphabetic)
+        if 2 <= len(words) <= 4:
+            # Check if words are mostly alphabetic (allow some punctuation)
+            if all(re.match(r'^[A-Za-z\.\s\-\']+$', word) for word in words):
+                # Check if it's likely a name (proper case or all caps)
+                return any(word[0].isupper() for word in words if word)
+        
+        return False
+
     def extract_email(self, text: str) -> str:
         """Extract email with improved regex"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b'
-        emails = re.findall(email_pattern, text, re.IGNORECASE)
+        emails = EMAIL_RE.findall(text)
         
         # Filter out common false positives
         valid_emails = [email for email in emails if not any(word in email.lower() for word in ['example', 'test', 'sample'])]
@@ -170,11 +495,10 @@ class ResumeParser:
         ]
         
         for pattern in phone_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                phone = matches[0]
-                if isinstance(phone, tuple):
-                    phone = ''.join(phone)
+            # The whole match; findall would only return the optional country code group
+            match = re.search(pattern, text)
+            if match:
+                phone = match.group(0)
                 # Clean up the phone number
                 phone = re.sub(r'\s+', ' ', phone.strip())
                 return phone
@@ -183,39 +507,48 @@ class ResumeParser:
 
     def find_section_boundaries(self, text: str) -> Dict[str, Tuple[int, int]]:
         """Find section boundaries with improved logic"""
-        lines = text.split('\n')
+        return self.section_boundaries(text.split('\n'))
+
+    def section_boundaries(self, lines: List[str]) -> Dict[str, Tuple[int, int]]:
+        """Section name -> (header line, end line) over a document's lines"""
         sections = {}
         current_section = None
         
         for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
-            
             # Check for section headers
-            for section_name, keywords in self.section_keywords.items():
-                for keyword in keywords:
-                    if keyword in line_lower and len(line_lower) < 50:  # Likely a header
-                        # Mark end of previous section
-                        if current_section and current_section not in sections:
-                            sections[current_section] = (sections.get(current_section, (0, 0))[0], i)
-                        
-                        # Start new section
-                        current_section = section_name
-                        sections[section_name] = (i, len(lines))
-                        break
-                if current_section == section_name:
-                    break
+            section_name = self.match_section_header(line)
+            if section_name:
+                # Mark end of previous section
+                if current_section and current_section not in sections:
+                    sections[current_section] = (sections.get(current_section, (0, 0))[0], i)
+                
+                # Start new section
+                current_section = section_name
+                sections[section_name] = (i, len(lines))
         
         return sections
 
+    def match_section_header(self, line: str) -> Optional[str]:
+        """Name of the section a line is a header for, if it looks like one"""
+        line_lower = line.lower().strip()
+        if len(line_lower) >= 50 or not self.header_keyword_re.search(line_lower):
+            return None
+        for section_name, keywords in self.section_keywords.items():
+            if any(keyword in line_lower for keyword in keywords):
+                return section_name
+        return None
+
     def extract_section_content(self, text: str, section_name: str) -> str:
         """Extract content from a specific section"""
-        sections = self.find_section_boundaries(text)
-        
+        lines = text.split('\n')
+        return self.section_content(lines, self.section_boundaries(lines), section_name)
+
+    def section_content(self, lines: List[str], sections: Dict[str, Tuple[int, int]], section_name: str) -> str:
+        """A section's non-empty lines, given the document's lines and section_boundaries"""
         if section_name not in sections:
             return ""
         
         start_line, end_line = sections[section_name]
-        lines = text.split('\n')
         
         # Get content, skipping the header line
         content_lines = lines[start_line + 1:end_line]
@@ -228,6 +561,11 @@ class ResumeParser:
     def extract_summary(self, text: str) -> str:
         """Extract professional summary with improved logic"""
         section_content = self.extract_section_content(text, 'summary')
+        return self.summary_from_lines(section_content.split('\n')) if section_content else ""
+
+    def summary_from_lines(self, lines: List[str]) -> str:
+        """First few sentences of the summary section's lines"""
+        section_content = '\n'.join(lines)
         
         if section_content:
             # Take first paragraph or first few sentences
@@ -251,8 +589,11 @@ class ResumeParser:
         if not section_content:
             return []
         
+        return self.experience_from_lines(section_content.split('\n'))
+
+    def experience_from_lines(self, lines: List[str]) -> List[Dict[str, str]]:
+        """Group the experience section's lines into jobs"""
         experiences = []
-        lines = section_content.split('\n')
         current_exp = {}
         
         for line in lines:
@@ -336,8 +677,11 @@ class ResumeParser:
         if not section_content:
             return []
         
+        return self.education_from_lines(section_content.split('\n'))
+
+    def education_from_lines(self, lines: List[str]) -> List[Dict[str, str]]:
+        """Degrees found in the education section's lines"""
         educations = []
-        lines = section_content.split('\n')
         
         for line in lines:
             line = line.strip()
@@ -384,30 +728,35 @@ class ResumeParser:
 
     def extract_skills(self, text: str) -> List[str]:
         """Extract skills with improved detection"""
-        section_content = self.extract_section_content(text, 'skills')
-        
+        return self.skills_from_content(self.extract_section_content(text, 'skills'), text)
+
+    def skills_from_content(self, section_content: str, text: str) -> List[str]:
+        """Skills from the skills section's content and known skills anywhere in the text"""
         # Also search in the entire text for skills
-        search_text = (section_content + '\n' + text).lower()
-        
-        found_skills = set()
-        
-        # Check for predefined skills
-        for skill in self.common_skills:
-            if skill.lower() in search_text:
-                found_skills.add(skill.title())
+        found_skills = self.find_common_skills(section_content + '\n' + text)
         
         # Extract comma-separated skills from skills section
         if section_content:
-            lines = section_content.split('\n')
-            for line in lines:
-                if ',' in line:
-                    skills_in_line = [skill.strip() for skill in line.split(',')]
-                    for skill in skills_in_line:
-                        if len(skill) > 1 and len(skill) < 30:  # Reasonable skill length
-                            found_skills.add(skill.title())
+            found_skills |= self.skills_from_lines(section_content.split('\n'))
         
         return list(found_skills)[:15]  # Limit to 15 skills
 
+    def find_common_skills(self, text: str) -> set:
+        """Predefined skills mentioned anywhere in the text"""
+        search_text = text.lower()
+        return {skill.title() for skill in self.common_skills if skill.lower() in search_text}
+
+    def skills_from_lines(self, lines: List[str]) -> set:
+        """Comma-separated skills listed in the skills section's lines"""
+        found_skills = set()
+        for line in lines:
+            if ',' in line:
+                skills_in_line = [skill.strip() for skill in line.split(',')]
+                for skill in skills_in_line:
+                    if len(skill) > 1 and len(skill) < 30:  # Reasonable skill length
+                        found_skills.add(skill.title())
+        return found_skills
+
     def extract_projects(self, text: str) -> List[Dict[str, str]]:
         """Extract projects with improved parsing"""
         section_content = self.extract_section_content(text, 'projects')
@@ -415,8 +764,11 @@ class ResumeParser:
         if not section_content:
             return []
         
+        return self.projects_from_lines(section_content.split('\n'))
+
+    def projects_from_lines(self, lines: List[str]) -> List[Dict[str, str]]:
+        """Group the projects section's lines into projects"""
         projects = []
-        lines = section_content.split('\n')
         current_project = {}
         
         for line in lines:
@@ -470,8 +822,11 @@ class ResumeParser:
         if not section_content:
             return []
         
+        return self.certifications_from_lines(section_content.split('\n'))
+
+    def certifications_from_lines(self, lines: List[str]) -> List[str]:
+        """Certification names from the certifications section's lines"""
         certifications = []
-        lines = section_content.split('\n')
         
         for line in lines:
             line = line.strip()
@@ -482,21 +837,25 @@ class ResumeParser:
 
     def post_process_data(self, resume_data: Dict[str, Any]) -> Dict[str, Any]:
         """Post-process extracted data to ensure quality"""
-        # Clean up descriptions
-        for exp in resume_data.get('experience', []):
-            if exp.get('description'):
-                exp['description'] = self.clean_description(exp['description'])
+        for field in ('experience', 'education', 'projects'):
+            resume_data[field] = self.post_process_field(field, resume_data.get(field, []))
         
-        for proj in resume_data.get('projects', []):
-            if proj.get('description'):
-                proj['description'] = self.clean_description(proj['description'])
+        return resume_data
+
+    def post_process_field(self, field: str, value: Any) -> Any:
+        """Post-processing for one field, so streamed sections match parse_resume_data"""
+        if field in ('experience', 'projects'):
+            # Clean up descriptions
+            for entry in value:
+                if entry.get('description'):
+                    entry['description'] = self.clean_description(entry['description'])
         
         # Remove empty entries
-        resume_data['experience'] = [exp for exp in resume_data.get('experience', []) if exp.get('title')]
-        resume_data['education'] = [edu for edu in resume_data.get('education', []) if edu.get('degree')]
-        resume_data['projects'] = [proj for proj in resume_data.get('projects', []) if proj.get('name')]
+        required = {'experience': 'title', 'education': 'degree', 'projects': 'name'}.get(field)
+        if required:
+            value = [entry for entry in value if entry.get(required)]
         
-        return resume_data
+        return value
 
     def clean_description(self, description: str) -> str:
         """Clean up description text"""
@@ -509,11 +868,88 @@ class ResumeParser:
         
         return description
 
+class LazyResumeData(Mapping):
+    """parse_resume_data result that extracts each field on first access
+
+    Reads like the dict (``data['email']``, or ``data.email``) but only runs
+    the extractors for the fields actually read, memoizing each one, so a
+    caller that only wants contact details never parses the sections. The
+    document's line table and section index are built at most once, on the
+    first field that needs them, and shared by every section field.
+    """
+
+    FIELDS = ('name', 'email', 'phone', 'summary', 'experience', 'education', 'skills', 'projects',
+              'certifications')
+
+    def __init__(self, parser: ResumeParser, text: str):
+        self._parser = parser
+        self._text = text
+        self._lines: Optional[List[str]] = None
+        self._sections: Optional[Dict[str, Tuple[int, int]]] = None
+        self._values: Dict[str, Any] = {}
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self._text.split('\n')
+        return self._lines
+
+    @property
+    def sections(self) -> Dict[str, Tuple[int, int]]:
+        if self._sections is None:
+            self._sections = self._parser.section_boundaries(self.lines)
+        return self._sections
+
+    def section_content(self, section_name: str) -> str:
+        return self._parser.section_content(self.lines, self.sections, section_name)
+
+    def _extract(self, field: str) -> Any:
+        parser = self._parser
+        if field == 'name':
+            return parser.name_from_lines(self.lines)
+        if field == 'email':
+            return parser.extract_email(self._text)
+        if field == 'phone':
+            return parser.extract_phone(self._text)
+        content = self.section_content(field)
+        if field == 'skills':
+            return parser.skills_from_content(content, self._text)
+        if not content:
+            return "" if field == 'summary' else []
+        return parser.post_process_field(field, parser.section_parsers[field](content.split('\n')))
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in self._values:
+            if field not in self.FIELDS:
+                raise KeyError(field)
+            with stage(f'extract_{field}'):
+                self._values[field] = self._extract(field)
+        return self._values[field]
+
+    def __getattr__(self, name: str) -> Any:
+        if name in LazyResumeData.FIELDS:
+            return self[name]
+        raise AttributeError(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"LazyResumeData(extracted={list(self._values)})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Every field, extracting whichever have not been read yet"""
+        return {field: self[field] for field in self.FIELDS}
+
 # Backward compatibility functions for existing code
-def extract_text_from_pdf(file_path: str) -> str:
+def extract_text_from_pdf(file_path: PDFSource, progress: Optional[PageProgress] = None,
+                          page_cache: Optional['PageCache'] = None) -> str:
     """Backward compatibility function"""
     parser = ResumeParser()
-    return parser.extract_text_from_pdf(file_path)
+    return parser.extract_text_from_pdf(file_path, progress, page_cache)
 
 def parse_resume_data(text: str) -> Dict[str, Any]:
     """Backward compatibility function"""
@@ -0,0 +1,73 @@
+import io
+import time
+from typing import Callable, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from utils.pdf_parser import ResumeParser, PDFSource
+from utils.page_cache import PageCache
+from utils.html_generator import THEMES, MINIFY_STORED_HTML, render_portfolio_themes
+from utils import dedup
+from utils.sample_pdf import synthetic_resume_pdf
+
+# CPU-bound upload stages as plain top-level functions so they can be sent to a
+# process pool. Both return their own timings since the caller only sees the
+# wall time including any wait for a free worker.
+
+# progress(stage, **details), e.g. a ProcessProgress when run in a pool
+Progress = Callable[..., None]
+
+# ResumeParser keeps no per-parse state, so one instance (with its keyword
+# tables and compiled patterns) serves every upload and thread, and is
+# inherited by forked workers when the app is preloaded
+PARSER = ResumeParser()
+
+def _hashed_lines(lines: Iterable[str], hasher: dedup.MinHasher) -> Iterator[str]:
+    for line in lines:
+        hasher.update(line)
+        yield line
+
+def extract_resume(source: PDFSource, with_signature: bool = True, progress: Optional[Progress] = None,
+                   page_cache: Optional[PageCache] = None) -> Tuple[Dict[str, Any], Optional[np.ndarray], float]:
+    """Parse a PDF (path or open file) and, optionally, compute its MinHash signature
+
+    Pages are cleaned, split into lines and parsed as each one is extracted,
+    so the full text is never built; the signature is computed from the same
+    lines on the way through. progress gets an 'extracting' event per page
+    and a 'parsed' event per settled field. Pages already in page_cache are
+    not extracted again.
+    """
+    started = time.perf_counter()
+    parser = PARSER
+    on_page = on_field = None
+    if progress:
+        on_page = lambda done, pages: progress('extracting', page=done, pages=pages)
+        on_field = lambda field: progress('parsed', field=field)
+    lines = parser.iter_clean_lines(parser.iter_page_texts(source, on_page, page_cache))
+    hasher = dedup.MinHasher() if with_signature else None
+    if hasher is not None:
+        lines = _hashed_lines(lines, hasher)
+    resume_data = parser.parse_resume_lines(lines, on_field)
+    signature = hasher.signature() if hasher is not None else None
+    return resume_data, signature, time.perf_counter() - started
+
+def render_resume(resume_data: Dict[str, Any],
+                  progress: Optional[Progress] = None) -> Tuple[Dict[str, str], float]:
+    """Render every theme from one parse, as stored (see MINIFY_STORED_HTML)"""
+    started = time.perf_counter()
+    if progress:
+        progress('rendering', themes=len(THEMES))
+    variants = render_portfolio_themes(resume_data, minify=MINIFY_STORED_HTML)
+    return variants, time.perf_counter() - started
+
+def warm_up(size: str = 'medium') -> float:
+    """Run the upload stages once on a synthetic resume built in memory
+
+    Loads the lazily imported parts of pdfplumber/pdfminer and PyPDF2, their
+    font tables and the compiled theme templates, so the first real upload
+    does not pay for them. Returns the seconds taken.
+    """
+    started = time.perf_counter()
+    resume_data, _, _ = extract_resume(io.BytesIO(synthetic_resume_pdf(0, size)))
+    render_resume(resume_data)
+    return time.perf_counter() - started
@@ -0,0 +1,313 @@
+import gc
+import os
+import io
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Modules whose functions are broken out in every profile summary
+PIPELINE_MODULES = ('pdf_parser.py', 'html_generator.py')
+
+PROFILE_ID_LENGTH = 32
+
+class _StoredProfiler:
+    """Sampling and storage shared by the profilers; one profiled request at a time"""
+
+    def __init__(self, directory: str, sample_every: int = 0, top_n: int = 25):
+        self.directory = os.path.abspath(directory)
+        self.sample_every = sample_every
+        self.top_n = top_n
+        self._busy = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._requests = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def should_sample(self) -> bool:
+        """True for every sample_every-th call when sampling is enabled"""
+        if self.sample_every <= 0:
+            return False
+        with self._counter_lock:
+            self._requests += 1
+            return self._requests % self.sample_every == 0
+
+    def path_for(self, profile_id: str, extension: str) -> Optional[str]:
+        """Path of a stored profile file, or None for unknown or malformed ids"""
+        if len(profile_id) != PROFILE_ID_LENGTH or not all(c in '0123456789abcdef' for c in profile_id):
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.{extension}')
+        return path if os.path.exists(path) else None
+
+class RequestProfiler(_StoredProfiler):
+    """cProfile wrapper for individual requests, storing each profile under an id
+
+    Profiles are written as <id>.prof (loadable with pstats or snakeviz) and
+    <id>.json (the slowest functions overall and within the parsing/rendering
+    modules). Only one request is profiled at a time; newer Python versions do
+    not allow concurrent profilers, and the overhead should stay bounded anyway.
+    """
+
+    @contextmanager
+    def profile(self, label: str, reason: str) -> Iterator[Dict[str, Any]]:
+        """Profile the block; the yielded dict receives 'profile_id' once stored
+
+        If another request is already being profiled the block simply runs
+        unprofiled and no id is set.
+        """
+        result: Dict[str, Any] = {}
+        if not self._busy.acquire(blocking=False):
+            yield result
+            return
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield result
+            finally:
+                # Failed requests are often the interesting ones, so keep those too
+                profiler.disable()
+                result['profile_id'] = self.save(profiler, label, reason, time.perf_counter() - started)
+        finally:
+            self._busy.release()
+
+    def save(self, profiler: cProfile.Profile, label: str, reason: str, wall_seconds: float) -> str:
+        profile_id = uuid.uuid4().hex
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(os.path.join(self.directory, f'{profile_id}.prof'))
+
+        summary = {
+            'id': profile_id,
+            'label': label,
+            'reason': reason,
+            'created': time.time(),
+            'wall_seconds': wall_seconds,
+            'total_calls': stats.total_calls,
+            'slowest': self._slowest(stats),
+            'slowest_pipeline': self._slowest(stats, PIPELINE_MODULES),
+            'report': self._report(stats),
+        }
+        with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Stored profile {profile_id} for {label} ({reason}, {wall_seconds:.3f}s)")
+        return profile_id
+
+    def _slowest(self, stats: pstats.Stats, modules: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Functions ordered by cumulative time, optionally limited to some source files"""
+        rows = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            if modules and not filename.endswith(modules):
+                continue
+            rows.append({
+                'function': function,
+                'file': os.path.basename(filename),
+                'line': line,
+                'calls': calls,
+                'own_seconds': own,
+                'cumulative_seconds': cumulative,
+            })
+        rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+        return rows[:self.top_n]
+
+    def _report(self, stats: pstats.Stats) -> str:
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        return buffer.getvalue()
+
+# The memory trace of the request (or batch run) in progress in this context;
+# pipeline code marks its stages with stage(), which costs one lookup when unset
+_current_trace: ContextVar[Optional['MemoryTrace']] = ContextVar('memory_trace', default=None)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Attribute the block's allocations and memory peak to a pipeline stage when tracing"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    trace.enter(name)
+    try:
+        yield
+    finally:
+        trace.exit(name)
+
+def _rss_bytes() -> int:
+    """Resident set size of this process, 0 where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+class _Frame:
+    __slots__ = ('name', 'started', 'traced', 'peak', 'rss', 'snapshot')
+
+    def __init__(self, name: str, traced: int, snapshot: Optional[tracemalloc.Snapshot]):
+        self.name = name
+        self.started = time.perf_counter()
+        self.traced = traced
+        self.peak = traced
+        self.rss = _rss_bytes()
+        self.snapshot = snapshot
+
+class MemoryTrace:
+    """Per-stage allocation figures for one traced request or batch run
+
+    For every stage: how often it ran, its time, the traced bytes it left
+    allocated (net of what it freed), the highest traced memory reached above
+    its starting level, and the RSS change across it. Figures include nested
+    stages. Entering and leaving a stage costs a few microseconds; with
+    ``sites`` each stage also diffs tracemalloc snapshots to find the lines
+    that allocated the most, which is far slower while a PDF is open (the
+    layout objects are live) and is meant for requests asked for explicitly.
+
+    tracemalloc sees the whole process, so allocations by other threads
+    during the trace are counted too.
+    """
+
+    def __init__(self, sites: bool = False, top_n: int = 15):
+        self.sites = sites
+        self.top_n = top_n
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._sites: Dict[str, Dict[str, List[int]]] = {}
+        self._stack: List[_Frame] = []
+        self.started = time.perf_counter()
+        self.rss_start = _rss_bytes()
+
+    def _fold_peak(self) -> None:
+        # The peak since the last boundary belongs to every stage still open
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._stack:
+            frame.peak = max(frame.peak, peak)
+        tracemalloc.reset_peak()
+
+    def enter(self, name: str) -> None:
+        self._fold_peak()
+        snapshot = tracemalloc.take_snapshot() if self.sites else None
+        self._stack.append(_Frame(name, tracemalloc.get_traced_memory()[0], snapshot))
+
+    def exit(self, name: str) -> None:
+        self._fold_peak()
+        frame = self._stack.pop()
+        traced = tracemalloc.get_traced_memory()[0]
+        rss = _rss_bytes()
+        totals = self.stages.setdefault(name, {
+            'calls': 0, 'seconds': 0.0, 'net_bytes': 0, 'peak_bytes': 0,
+            'rss_growth_bytes': 0, 'rss_max_bytes': 0,
+        })
+        totals['calls'] += 1
+        totals['seconds'] += time.perf_counter() - frame.started
+        totals['net_bytes'] += traced - frame.traced
+        totals['peak_bytes'] = max(totals['peak_bytes'], frame.peak - frame.traced)
+        totals['rss_growth_bytes'] += rss - frame.rss
+        totals['rss_max_bytes'] = max(totals['rss_max_bytes'], rss)
+        if frame.snapshot is not None:
+            sites = self._sites.setdefault(name, {})
+            for stat in tracemalloc.take_snapshot().compare_to(frame.snapshot, 'lineno'):
+                if stat.size_diff > 0 and not _is_own(stat.traceback):
+                    site = sites.setdefault(_site(stat.traceback), [0, 0])
+                    site[0] += stat.size_diff
+                    site[1] += stat.count_diff
+            frame.snapshot = None
+
+    def report(self) -> Dict[str, Any]:
+        """Stage figures, plus the allocations still alive now, by line; call while still tracing
+
+        Unreachable reference cycles (pdfplumber's page objects form them)
+        are collected first and reported separately: they only go away at the
+        next full collection, so until then they count towards RSS as well.
+        """
+        uncollected = tracemalloc.get_traced_memory()[0]
+        gc.collect()
+        retained = [stat for stat in tracemalloc.take_snapshot().statistics('lineno')
+                    if not _is_own(stat.traceback)]
+        stages = {}
+        for name, totals in sorted(self.stages.items(), key=lambda item: -item[1]['peak_bytes']):
+            stages[name] = dict(totals)
+            if name in self._sites:
+                top = sorted(self._sites[name].items(), key=lambda item: -item[1][0])[:self.top_n]
+                stages[name]['top_sites'] = [{'site': site, 'bytes': size, 'blocks': count}
+                                             for site, (size, count) in top]
+        return {
+            'wall_seconds': time.perf_counter() - self.started,
+            'rss_start_bytes': self.rss_start,
+            'rss_end_bytes': _rss_bytes(),
+            'traced_peak_bytes': max((totals['peak_bytes'] for totals in self.stages.values()), default=0),
+            'cyclic_garbage_bytes': uncollected - tracemalloc.get_traced_memory()[0],
+            'retained_bytes': sum(stat.size for stat in retained),
+            'retained_sites': [{'site': _site(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                               for stat in retained[:self.top_n]],
+            'stages': stages,
+        }
+
+def _is_own(traceback: tracemalloc.Traceback) -> bool:
+    """Allocated by the tracing machinery itself"""
+    return traceback[0].filename in (__file__, tracemalloc.__file__)
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    frame = traceback[0]
+    return f'{frame.filename}:{frame.lineno}'
+
+class MemoryProfiler(_StoredProfiler):
+    """tracemalloc per pipeline stage for individual requests or batch runs
+
+    Each trace is written as <id>.memory.json: per-stage figures (see
+    MemoryTrace) and the top allocation sites still alive when the request
+    finished, which is where RSS growth in long-lived workers comes from.
+    tracemalloc runs only while a trace is open (unless it was already
+    started, e.g. with PYTHONTRACEMALLOC), and only one trace runs at a time,
+    so sampling 1 in N requests costs the other N-1 nothing.
+    """
+
+    def __init__(self, directory: str, sample_every: int = 0, top_n: int = 15, frames: int = 1):
+        super().__init__(directory, sample_every, top_n)
+        self.frames = frames
+
+    @contextmanager
+    def trace(self, label: str, reason: str, sites: bool = False) -> Iterator[Dict[str, Any]]:
+        """Trace the block's stages; the yielded dict receives 'profile_id' once stored
+
+        If another trace is already running the block runs untraced.
+        """
+        result: Dict[str, Any] = {}
+        if not self._busy.acquire(blocking=False):
+            yield result
+            return
+        started_tracing = not tracemalloc.is_tracing()
+        try:
+            if started_tracing:
+                tracemalloc.start(self.frames)
+            trace = MemoryTrace(sites, self.top_n)
+            token = _current_trace.set(trace)
+            trace.enter('total')
+            try:
+                yield result
+            finally:
+                trace.exit('total')
+                _current_trace.reset(token)
+                report = trace.report()
+                if started_tracing:
+                    tracemalloc.stop()
+                result['profile_id'] = self.save(report, label, reason)
+        finally:
+            self._busy.release()
+
+    def save(self, report: Dict[str, Any], label: str, reason: str) -> str:
+        profile_id = uuid.uuid4().hex
+        summary = {'id': profile_id, 'label': label, 'reason': reason, 'created': time.time(), **report}
+        with open(os.path.join(self.directory, f'{profile_id}.memory.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Stored memory profile {profile_id} for {label} ({reason}, "
+                    f"peak {report['traced_peak_bytes'] / 1e6:.1f} MB, "
+                    f"retained {report['retained_bytes'] / 1e6:.2f} MB)")
+        return profile_id
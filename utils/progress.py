@@ -0,0 +1,206 @@
+import re
+import hmac
+import json
+import time
+import uuid
+import hashlib
+import asyncio
+import threading
+from typing import Dict, Any, AsyncIterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Issued by the server as <uuid4 hex>-<issue time, hex seconds>-<signature>
+UPLOAD_ID_RE = re.compile(r'^([0-9a-f]{32})-([0-9a-f]{1,12})-([0-9a-f]{32})$')
+
+# Stages after which an upload's channel sends nothing more
+FINAL_STAGES = ('done', 'error')
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """One unnamed Server-Sent Events message (delivered to onmessage) carrying the event as JSON"""
+    return f"data: {json.dumps(event)}\n\n"
+
+class _Channel:
+    __slots__ = ('history', 'listeners', 'seen', 'updated', 'closed')
+
+    def __init__(self):
+        self.history: List[Dict[str, Any]] = []
+        self.listeners: List[asyncio.Queue] = []
+        # Opened, or last touched while its upload was still arriving
+        self.seen = self.updated = time.monotonic()
+        self.closed = False
+
+class ProgressBroker:
+    """Per-upload progress channels for Server-Sent Events listeners
+
+    Everything runs on one event loop: a listener is a coroutine waiting on
+    its own queue, so idle connections cost memory but no threads. Recent
+    events are kept per upload so a listener that connects after the upload
+    started (or reconnects) catches up first.
+
+    Upload ids are issued and signed by the server (see issue), so a client
+    cannot open channels for ids of its own making. A channel nothing has been
+    published to within ``pending_ttl`` seconds is dropped and its listeners
+    are let go, unless its upload is still being received (see touch); any
+    other channel once it has been idle for ``ttl`` seconds with no listener
+    attached.
+    """
+
+    def __init__(self, secret: bytes, history: int = 32, ttl: float = 300.0, pending_ttl: float = 120.0,
+                 id_max_age: float = 86400.0, max_channels: int = 10000, max_listeners: int = 4):
+        self.secret = secret
+        self.history = history
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.id_max_age = id_max_age
+        self.max_channels = max_channels
+        self.max_listeners = max_listeners
+        self._channels: Dict[str, _Channel] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _sign(self, nonce: str, issued: str) -> str:
+        return hmac.new(self.secret, f"{nonce}-{issued}".encode(), hashlib.sha256).hexdigest()[:32]
+
+    def issue(self) -> str:
+        """A fresh upload id for the upload page to send with its form and listen on"""
+        nonce, issued = uuid.uuid4().hex, f"{int(time.time()):x}"
+        return f"{nonce}-{issued}-{self._sign(nonce, issued)}"
+
+    def valid(self, upload_id: Optional[str]) -> bool:
+        """Whether upload_id was issued by this server (with the same secret) and is not too old"""
+        match = UPLOAD_ID_RE.match(upload_id or '')
+        if match is None:
+            return False
+        nonce, issued, signature = match.groups()
+        return (hmac.compare_digest(signature, self._sign(nonce, issued))
+                and time.time() - int(issued, 16) <= self.id_max_age)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Loop that publish_threadsafe hands events to"""
+        self._loop = loop
+
+    def publish(self, upload_id: str, stage: str, **details: Any) -> None:
+        """Record an event and wake the upload's listeners; call on the broker's loop
+
+        Only for ids that passed valid(), which is the caller's to check once
+        per upload rather than on every event.
+        """
+        channel = self._channel(upload_id)
+        if channel is None or channel.closed:
+            return
+        event = {'stage': stage, 'time': time.time(), **details}
+        channel.history.append(event)
+        if len(channel.history) > self.history:
+            # Keep the first event so late listeners still see when it started
+            del channel.history[1]
+        channel.updated = time.monotonic()
+        channel.closed = stage in FINAL_STAGES
+        for queue in channel.listeners:
+            queue.put_nowait(event)
+
+    def touch(self, upload_id: Optional[str]) -> None:
+        """The upload's body is still arriving: restart its channel's pending_ttl
+
+        Called as a slow upload is received, before anything is published for
+        it. Never opens a channel, so the id need not be checked first.
+        """
+        channel = self._channels.get(upload_id)
+        if channel is not None:
+            channel.seen = time.monotonic()
+
+    def publish_threadsafe(self, upload_id: str, stage: str, **details: Any) -> None:
+        """publish from another thread, e.g. the one draining process-pool progress"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(lambda: self.publish(upload_id, stage, **details))
+
+    async def subscribe(self, upload_id: str, keepalive: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Past then live events for an upload, ending after its final stage
+
+        Yields None every ``keepalive`` seconds without events so the caller
+        can keep the connection from being timed out by proxies. Ends at once
+        for an id the server did not issue, and after ``pending_ttl`` if the
+        upload neither reports anything nor is being received.
+        """
+        if not self.valid(upload_id):
+            return
+        channel = self._channel(upload_id)
+        if channel is None or len(channel.listeners) >= self.max_listeners:
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in channel.history:
+            queue.put_nowait(event)
+        channel.listeners.append(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    if not channel.history and time.monotonic() - channel.seen >= self.pending_ttl:
+                        return
+                    yield None
+                    continue
+                yield event
+                if event['stage'] in FINAL_STAGES:
+                    return
+        finally:
+            channel.listeners.remove(queue)
+            channel.updated = time.monotonic()
+
+    def _channel(self, upload_id: str) -> Optional[_Channel]:
+        channel = self._channels.get(upload_id)
+        if channel is None:
+            self._expire()
+            if len(self._channels) >= self.max_channels:
+                logger.warning(f"Progress channel limit ({self.max_channels}) reached, dropping {upload_id}")
+                return None
+            channel = self._channels[upload_id] = _Channel()
+        return channel
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for upload_id, channel in list(self._channels.items()):
+            if (not channel.history and channel.seen < now - self.pending_ttl
+                    or not channel.listeners and channel.updated < now - self.ttl):
+                del self._channels[upload_id]
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            'channels': len(self._channels),
+            'listeners': sum(len(channel.listeners) for channel in self._channels.values()),
+        }
+
+class ProcessProgress:
+    """Picklable progress callback for process-pool workers
+
+    Events go onto the multiprocessing queue each worker was initialised with
+    (see init_worker); a single thread in the server drains it into the broker.
+    """
+
+    def __init__(self, upload_id: str):
+        self.upload_id = upload_id
+
+    def __call__(self, stage: str, **details: Any) -> None:
+        if _worker_queue is not None:
+            _worker_queue.put((self.upload_id, stage, details))
+
+_worker_queue = None
+
+def init_worker(queue) -> None:
+    """ProcessPoolExecutor initializer giving the worker its progress queue"""
+    global _worker_queue
+    _worker_queue = queue
+
+def start_pump(queue, broker: ProgressBroker) -> threading.Thread:
+    """Forward worker events to the broker until None is put on the queue"""
+    def pump():
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            upload_id, stage, details = item
+            broker.publish_threadsafe(upload_id, stage, **details)
+
+    thread = threading.Thread(target=pump, name='progress-pump', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,101 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Any, Iterator, Optional, Tuple
+import json
+import logging
+
+from utils.storage import PortfolioStore, write_atomic
+from utils.html_generator import render_portfolio_themes, DEFAULT_THEME, MINIFY_STORED_HTML
+
+logger = logging.getLogger(__name__)
+
+def rerender_one(job: Tuple[str, str, str]) -> Tuple[str, str, int]:
+    """Re-render one portfolio in every theme, writing only the files whose output changed"""
+    portfolio_id, html_path, data_path = job
+    try:
+        with open(data_path, 'rb') as f:
+            resume_data = json.loads(f.read())
+    except FileNotFoundError:
+        return portfolio_id, 'skipped', 0
+
+    try:
+        changed = False
+        size = os.path.getsize(data_path)
+        for theme, html in render_portfolio_themes(resume_data, minify=MINIFY_STORED_HTML).items():
+            path = html_path if theme == DEFAULT_THEME else PortfolioStore.variant_relpath(html_path, theme)
+            html = html.encode('utf-8')
+            size += len(html)
+            try:
+                with open(path, 'rb') as f:
+                    current = f.read()
+            except FileNotFoundError:
+                current = None
+
+            if current != html:
+                write_atomic(path, html)
+                changed = True
+
+        return portfolio_id, 'changed' if changed else 'unchanged', size
+    except Exception as e:
+        logger.error(f"Re-render of {portfolio_id} failed: {str(e)}")
+        return portfolio_id, 'failed', 0
+
+def iter_jobs(store: PortfolioStore) -> Iterator[Tuple[str, str, str]]:
+    for record in store.iter_records():
+        yield (record['id'],
+               store.abspath(record['relpath']),
+               store.abspath(store.data_relpath(record['relpath'])))
+
+def rerender_all(store: PortfolioStore, workers: Optional[int] = None, chunksize: int = 64,
+                 report_every: float = 5.0) -> Dict[str, Any]:
+    """Regenerate every stored portfolio from its parsed data in parallel"""
+    counts = {'changed': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+    started = last_report = time.perf_counter()
+    processed = 0
+
+    workers = workers or os.cpu_count() or 1
+    jobs = iter_jobs(store)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # executor.map submits everything up front, so feed it bounded windows of jobs
+        window = chunksize * workers * 4
+        while True:
+            batch = list(islice(jobs, window))
+            if not batch:
+                break
+            for portfolio_id, status, size in executor.map(rerender_one, batch, chunksize=chunksize):
+                counts[status] += 1
+                processed += 1
+                if status == 'changed':
+                    store.update_size(portfolio_id, size)
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                logger.info(f"Re-rendered {processed} portfolios ({processed / (now - started):.1f}/s)")
+                last_report = now
+
+    elapsed = time.perf_counter() - started
+    return {
+        'processed': processed,
+        **counts,
+        'elapsed_seconds': elapsed,
+        'portfolios_per_second': processed / elapsed if elapsed else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-render stored portfolios from their persisted parse results')
+    parser.add_argument('--portfolio-folder', default='generated_portfolios')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=64)
+    args = parser.parse_args()
+
+    report = rerender_all(PortfolioStore(args.portfolio_folder), workers=args.workers, chunksize=args.chunksize)
+    print(f"Processed {report['processed']} portfolios in {report['elapsed_seconds']:.2f}s "
+          f"({report['portfolios_per_second']:.1f}/s): {report['changed']} changed, "
+          f"{report['unchanged']} unchanged, {report['skipped']} without parsed data, "
+          f"{report['failed']} failed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import random
+from typing import List
+
+# Synthetic resumes with a real text layer, for load tests and warmup.
+# Sizes map to the number of experience/project entries (and so pages).
+SIZES = {'small': 2, 'medium': 6, 'large': 20}
+
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries']
+TITLES = ['Software Engineer', 'Senior Developer', 'Data Analyst', 'Backend Engineer', 'Team Lead']
+SKILLS = ['Python', 'JavaScript', 'SQL', 'AWS', 'Docker', 'React', 'Go', 'Kubernetes', 'Java', 'Linux',
+          'PostgreSQL', 'Redis', 'Flask', 'Django', 'Node.js', 'Git']
+SCHOOLS = ['State University', 'Tech Institute', 'City College']
+FIRST_NAMES = ['Jane', 'John', 'Priya', 'Wei', 'Maria', 'Ahmed', 'Olga', 'Kofi']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Okafor', 'Novak', 'Haddad', 'Silva', 'Kim']
+
+LINES_PER_PAGE = 48
+
+def _escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def build_pdf(lines: List[str]) -> bytes:
+    """Minimal PDF with one Helvetica text line per entry, paginated"""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    font_id = 3 + 2 * len(pages)
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [%s] /Count %d >>' % (' '.join(f'{3 + 2 * i} 0 R' for i in range(len(pages))),
+                                                      len(pages)),
+    ]
+    for i, page in enumerate(pages):
+        content = 'BT /F1 11 Tf 50 750 Td 14 TL\n' + ''.join(f"({_escape(line)}) '\n" for line in page) + 'ET'
+        objects.append('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>')
+        objects.append('<< /Length %d >>\nstream\n%s\nendstream' % (len(content.encode('latin-1')), content))
+    objects.append('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    return bytes(out)
+
+def synthetic_resume_lines(seed: int, size: str = 'small') -> List[str]:
+    rng = random.Random(seed)
+    entries = SIZES[size]
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    lines = [
+        f'{first} {last}',
+        f'{first.lower()}.{last.lower()}{seed}@example.com',
+        f'(555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+        'SUMMARY',
+        f'Engineer with {rng.randint(2, 20)} years of experience building reliable services (profile {seed}).',
+        'SKILLS',
+        ', '.join(rng.sample(SKILLS, 8)),
+        'EXPERIENCE',
+    ]
+    for i in range(entries):
+        lines += [
+            f'{rng.choice(TITLES)} at {rng.choice(COMPANIES)}',
+            f'Jan {rng.randint(2005, 2015)} - Dec {rng.randint(2016, 2024)}',
+            f'Delivered project {seed}-{i}, improving throughput by {rng.randint(5, 90)}% for internal teams.',
+            f'Maintained {rng.choice(SKILLS)} services and mentored {rng.randint(1, 6)} engineers.',
+        ]
+    lines += ['EDUCATION', f'Bachelor of Science, {rng.choice(SCHOOLS)} {rng.randint(2000, 2015)}', 'PROJECTS']
+    for i in range(entries):
+        lines += [f'Tool {seed}-{i}', f'A {rng.choice(SKILLS)} utility for processing reports.']
+    return lines
+
+def synthetic_resume_pdf(seed: int = 0, size: str = 'small') -> bytes:
+    return build_pdf(synthetic_resume_lines(seed, size))
@@ -0,0 +1,345 @@
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from utils.storage import configure_sqlite
+
+# Default index location, alongside the portfolio store's own index
+INDEX_FILENAME = 'search.sqlite3'
+
+# Searchable fields; a bare query term matches any of them
+FIELDS = ('name', 'skill', 'title', 'company', 'degree', 'institution')
+
+# Matches are counted up to this many; past it the total is only a lower bound
+TOTAL_CAP = 1000
+# A prefix stands for at most this many indexed terms per field, and a query is
+# anchored on at most MAX_ANCHOR_TERMS terms (one ordered posting scan each)
+MAX_PREFIX_TERMS = 32
+MAX_ANCHOR_TERMS = 128
+# Postings counted per term when picking the most selective one to anchor on
+ESTIMATE_CAP = 1000
+
+WORD_RE = re.compile(r'[a-z0-9+#]+')
+QUERY_TOKEN_RE = re.compile(r'\(|\)|[^\s()]+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc INTEGER PRIMARY KEY,
+    portfolio_id TEXT NOT NULL UNIQUE,
+    name TEXT,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc);
+"""
+
+class QueryError(ValueError):
+    """Raised for malformed search queries"""
+
+def index_terms(resume_data: Dict[str, Any]) -> List[str]:
+    """Field-qualified terms (e.g. 'skill:python') for a parsed resume"""
+    values = [('name', resume_data.get('name', ''))]
+    values += [('skill', skill) for skill in resume_data.get('skills', [])]
+    for exp in resume_data.get('experience', []):
+        values += [('title', exp.get('title', '')), ('company', exp.get('company', ''))]
+    for edu in resume_data.get('education', []):
+        values += [('degree', edu.get('degree', '')), ('institution', edu.get('institution', ''))]
+
+    terms = set()
+    for field, value in values:
+        for word in WORD_RE.findall((value or '').lower()):
+            terms.add(f"{field}:{word}")
+    return sorted(terms)
+
+class SearchIndex:
+    """Inverted index from field-qualified terms to portfolios, persisted in SQLite"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            configure_sqlite(conn)
+            self._local.conn = conn
+        return conn
+
+    def add(self, portfolio_id: str, resume_data: Dict[str, Any]) -> None:
+        """Index (or re-index) a portfolio from its parsed resume data"""
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM postings WHERE doc = (SELECT doc FROM docs WHERE portfolio_id = ?)',
+                         (portfolio_id,))
+            conn.execute('INSERT OR IGNORE INTO docs (portfolio_id, name, created) VALUES (?, ?, ?)',
+                         (portfolio_id, resume_data.get('name', ''), time.time()))
+            doc = conn.execute('SELECT doc FROM docs WHERE portfolio_id = ?', (portfolio_id,)).fetchone()[0]
+            conn.executemany('INSERT OR IGNORE INTO postings (term, doc) VALUES (?, ?)',
+                             [(term, doc) for term in index_terms(resume_data)])
+
+    def remove(self, portfolio_id: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM postings WHERE doc = (SELECT doc FROM docs WHERE portfolio_id = ?)',
+                         (portfolio_id,))
+            conn.execute('DELETE FROM docs WHERE portfolio_id = ?', (portfolio_id,))
+
+    def search(self, query: str, before: Optional[int] = None, limit: int = 20) -> Dict[str, Any]:
+        """Run a boolean/prefix query and return one page of matches, newest first
+
+        Pages are keyset-paginated: pass the previous page's next_cursor as
+        ``before``. The first page also reports how many documents match
+        among the newest TOTAL_CAP containing the query's anchor term;
+        ``total_capped`` is set when there are more, making it a lower bound.
+        """
+        node = parse_query(query)
+        conn = self._connect()
+        anchor = self._anchor(conn, node)
+        if anchor is None:
+            raise QueryError('A query needs a term to match, not only exclusions or very short prefixes')
+        counts, _, origin = anchor
+        terms = [term for term, count in counts.items() if count]
+        # The anchor's own conjunct holds for every posting scanned
+        rest = without(node, origin)
+        present = self._present(conn, rest) if rest else set()
+
+        page: List[int] = []
+        total, capped = (0, False) if before is None else (None, False)
+        if terms:
+            sql, params = compile_query(rest, terms, before, present)
+            page = [doc for doc, in conn.execute(f'{sql} LIMIT ?', params + [limit + 1])]
+            if before is None:
+                window_sql, window_params = compile_query(None, terms)
+                condition, condition_params = compile_filter(rest, present=present) if rest else ('1', [])
+                scanned, matched = conn.execute(
+                    f'SELECT COUNT(*), COALESCE(SUM({condition}), 0) FROM ({window_sql} LIMIT ?) p',
+                    condition_params + window_params + [TOTAL_CAP + 1]).fetchone()
+                total, capped = min(matched, TOTAL_CAP), scanned > TOTAL_CAP
+        next_cursor = page[limit - 1] if len(page) > limit else None
+        page = page[:limit]
+
+        names = {}
+        if page:
+            names = {doc: (portfolio_id, name) for doc, portfolio_id, name in conn.execute(
+                f"SELECT doc, portfolio_id, name FROM docs WHERE doc IN ({', '.join('?' for _ in page)})", page)}
+        return {
+            'total': total,
+            'total_capped': capped,
+            'results': [{'portfolio_id': names[doc][0], 'name': names[doc][1]} for doc in page if doc in names],
+            'next_cursor': next_cursor,
+        }
+
+    def _anchor(self, conn: sqlite3.Connection, node: Tuple) -> Optional[Tuple[Dict[str, int], int, Tuple]]:
+        """Terms every match contains at least one of, with their (capped) posting counts
+
+        For an AND the side with fewer postings is kept, so the query scans the
+        most selective term's postings and probes the rest. Also returns the
+        subquery the terms stand for, if any. None when matches need not contain any
+        term, as with a bare NOT.
+        """
+        kind = node[0]
+        if kind == 'term':
+            terms = self._expand(conn, node)
+            if terms is None:
+                return None
+            counts = {term: conn.execute('SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE term = ? LIMIT ?)',
+                                         (term, ESTIMATE_CAP)).fetchone()[0] for term in terms}
+            return counts, sum(counts.values()), node
+        if kind == 'not':
+            return None
+        left, right = self._anchor(conn, node[1]), self._anchor(conn, node[2])
+        if kind == 'and':
+            return min((side for side in (left, right) if side is not None), key=lambda side: side[1], default=None)
+        if left is None or right is None or len(left[0]) + len(right[0]) > MAX_ANCHOR_TERMS:
+            return None
+        # The terms only stand for the OR itself when they stand for both sides
+        exact = left[2] is node[1] and right[2] is node[2]
+        return {**left[0], **right[0]}, left[1] + right[1], node if exact else None
+
+    def _present(self, conn: sqlite3.Connection, node: Tuple) -> Set[str]:
+        """The query's whole-word terms that are indexed at all, so probes skip the rest"""
+        if node[0] == 'term':
+            _, field, word, prefix = node
+            if prefix:
+                return set()
+            return {term for term in (f"{f}:{word}" for f in ([field] if field else FIELDS))
+                    if conn.execute('SELECT 1 FROM postings WHERE term = ? LIMIT 1', (term,)).fetchone()}
+        return set().union(*(self._present(conn, child) for child in node[1:]))
+
+    def _expand(self, conn: sqlite3.Connection, node: Tuple) -> Optional[List[str]]:
+        """The indexed terms a query term stands for; None for a prefix matching too many"""
+        _, field, word, prefix = node
+        fields = [field] if field else FIELDS
+        if not prefix:
+            return [f"{f}:{word}" for f in fields]
+        terms = []
+        for low, high in prefix_ranges(fields, word):
+            # One primary-key seek per distinct term, skipping over its postings
+            found = conn.execute('SELECT term FROM postings WHERE term >= ? AND term < ? LIMIT 1',
+                                 (low, high)).fetchone()
+            count = 0
+            while found is not None:
+                count += 1
+                if count > MAX_PREFIX_TERMS:
+                    return None
+                terms.append(found[0])
+                found = conn.execute('SELECT term FROM postings WHERE term > ? AND term < ? LIMIT 1',
+                                     (found[0], high)).fetchone()
+        return terms
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+# Query language:
+#   python aws              both terms (AND is implicit)
+#   python OR golang        either term
+#   NOT java / -java        exclude a term (alongside at least one term to match)
+#   company:acme            restrict a term to one field
+#   pyth*                   prefix match
+#   (a OR b) c              grouping
+
+def parse_query(query: str) -> Tuple:
+    tokens = QUERY_TOKEN_RE.findall(query)
+    if not tokens:
+        raise QueryError('Empty query')
+    position = 0
+
+    def peek() -> Optional[str]:
+        return tokens[position] if position < len(tokens) else None
+
+    def take() -> str:
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == 'OR':
+            take()
+            node = ('or', node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_unary()
+        while peek() not in (None, ')', 'OR'):
+            if peek() == 'AND':
+                take()
+            node = ('and', node, parse_unary())
+        return node
+
+    def parse_unary():
+        token = peek()
+        if token is None:
+            raise QueryError('Query ends unexpectedly')
+        if token == 'NOT':
+            take()
+            return ('not', parse_unary())
+        if token.startswith('-') and len(token) > 1:
+            tokens[position] = token[1:]
+            return ('not', parse_unary())
+        return parse_atom()
+
+    def parse_atom():
+        token = take()
+        if token == '(':
+            node = parse_or()
+            if peek() != ')':
+                raise QueryError('Missing closing parenthesis')
+            take()
+            return node
+        if token in (')', 'AND', 'OR'):
+            raise QueryError(f"Unexpected '{token}'")
+        return parse_term(token)
+
+    node = parse_or()
+    if position != len(tokens):
+        raise QueryError(f"Unexpected '{tokens[position]}'")
+    return node
+
+def parse_term(token: str) -> Tuple:
+    field, sep, value = token.lower().rpartition(':')
+    if sep and field not in FIELDS:
+        raise QueryError(f"Unknown field '{field}'")
+    prefix = value.endswith('*')
+    value = value.rstrip('*')
+    words = WORD_RE.findall(value)
+    if len(words) != 1:
+        raise QueryError(f"Invalid search term '{token}'")
+    return ('term', field or None, words[0], prefix)
+
+def prefix_ranges(fields: Iterable[str], word: str) -> List[Tuple[str, str]]:
+    """[low, high) term ranges holding every field:word* term"""
+    ranges = []
+    for field in fields:
+        low = f"{field}:{word}"
+        ranges.append((low, low[:-1] + chr(ord(low[-1]) + 1)))
+    return ranges
+
+def compile_filter(node: Tuple, doc: str = 'p.doc', present: Optional[Set[str]] = None) -> Tuple[str, List[Any]]:
+    """Compile a parsed query into a condition on one document, probing postings by (doc, term)
+
+    With ``present``, whole-word terms not in it are known to have no
+    postings and are left out of the probes.
+    """
+    kind = node[0]
+    if kind == 'term':
+        _, field, word, prefix = node
+        fields = [field] if field else FIELDS
+        if prefix:
+            ranges = prefix_ranges(fields, word)
+            condition = ' OR '.join('term >= ? AND term < ?' for _ in ranges)
+            params = [bound for bounds in ranges for bound in bounds]
+        else:
+            params = [term for term in (f"{f}:{word}" for f in fields) if present is None or term in present]
+            if not params:
+                return '0', []
+            condition = f"term IN ({', '.join('?' for _ in params)})"
+        return f'EXISTS (SELECT 1 FROM postings WHERE doc = {doc} AND ({condition}))', params
+    if kind == 'not':
+        sql, params = compile_filter(node[1], doc, present)
+        return f'NOT {sql}', params
+    left_sql, left_params = compile_filter(node[1], doc, present)
+    right_sql, right_params = compile_filter(node[2], doc, present)
+    return f"({left_sql} {'AND' if kind == 'and' else 'OR'} {right_sql})", left_params + right_params
+
+def without(node: Tuple, part: Optional[Tuple]) -> Optional[Tuple]:
+    """A query with one of its ANDed subqueries dropped (None if nothing is left)"""
+    if node is part:
+        return None
+    if node[0] != 'and':
+        return node
+    left, right = without(node[1], part), without(node[2], part)
+    if left is None or right is None:
+        return left or right
+    return ('and', left, right)
+
+def compile_query(node: Optional[Tuple], anchor: List[str], before: Optional[int] = None,
+                  present: Optional[Set[str]] = None) -> Tuple[str, List[Any]]:
+    """Compile a parsed query into a SELECT of matching doc ids, newest first, below ``before``
+
+    Each anchor term's postings are read backwards along the primary key and
+    the arms merged by UNION, so rows stream in doc order and a LIMIT stops
+    the scan early; ``node``, the rest of the query, is checked per document.
+    """
+    condition, condition_params = compile_filter(node, present=present) if node else ('', [])
+    arm = 'SELECT doc FROM postings p WHERE term = ?'
+    if before is not None:
+        arm += ' AND doc < ?'
+    if condition:
+        arm += f' AND {condition}'
+    params = []
+    for term in anchor:
+        params += [term] + ([before] if before is not None else []) + condition_params
+    return ' UNION '.join(arm for _ in anchor) + ' ORDER BY doc DESC', params
@@ -0,0 +1,117 @@
+import os
+import re
+import argparse
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from utils.pdf_parser import ResumeParser
+
+def compile_skill_pattern(skills: Iterable[str]) -> re.Pattern:
+    """One alternation over every skill, longest first so 'javascript' wins over 'java'"""
+    skills = [skill.lower() for skill in skills]
+    alternatives = sorted((re.escape(skill) for skill in skills), key=len, reverse=True)
+    # The leading-character lookahead lets the scanner skip most positions cheaply
+    first_chars = re.escape(''.join(sorted({skill[0] for skill in skills})))
+    return re.compile(rf'(?=[{first_chars}])(?<![a-z0-9])(?:' + '|'.join(alternatives) + r')(?![a-z0-9+#])')
+
+class SkillMatrix:
+    """Sparse document x skill presence matrix with corpus-level aggregate queries"""
+
+    def __init__(self, matrix: sparse.csr_matrix, skills: List[str]):
+        self.matrix = matrix
+        self.skills = skills
+        self._column = {skill: i for i, skill in enumerate(skills)}
+
+    @property
+    def document_count(self) -> int:
+        return self.matrix.shape[0]
+
+    def counts(self) -> np.ndarray:
+        """Number of documents mentioning each skill"""
+        return np.asarray(self.matrix.sum(axis=0, dtype=np.int64)).ravel()
+
+    def top_k(self, k: int = 10) -> List[Tuple[str, int]]:
+        counts = self.counts()
+        k = min(k, len(counts))
+        if k == 0:
+            return []
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top], kind='stable')]
+        return [(self.skills[i], int(counts[i])) for i in top]
+
+    def cooccurrence(self) -> sparse.csr_matrix:
+        """Skill x skill matrix of documents mentioning both; the diagonal holds counts()"""
+        matrix = self.matrix.astype(np.int32)
+        return (matrix.T @ matrix).tocsr()
+
+    def top_pairs(self, k: int = 10) -> List[Tuple[str, str, int]]:
+        """Most frequently co-occurring skill pairs across the corpus"""
+        upper = sparse.triu(self.cooccurrence(), k=1).tocoo()
+        k = min(k, upper.nnz)
+        if k == 0:
+            return []
+        top = np.argpartition(-upper.data, k - 1)[:k]
+        top = top[np.argsort(-upper.data[top], kind='stable')]
+        return [(self.skills[upper.row[i]], self.skills[upper.col[i]], int(upper.data[i])) for i in top]
+
+    def top_cooccurring(self, skill: str, k: int = 10) -> List[Tuple[str, int]]:
+        """Skills that most often appear in documents mentioning the given skill"""
+        column = self._column[skill.lower()]
+        docs = self.matrix[:, column].nonzero()[0]
+        counts = np.asarray(self.matrix[docs].sum(axis=0, dtype=np.int64)).ravel()
+        counts[column] = 0
+        k = min(k, int(np.count_nonzero(counts)))
+        if k == 0:
+            return []
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top], kind='stable')]
+        return [(self.skills[i], int(counts[i])) for i in top]
+
+def build_skill_matrix(texts: Iterable[str], skills: Optional[Iterable[str]] = None) -> SkillMatrix:
+    """Scan each text once with a combined skill pattern and assemble a CSR matrix
+
+    Unlike ResumeParser.extract_skills, matches must sit on word boundaries so
+    that e.g. 'go' is not counted inside 'good'.
+    """
+    skills = sorted(skill.lower() for skill in (skills or ResumeParser().common_skills))
+    column = {skill: i for i, skill in enumerate(skills)}
+    pattern = compile_skill_pattern(skills)
+
+    indptr = [0]
+    indices: List[int] = []
+    for text in texts:
+        indices.extend(sorted({column[match] for match in pattern.findall(text.lower())}))
+        indptr.append(len(indices))
+
+    indices = np.asarray(indices, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.uint8)
+    matrix = sparse.csr_matrix((data, indices, np.asarray(indptr, dtype=np.int64)),
+                               shape=(len(indptr) - 1, len(skills)))
+    return SkillMatrix(matrix, skills)
+
+def iter_text_files(directory: str) -> Iterable[str]:
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_file() and entry.name.endswith('.txt'):
+            with open(entry.path, encoding='utf-8', errors='replace') as f:
+                yield f.read()
+
+def main():
+    parser = argparse.ArgumentParser(description='Skill demand report over a corpus of extracted resume texts')
+    parser.add_argument('directory', help='directory of .txt files produced by extract_text_from_pdf')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    skill_matrix = build_skill_matrix(iter_text_files(args.directory))
+    total = skill_matrix.document_count
+    print(f"Documents: {total}")
+    print("\nTop skills:")
+    for skill, count in skill_matrix.top_k(args.top):
+        print(f"  {skill:20s} {count:8d}  ({100 * count / max(total, 1):.1f}%)")
+    print("\nTop skill pairs:")
+    for first, second, count in skill_matrix.top_pairs(args.top):
+        print(f"  {first} + {second}: {count}")
+
+if __name__ == "__main__":
+    main()
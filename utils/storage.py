@@ -0,0 +1,331 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Portfolio ids are full uuid4 hex strings; 8-char ids come from the old flat layout.
+# Theme variants are stored alongside as portfolio_<id>.<theme>.html
+PORTFOLIO_FILENAME_RE = re.compile(r'^portfolio_([0-9a-f]{32}|[0-9a-f]{8})(?:\.([a-z0-9_-]+))?\.html$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE,
+    relpath TEXT NOT NULL,
+    owner TEXT,
+    created REAL NOT NULL,
+    last_viewed REAL,
+    size INTEGER NOT NULL DEFAULT 0,
+    source_hash TEXT,
+    extract_seconds REAL,
+    render_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS idx_portfolios_created ON portfolios (created);
+CREATE INDEX IF NOT EXISTS idx_portfolios_recency ON portfolios (COALESCE(last_viewed, created));
+CREATE INDEX IF NOT EXISTS idx_portfolios_owner ON portfolios (owner);
+CREATE INDEX IF NOT EXISTS idx_portfolios_source_hash ON portfolios (source_hash);
+"""
+
+# WAL is the fastest mode but relies on shared memory, so every process using
+# a database must be on the same host. When nodes on several machines share
+# the portfolio folder over a network filesystem, set SQLITE_JOURNAL_MODE=DELETE
+# to fall back to the rollback journal and file locks
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+if SQLITE_JOURNAL_MODE not in ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST'):
+    raise ValueError(f"Unsupported SQLITE_JOURNAL_MODE: {SQLITE_JOURNAL_MODE}")
+
+def use_shared_journal_mode() -> None:
+    """Open SQLite files from now on in a mode that is safe across hosts
+
+    Called by everything that takes part in the job queue, whose workers may
+    run on other machines. WAL falls back to DELETE unless it was asked for
+    explicitly, which is refused rather than risking a corrupt database.
+    """
+    global SQLITE_JOURNAL_MODE
+    if SQLITE_JOURNAL_MODE != 'WAL':
+        return
+    if os.environ.get('SQLITE_JOURNAL_MODE'):
+        raise RuntimeError('SQLITE_JOURNAL_MODE=WAL cannot be used with the job queue, '
+                           'whose workers may share the portfolio folder from other hosts')
+    SQLITE_JOURNAL_MODE = 'DELETE'
+
+COLUMNS = ('id', 'filename', 'relpath', 'owner', 'created', 'last_viewed',
+           'size', 'source_hash', 'extract_seconds', 'render_seconds')
+
+class PortfolioStore:
+    """Sharded on-disk portfolio storage with a SQLite metadata index"""
+
+    def __init__(self, root: str, index_path: Optional[str] = None, shard_depth: int = 2):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or os.path.join(self.root, 'index.sqlite3')
+        self.shard_depth = shard_depth
+        self._local = threading.local()
+        os.makedirs(self.root, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection to the index, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            configure_sqlite(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def filename_for(portfolio_id: str) -> str:
+        return f"portfolio_{portfolio_id}.html"
+
+    @staticmethod
+    def id_from_filename(filename: str) -> Optional[str]:
+        match = PORTFOLIO_FILENAME_RE.match(filename)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def variant_relpath(relpath: str, theme: str) -> str:
+        return f"{os.path.splitext(relpath)[0]}.{theme}.html"
+
+    def shard_dir(self, portfolio_id: str) -> str:
+        """Relative shard directory, e.g. 'ab/cd' for a hash starting with abcd"""
+        digest = hashlib.sha1(portfolio_id.encode('ascii')).hexdigest()
+        return os.path.join(*[digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)])
+
+    def abspath(self, relpath: str) -> str:
+        return os.path.join(self.root, relpath)
+
+    @staticmethod
+    def data_relpath(relpath: str) -> str:
+        """Parsed resume data lives next to the portfolio as compact JSON"""
+        return os.path.splitext(relpath)[0] + '.json'
+
+    def save(self, portfolio_id: str, html: str, owner: Optional[str] = None,
+             source_hash: Optional[str] = None, extract_seconds: Optional[float] = None,
+             render_seconds: Optional[float] = None,
+             resume_data: Optional[Dict[str, Any]] = None,
+             variants: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Write a portfolio, its theme variants and parsed data into its shard and index it"""
+        filename = self.filename_for(portfolio_id)
+        relpath = os.path.join(self.shard_dir(portfolio_id), filename)
+        os.makedirs(os.path.dirname(self.abspath(relpath)), exist_ok=True)
+
+        files = [(relpath, html.encode('utf-8'))]
+        for theme, variant_html in (variants or {}).items():
+            files.append((self.variant_relpath(relpath, theme), variant_html.encode('utf-8')))
+        if resume_data is not None:
+            files.append((self.data_relpath(relpath), encode_resume_data(resume_data)))
+
+        if len(files) == 1:
+            size = write_atomic(self.abspath(relpath), files[0][1])
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(files), 8)) as executor:
+                size = sum(executor.map(lambda item: write_atomic(self.abspath(item[0]), item[1]), files))
+
+        record = {
+            'id': portfolio_id,
+            'filename': filename,
+            'relpath': relpath,
+            'owner': owner,
+            'created': time.time(),
+            'last_viewed': None,
+            'size': size,
+            'source_hash': source_hash,
+            'extract_seconds': extract_seconds,
+            'render_seconds': render_seconds,
+        }
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO portfolios ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                [record[col] for col in COLUMNS]
+            )
+        return record
+
+    def load_resume_data(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Load the parsed resume data persisted with a portfolio, if any"""
+        try:
+            with open(self.abspath(self.data_relpath(record['relpath'])), 'rb') as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def update_size(self, portfolio_id: str, size: int) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE portfolios SET size = ? WHERE id = ?', (size, portfolio_id))
+
+    def get(self, portfolio_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            'SELECT * FROM portfolios WHERE id = ?', (portfolio_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def lookup(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Resolve a public portfolio (or theme variant) filename to its index record"""
+        match = PORTFOLIO_FILENAME_RE.match(filename)
+        if match is None:
+            return None
+        record = self.get(match.group(1))
+        if record is not None and match.group(2):
+            record['relpath'] = self.variant_relpath(record['relpath'], match.group(2))
+            record['filename'] = filename
+        return record
+
+    def touch(self, portfolio_id: str) -> None:
+        """Record a view of the portfolio"""
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE portfolios SET last_viewed = ? WHERE id = ?',
+                         (time.time(), portfolio_id))
+
+    def delete(self, portfolio_id: str) -> int:
+        """Remove a portfolio file and its index entry, returning bytes freed"""
+        record = self.get(portfolio_id)
+        if record is None:
+            return 0
+        # The portfolio, its theme variants and its data all share the portfolio_<id>. prefix
+        prefix = os.path.splitext(record['filename'])[0] + '.'
+        freed = 0
+        try:
+            with os.scandir(os.path.dirname(self.abspath(record['relpath']))) as entries:
+                owned = [entry.path for entry in entries if entry.name.startswith(prefix)]
+        except FileNotFoundError:
+            owned = []
+        for path in owned:
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM portfolios WHERE id = ?', (portfolio_id,))
+        return freed
+
+    def find_by_source_hash(self, source_hash: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            'SELECT * FROM portfolios WHERE source_hash = ? ORDER BY created DESC LIMIT 1',
+            (source_hash,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def iter_records(self, batch_size: int = 500, owner: Optional[str] = None,
+                     since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over every indexed portfolio using keyset pagination
+
+        Optionally only those of one owner and/or created in [since, until).
+        """
+        conditions, params = ['id > ?'], []
+        if owner is not None:
+            conditions.append('owner = ?')
+            params.append(owner)
+        if since is not None:
+            conditions.append('created >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('created < ?')
+            params.append(until)
+        query = f"SELECT * FROM portfolios WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+
+        last_id = ''
+        while True:
+            rows = self._connect().execute(query, (last_id, *params, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]['id']
+
+    def expired(self, cutoff: float, limit: int = 100) -> List[Dict[str, Any]]:
+        """Portfolios neither created nor viewed since the cutoff timestamp"""
+        rows = self._connect().execute(
+            'SELECT * FROM portfolios WHERE COALESCE(last_viewed, created) < ? '
+            'ORDER BY COALESCE(last_viewed, created) LIMIT ?',
+            (cutoff, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def least_recently_viewed(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Eviction candidates, least recently viewed (or created) first"""
+        rows = self._connect().execute(
+            'SELECT * FROM portfolios ORDER BY COALESCE(last_viewed, created) LIMIT ?',
+            (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._connect().execute(
+            'SELECT COUNT(*) AS count, COALESCE(SUM(size), 0) AS total_bytes FROM portfolios'
+        ).fetchone()
+        return dict(row)
+
+    def migrate_flat_directory(self) -> int:
+        """Move portfolios left in the root by the old flat layout into shards"""
+        migrated = 0
+        with os.scandir(self.root) as entries:
+            legacy = [entry for entry in entries
+                      if entry.is_file() and self.id_from_filename(entry.name)]
+        for entry in legacy:
+            portfolio_id = self.id_from_filename(entry.name)
+            relpath = os.path.join(self.shard_dir(portfolio_id), entry.name)
+            path = self.abspath(relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(entry.path, path)
+            stat = os.stat(path)
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR IGNORE INTO portfolios (id, filename, relpath, created, size) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (portfolio_id, entry.name, relpath, stat.st_mtime, stat.st_size)
+                )
+            migrated += 1
+        if migrated:
+            logger.info(f"Migrated {migrated} portfolios into sharded storage")
+        return migrated
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def configure_sqlite(conn: sqlite3.Connection) -> None:
+    """Journal and sync settings shared by every SQLite file in the portfolio folder"""
+    conn.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+    # NORMAL is only safe against power loss with WAL
+    conn.execute('PRAGMA synchronous=NORMAL' if SQLITE_JOURNAL_MODE == 'WAL' else 'PRAGMA synchronous=FULL')
+
+def encode_resume_data(resume_data: Dict[str, Any]) -> bytes:
+    return json.dumps(resume_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def write_atomic(path: str, data: bytes) -> int:
+    """Write via a temp file and rename so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the sha256 of a file without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
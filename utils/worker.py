@@ -0,0 +1,240 @@
+import os
+import shutil
+import signal
+import socket
+import threading
+import time
+import argparse
+import multiprocessing
+from typing import Dict, Any, BinaryIO, Optional
+import logging
+
+from PyPDF2.errors import PdfReadError
+
+from utils import dedup
+from utils.html_generator import DEFAULT_THEME
+from utils.job_queue import JobQueue, INDEX_FILENAME as JOB_QUEUE_FILENAME
+from utils.page_cache import PageCache, INDEX_FILENAME as PAGE_CACHE_FILENAME
+from utils.pdf_parser import ImageOnlyPDFError, UnreadablePDFError
+from utils.pipeline import extract_resume, render_resume, warm_up
+from utils.search_index import SearchIndex, INDEX_FILENAME as SEARCH_INDEX_FILENAME
+from utils import storage
+from utils.storage import PortfolioStore, use_shared_journal_mode
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_JOB = 'upload'
+
+# Uploads wait for a worker here, relative to the portfolio folder
+INCOMING_DIRNAME = 'incoming'
+
+# Failures that would recur on every attempt (a scanned, malformed or encrypted
+# PDF, or an input file that is gone); the job is dead-lettered at once
+PERMANENT_ERRORS = (ImageOnlyPDFError, UnreadablePDFError, PdfReadError, FileNotFoundError)
+
+# How often each worker deletes finished jobs older than its keep_seconds
+PURGE_INTERVAL_SECONDS = 3600
+
+def enqueue_upload(queue: JobQueue, store: PortfolioStore, source: BinaryIO, owner: Optional[str],
+                   source_hash: str, dedup_enabled: bool = True) -> str:
+    """Copy an upload to the shared folder and queue it; the job id is also the portfolio id"""
+    if storage.SQLITE_JOURNAL_MODE == 'WAL':
+        raise RuntimeError('The job queue needs JOB_QUEUE_ENABLED set in the environment (or a '
+                           'non-WAL SQLITE_JOURNAL_MODE) before the portfolio folder is opened')
+    job_id = store.new_id()
+    relpath = os.path.join(INCOMING_DIRNAME, f"{job_id}.pdf")
+    path = store.abspath(relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    source.seek(0)
+    with open(f"{path}.tmp", 'wb') as f:
+        shutil.copyfileobj(source, f, 1024 * 1024)
+    os.replace(f"{path}.tmp", path)
+    queue.enqueue(UPLOAD_JOB, {'owner': owner, 'source_hash': source_hash, 'dedup': dedup_enabled},
+                  job_id=job_id, input_path=relpath)
+    return job_id
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """What a client polling an upload job is told"""
+    status = {key: job[key] for key in ('id', 'state', 'attempts', 'max_attempts', 'created', 'updated')}
+    if job['state'] in ('queued', 'dead'):
+        status['error'] = job['error']
+    if job['state'] == 'done':
+        status['result'] = job['result']
+    return status
+
+class Worker:
+    """Claims queued uploads one at a time and writes their portfolios to the shared store
+
+    Runs on any node that mounts the portfolio folder, so uploads received by
+    one web node are processed wherever there is spare capacity. The lease is
+    kept alive by a heartbeat thread while a job runs; if the node dies, the
+    job is retried elsewhere once the lease runs out.
+    """
+
+    def __init__(self, queue: JobQueue, store: PortfolioStore, search_index: SearchIndex,
+                 dedup_index: dedup.DedupIndex, page_cache: Optional[PageCache] = None,
+                 name: Optional[str] = None, poll_interval: float = 1.0, keep_seconds: float = 7 * 86400):
+        self.queue = queue
+        self.store = store
+        self.search_index = search_index
+        self.dedup_index = dedup_index
+        self.page_cache = page_cache
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.keep_seconds = keep_seconds
+        self.handlers = {UPLOAD_JOB: self.process_upload}
+        self._stats = {'done': 0, 'failed': 0, 'lost': 0}
+
+    def process_upload(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """The in-process upload path of app.py, from the spooled PDF to stored, indexed portfolio"""
+        payload = job['payload']
+        portfolio_id = job['id']
+        # Only a byte-identical earlier upload has its parse reused, as in app.py
+        identical = (dedup.identical_parse(self.store, self.dedup_index, payload['source_hash'])
+                     if payload['dedup'] else None)
+        if identical is not None:
+            resume_data, signature = identical
+            extract_seconds = 0.0
+        else:
+            input_path = self.queue.input_abspath(job['input_path'])
+            # The extractors would report a missing file as an unreadable PDF
+            if not os.path.exists(input_path):
+                raise FileNotFoundError(f"Upload {job['input_path']} is missing")
+            resume_data, signature, extract_seconds = extract_resume(
+                input_path, payload['dedup'], page_cache=self.page_cache)
+            if signature is not None:
+                self.dedup_index.find(signature)
+        variants, render_seconds = render_resume(resume_data)
+        portfolio_html = variants.pop(DEFAULT_THEME)
+
+        # Saving and indexing replace whatever an earlier, abandoned attempt left
+        record = self.store.save(portfolio_id, portfolio_html,
+                                 owner=payload['owner'],
+                                 source_hash=payload['source_hash'],
+                                 extract_seconds=extract_seconds,
+                                 render_seconds=render_seconds,
+                                 resume_data=resume_data,
+                                 variants=variants)
+        self.search_index.add(portfolio_id, resume_data)
+        if signature is not None:
+            self.dedup_index.add(portfolio_id, signature)
+        return {
+            'portfolio_filename': record['filename'],
+            'theme_filenames': {theme: os.path.basename(self.store.variant_relpath(record['filename'], theme))
+                                for theme in variants},
+            'extract_seconds': extract_seconds,
+            'render_seconds': render_seconds,
+        }
+
+    def _heartbeat(self, job: Dict[str, Any], finished: threading.Event) -> None:
+        while not finished.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(job['id'], job['lease']):
+                logger.warning(f"Lost the lease on job {job['id']}; another worker will retry it")
+                return
+
+    def run_job(self, job: Dict[str, Any]) -> None:
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, finished), daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            result = self.handlers[job['kind']](job)
+        except Exception as e:
+            state = self.queue.fail(job['id'], job['lease'], f"{type(e).__name__}: {str(e)}",
+                                    retry=not isinstance(e, PERMANENT_ERRORS))
+            self._stats['failed'] += 1
+            logger.error(f"Job {job['id']} attempt {job['attempts']} failed ({state or 'lease lost'}): {str(e)}")
+            return
+        finally:
+            finished.set()
+            heartbeat.join()
+
+        if self.queue.complete(job['id'], job['lease'], result):
+            self._stats['done'] += 1
+            if job['input_path']:
+                os.remove(self.queue.input_abspath(job['input_path']))
+            logger.info(f"Job {job['id']} done in {time.perf_counter() - started:.2f}s")
+        else:
+            # Whoever holds the lease now needs the input and will record the outcome
+            self._stats['lost'] += 1
+            logger.warning(f"Job {job['id']} finished after its lease was lost")
+
+    def run(self, stop: threading.Event, max_jobs: Optional[int] = None) -> Dict[str, int]:
+        """Claim and run jobs until stop is set (or max_jobs have run); returns outcome counts"""
+        last_purge = 0.0
+        processed = 0
+        while not stop.is_set() and (max_jobs is None or processed < max_jobs):
+            if time.time() - last_purge >= PURGE_INTERVAL_SECONDS:
+                last_purge = time.time()
+                purged = self.queue.purge(last_purge - self.keep_seconds)
+                if purged:
+                    logger.info(f"Purged {purged} finished jobs")
+            job = self.queue.claim(self.name, kinds=self.handlers)
+            if job is None:
+                stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+            processed += 1
+        return dict(self._stats)
+
+def run_worker(args: argparse.Namespace) -> None:
+    """Open the shared store and queue in this process and work until told to stop"""
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+
+    store = PortfolioStore(args.portfolio_folder)
+    queue = JobQueue(os.path.join(store.root, JOB_QUEUE_FILENAME), lease_seconds=args.lease_seconds)
+    search_index = SearchIndex(os.path.join(store.root, SEARCH_INDEX_FILENAME))
+    dedup_index = dedup.DedupIndex(os.path.join(store.root, dedup.INDEX_FILENAME), threshold=args.dedup_threshold)
+    page_cache = (PageCache(os.path.join(store.root, PAGE_CACHE_FILENAME), max_pages=args.page_cache_max_pages)
+                  if args.page_cache else None)
+    name = f"{args.name or socket.gethostname()}:{os.getpid()}"
+    worker = Worker(queue, store, search_index, dedup_index, page_cache, name=name,
+                    poll_interval=args.poll_interval, keep_seconds=args.keep_days * 86400)
+    logger.info(f"Worker {name} started")
+    stats = worker.run(stop)
+    logger.info(f"Worker {name} stopped: {stats}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Process queued uploads from the shared portfolio folder')
+    parser.add_argument('--portfolio-folder', default='generated_portfolios')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='worker processes on this node')
+    parser.add_argument('--name', help='node name recorded on leased jobs (default: hostname)')
+    parser.add_argument('--lease-seconds', type=float, default=60.0,
+                        help='how long a silent worker keeps a job before it is retried elsewhere')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between claims when idle')
+    parser.add_argument('--dedup-threshold', type=float, default=dedup.DEFAULT_THRESHOLD)
+    parser.add_argument('--no-page-cache', dest='page_cache', action='store_false')
+    parser.add_argument('--page-cache-max-pages', type=int, default=50000)
+    parser.add_argument('--keep-days', type=float, default=7.0, help='keep finished jobs this long')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(processName)s %(levelname)s %(message)s')
+    # Workers on other hosts share every SQLite file in the folder
+    use_shared_journal_mode()
+    # Loaded once here and shared copy-on-write by the forked workers, as in wsgi.py
+    logger.info(f"Warmed up in {warm_up():.2f}s")
+
+    if args.processes <= 1:
+        run_worker(args)
+        return
+
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=run_worker, args=(args,), name=f"worker-{i}")
+                 for i in range(args.processes)]
+    for process in processes:
+        process.start()
+
+    # Children get Ctrl-C from the terminal themselves; SIGTERM is passed on
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, lambda *_: None)
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Production entry point: gunicorn with the app preloaded and warmed up once
+
+    python wsgi.py --bind 0.0.0.0:8000 --workers 4 --threads 4
+
+The master imports app.py, runs the upload pipeline once on a synthetic
+resume (see utils.pipeline.warm_up) and only then forks workers, so every
+worker starts with the PDF libraries, parser tables and compiled templates
+already loaded, shared copy-on-write. Point the load balancer's readiness
+check at /readyz and its liveness check at /healthz.
+"""
+import os
+import gc
+import argparse
+import logging
+
+from gunicorn.app.base import BaseApplication
+
+logger = logging.getLogger(__name__)
+
+class ProductionServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('preload_app', True)
+        self.cfg.set('post_fork', post_fork)
+
+    def load(self):
+        import app as service
+
+        service.warm_up_pipeline()
+        logger.info(f"Warmed up in {service.readiness['warmup_seconds']:.2f}s")
+
+        # Nothing that can hold a lock or a SQLite handle may cross the fork:
+        # the janitor thread (and its lock file) is released here, and
+        # connections reopen lazily per thread
+        service.janitor.stop()
+        for resource in (service.store, service.search_index, service.dedup_index, service.page_cache,
+                         service.job_queue):
+            resource.close()
+
+        # Objects created so far are never collected, so the collector does not
+        # write to (and un-share) the pages workers inherit
+        gc.collect()
+        gc.freeze()
+        return service.app
+
+def post_fork(server, worker):
+    # Every worker starts a janitor, but only the one holding the portfolio
+    # folder's janitor.lock sweeps; another takes over if that worker exits
+    import app as service
+
+    if service.app.config['JANITOR_ENABLED']:
+        service.janitor.start()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bind', default=os.environ.get('BIND', '0.0.0.0:8000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 2)))
+    parser.add_argument('--threads', type=int, default=4,
+                        help='threads per worker, so probes are answered while uploads run')
+    parser.add_argument('--timeout', type=int, default=120, help='seconds before a silent worker is restarted')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='recycle workers after this many requests (0 disables)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ProductionServer({
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'graceful_timeout': args.timeout,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests // 10,
+    }).run()
+
+if __name__ == '__main__':
+    main()